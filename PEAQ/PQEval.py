@@ -1,50 +1,131 @@
 #PQEval
+from dataclasses import dataclass
+from functools import lru_cache
+
 import numpy as np
-from scipy.signal import fftconvolve
+from scipy import sparse
+
+NUM_BANDS = 24  # Number of Bark bands (simplified)
+
+# Bark band edges (Hz) - simplified model
+BARK_BANDS = np.array([
+    0, 100, 200, 300, 400, 510, 630, 770, 920, 1080, 1270, 1480,
+    1720, 2000, 2320, 2700, 3150, 3700, 4400, 5300, 6400, 7700, 9500, 12000
+])
+BARK_BANDS.setflags(write=False)
+
+
+def _generate_spreading_function():
+    """Create a spreading function to simulate masking across Bark bands."""
+    bark_diff = np.arange(-12, 13)  # ±12 Bark bands
+    spread_db = 15.81 + 7.5 * (bark_diff + 0.474) - 17.5 * np.sqrt(1 + (bark_diff + 0.474)**2)
+    return 10 ** (spread_db / 10)  # Convert dB to linear scale
+
+
+@dataclass(frozen=True)
+class PQPlan:
+    """Per-(Fs, NF) transform constants shared by every PQEval with those parameters."""
+    Fs: int
+    NF: int
+    window: np.ndarray         # Hanning window of length NF
+    window_energy: float       # sum(window ** 2)
+    freqs: np.ndarray          # FFT bin frequencies
+    spread: np.ndarray         # spreading function (linear scale)
+    band_matrix: sparse.csr_matrix  # (Nc, bins) bin -> Bark aggregation
+    spread_matrix: np.ndarray  # (Nc, Nc) Toeplitz form of the spreading convolution
+
+
+def _readonly(arr):
+    arr.setflags(write=False)
+    return arr
+
+
+@lru_cache(maxsize=32)
+def get_plan(Fs, NF):
+    """Build (once per process) the window, band and spreading matrices for (Fs, NF)."""
+    window = _readonly(np.hanning(NF))
+    freqs = _readonly(np.fft.rfftfreq(NF, 1.0 / Fs))
+    spread = _readonly(_generate_spreading_function())
 
-class PQEval: 
-    def __init__(self, Amax=1, Fs=48000, NF=2048):
+    # Each bin feeds at most one band; the top band stays empty as in the loop form
+    rows, cols = [], []
+    for i in range(NUM_BANDS - 1):
+        bins = np.nonzero((freqs >= BARK_BANDS[i]) & (freqs < BARK_BANDS[i+1]))[0]
+        rows.append(np.full(len(bins), i))
+        cols.append(bins)
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+    band_matrix = sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, cols)), shape=(NUM_BANDS, len(freqs))
+    )
+
+    # spread_matrix @ e == fftconvolve(e, spread, mode='same')
+    half = len(spread) // 2
+    idx = np.arange(NUM_BANDS)
+    offsets = idx[:, None] - idx[None, :] + half
+    valid = (offsets >= 0) & (offsets < len(spread))
+    spread_matrix = _readonly(np.where(valid, spread[np.clip(offsets, 0, len(spread) - 1)], 0.0))
+
+    return PQPlan(
+        Fs=Fs,
+        NF=NF,
+        window=window,
+        window_energy=float(np.sum(window ** 2)),
+        freqs=freqs,
+        spread=spread,
+        band_matrix=band_matrix,
+        spread_matrix=spread_matrix,
+    )
+
+
+class PQEval:
+    def __init__(self, Amax=1, Fs=48000, NF=2048, hop=None):
         self.Amax = Amax
         self.Fs = Fs
         self.NF = NF
-        self.Nc = 24  # Number of Bark bands (simplified)
+        self.Nc = NUM_BANDS
         self.framesize = NF
-        self.hopsize = NF // 2  # 50% overlap
-        self.freqs = np.fft.rfftfreq(NF, 1.0 / Fs)  # FFT bin frequencies
-        
-        # Bark band edges (Hz) - simplified model
-        self.bark_bands = np.array([
-            0, 100, 200, 300, 400, 510, 630, 770, 920, 1080, 1270, 1480,
-            1720, 2000, 2320, 2700, 3150, 3700, 4400, 5300, 6400, 7700, 9500, 12000
-        ])
-        
-        # Spreading function (dB -> linear scale)
-        self.spread = self._generate_spreading_function()
-
-    def _generate_spreading_function(self):
-        """Create a spreading function to simulate masking across Bark bands."""
-        bark_diff = np.arange(-12, 13)  # ±12 Bark bands
-        spread_db = 15.81 + 7.5 * (bark_diff + 0.474) - 17.5 * np.sqrt(1 + (bark_diff + 0.474)**2)
-        return 10 ** (spread_db / 10)  # Convert dB to linear scale
+        self.hopsize = hop or NF // 2  # 50% overlap unless a coarser hop is asked for
+
+        # Window, band and spreading matrices are cached per (Fs, NF)
+        self.plan = get_plan(Fs, NF)
+        self.freqs = self.plan.freqs  # FFT bin frequencies
+        self.bark_bands = BARK_BANDS
+        self.spread = self.plan.spread
+
+    def _window(self, n):
+        if n == self.NF:
+            return self.plan.window, self.plan.window_energy
+        window = np.hanning(n)
+        return window, np.sum(window ** 2)
 
     def PQDFTFrame(self, x):
         """Compute normalized FFT power spectrum with Hanning window."""
-        window = np.hanning(len(x))
+        window, energy = self._window(len(x))
         X = np.fft.rfft(x * window, n=self.NF)
         X2 = np.abs(X) ** 2
-        X2 /= np.sum(window ** 2)  # Compensate for window energy
+        X2 /= energy  # Compensate for window energy
         return X2
 
     def PQ_excitCB(self, X2):
         """Map FFT bins to Bark bands and apply spreading."""
-        # Sum energy within each Bark band
-        bark_energy = np.zeros(self.Nc)
-        for i in range(self.Nc - 1):
-            mask = (self.freqs >= self.bark_bands[i]) & (self.freqs < self.bark_bands[i+1])
-            bark_energy[i] = np.sum(X2[mask])
-        
-        # Apply spreading function (convolution)
-        spread_energy = fftconvolve(bark_energy, self.spread, mode='same')
+        bark_energy = self.plan.band_matrix @ X2
+        spread_energy = self.plan.spread_matrix @ bark_energy
+        return bark_energy, spread_energy
+
+    def PQDFTFrames(self, frames):
+        """Batched PQDFTFrame: power spectra of a (num_frames, framesize) block."""
+        window, energy = self._window(frames.shape[-1])
+        X = np.fft.rfft(frames * window, n=self.NF, axis=-1)
+        X2 = X.real ** 2 + X.imag ** 2
+        X2 /= energy
+        return X2
+
+    def PQ_excitCBFrames(self, X2):
+        """Batched PQ_excitCB: band and spread energies for a (..., bins) block (frames, channels, ...)."""
+        lead = X2.shape[:-1]
+        bark_energy = (self.plan.band_matrix @ X2.reshape(-1, X2.shape[-1]).T).T.reshape(lead + (self.Nc,))
+        spread_energy = bark_energy @ self.plan.spread_matrix.T
         return bark_energy, spread_energy
 
     def PQ_timeSpread(self, EsMat):
@@ -58,4 +139,4 @@ class PQEval:
 
     def PQCB(self):
         """Return critical band parameters (for debugging)."""
-        return self.bark_bands
\ No newline at end of file
+        return self.bark_bands
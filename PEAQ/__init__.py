@@ -1,3 +1,6 @@
 # PEAQ/__init__.py
 
 from .PEAQ import PEAQ
+from .streaming import StreamingPEAQ
+from .sharding import evaluate_sharded
+from .reference_cache import ReferenceCache
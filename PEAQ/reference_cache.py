@@ -0,0 +1,90 @@
+# PEAQ/reference_cache.py
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+# Bump when the reference-side computation changes so stale entries are never reused
+CACHE_VERSION = 1
+
+
+class ReferenceCache:
+    """
+    Content-addressed on-disk cache of reference excitation patterns.
+
+    Entries are compressed .npz files holding EbNMatR, EhsR and BWRef, keyed
+    by a hash of the decoded reference samples plus the PQEval parameters.
+    The directory is kept under ``max_bytes`` by evicting the least recently
+    used entries (file mtime is refreshed on every hit). Writes go through a
+    temporary file and os.replace, so concurrent workers can share a cache.
+    """
+
+    SUFFIX = ".npz"
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(signal, pq_eval):
+        h = hashlib.blake2b(digest_size=20)
+        h.update(f"v{CACHE_VERSION}:{pq_eval.Fs}:{pq_eval.NF}:{pq_eval.hopsize}:{pq_eval.Nc}:".encode())
+        data = np.ascontiguousarray(signal, dtype=np.float32)
+        h.update(str(data.shape).encode())
+        h.update(memoryview(data).cast('B'))
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}{self.SUFFIX}")
+
+    def load(self, key):
+        """``(EbNMatR, EhsR, BWRef)`` for ``key``, or None on a miss."""
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                entry = (data['EbNMatR'], data['EhsR'], data['BWRef'])
+            os.utime(path)
+            return entry
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def store(self, key, EbNMatR, EhsR, BWRef):
+        """Save an entry; returns False (instead of raising) if the disk write fails."""
+        tmp_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(f, EbNMatR=np.asarray(EbNMatR), EhsR=np.asarray(EhsR), BWRef=np.asarray(BWRef))
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        self.evict()
+        return True
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,123 @@
+# PEAQ/sharding.py
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from .PEAQ import PEAQ
+from .PQEval import PQEval
+from .streaming import StreamingPEAQ
+
+# One frame-aligned piece of a long pair. Frames [frame_start, frame_stop)
+# need samples [sample_start, sample_stop); the added-energy term is taken over
+# the disjoint range [sample_start, diff_stop) so shards never double count.
+Shard = namedtuple("Shard", "frame_start frame_stop sample_start sample_stop diff_stop")
+
+
+def plan_shards(num_samples, fs, num_shards, NF=2048, hop=None):
+    """Split ``num_samples`` into at most ``num_shards`` frame-aligned shards."""
+    pq_eval = PQEval(Fs=fs, NF=NF, hop=hop)
+    frame_size, hop_size = pq_eval.framesize, pq_eval.hopsize
+    total_frames = (num_samples - frame_size) // hop_size + 1
+    if total_frames <= 0:
+        return []
+
+    num_shards = max(1, min(num_shards, total_frames))
+    edges = np.linspace(0, total_frames, num_shards + 1).astype(int)
+
+    shards = []
+    for k in range(num_shards):
+        f0, f1 = int(edges[k]), int(edges[k + 1])
+        diff_stop = f1 * hop_size if k < num_shards - 1 else num_samples
+        shards.append(Shard(
+            frame_start=f0,
+            frame_stop=f1,
+            sample_start=f0 * hop_size,
+            sample_stop=max((f1 - 1) * hop_size + frame_size, diff_stop),
+            diff_stop=diff_stop,
+        ))
+    return shards
+
+
+def evaluate_shard(ref_segment, test_segment, fs, shard, keep_frames=False, NF=2048, hop=None):
+    """
+    Evaluate one shard given its samples ``[shard.sample_start, shard.sample_stop)``.
+    Returns ``(state, frames)`` where ``state`` is a StreamingPEAQ.state() dict
+    and ``frames`` is ``(EbR, EhsR, EbT)`` for the shard when ``keep_frames``.
+    """
+    acc = StreamingPEAQ(fs, NF=NF, hop=hop)
+    diff_len = shard.diff_stop - shard.sample_start
+    acc.add_difference(ref_segment[..., :diff_len], test_segment[..., :diff_len])
+
+    blocks = []
+    on_block = (lambda start, stop, EbR, EhsR, EbT: blocks.append((EbR, EhsR, EbT))) if keep_frames else None
+    acc.add_frames(ref_segment, test_segment, shard.frame_stop - shard.frame_start, on_block=on_block)
+
+    frames = None
+    if keep_frames:
+        frames = tuple(np.concatenate([block[i] for block in blocks]) for i in range(3))
+    return acc.state(), frames
+
+
+def _evaluate_shard_job(args):
+    return evaluate_shard(*args)
+
+
+def _shard_jobs(ref_signal, test_signal, fs, shards, keep_frames, NF, hop):
+    for shard in shards:
+        yield (
+            ref_signal[..., shard.sample_start:shard.sample_stop],
+            test_signal[..., shard.sample_start:shard.sample_stop],
+            fs, shard, keep_frames, NF, hop,
+        )
+
+
+def map_shards(ref_signal, test_signal, fs, workers, keep_frames=False, executor=None, NF=2048, hop=None):
+    """Evaluate a pair shard by shard on a process pool; yields ``(shard, state, frames)``."""
+    num_samples = min(np.shape(ref_signal)[-1], np.shape(test_signal)[-1])
+    shards = plan_shards(num_samples, fs, workers, NF, hop)
+    jobs = _shard_jobs(ref_signal, test_signal, fs, shards, keep_frames, NF, hop)
+
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_evaluate_shard_job, jobs))
+    else:
+        results = list(executor.map(_evaluate_shard_job, jobs))
+
+    for shard, (state, frames) in zip(shards, results):
+        yield shard, state, frames
+
+
+def excite_shard(segment, fs, shard, NF=2048, hop=None):
+    """(Eb, Ehs) per frame for one signal over ``shard``'s frames."""
+    model = PEAQ(fs, frame_size=NF, hop_size=hop)
+    blocks = list(model.iter_signal_blocks(segment, shard.frame_stop - shard.frame_start))
+    Eb = np.concatenate([block[2] for block in blocks])
+    Ehs = np.concatenate([block[3] for block in blocks])
+    return Eb, Ehs
+
+
+def _excite_shard_job(args):
+    return excite_shard(*args)
+
+
+def map_signal_shards(signal, fs, workers, executor=None, NF=2048, hop=None):
+    """Excitation patterns of one signal, shard-parallel; yields ``(shard, Eb, Ehs)``."""
+    shards = plan_shards(np.shape(signal)[-1], fs, workers, NF, hop)
+    jobs = ((signal[..., shard.sample_start:shard.sample_stop], fs, shard, NF, hop) for shard in shards)
+
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_excite_shard_job, jobs))
+    else:
+        results = list(executor.map(_excite_shard_job, jobs))
+
+    for shard, (Eb, Ehs) in zip(shards, results):
+        yield shard, Eb, Ehs
+
+
+def evaluate_sharded(ref_signal, test_signal, fs, workers, executor=None, NF=2048, hop=None):
+    """ODG accumulators for a whole pair, computed shard-parallel and merged."""
+    merged = StreamingPEAQ(fs, NF=NF, hop=hop)
+    for _, state, _ in map_shards(ref_signal, test_signal, fs, workers, executor=executor, NF=NF, hop=hop):
+        merged.merge(state)
+    return merged
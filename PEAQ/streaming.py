@@ -0,0 +1,160 @@
+# PEAQ/streaming.py
+import numpy as np
+from .PEAQ import (
+    PEAQ,
+    ADB_THRESHOLD_DB,
+    FRAME_BAND_AXES,
+    band_weights,
+    combine_movs,
+    detection_probability,
+    frame_nmr,
+)
+
+
+class StreamingPEAQ:
+    """Incremental PEAQ evaluator with memory independent of track length.
+
+    Feed aligned reference/test chunks of any size through ``update`` and call
+    ``computeODG`` at the end. Only the last partial frame of each signal and a
+    handful of running sums are kept, so the result equals ``PEAQ.process`` +
+    ``PEAQ.computeODG`` on the concatenated (common-length) signals up to
+    floating-point summation order. Chunks may be mono ``(n,)`` or
+    channels-first ``(C, n)``; with channels every accumulator is a
+    per-channel array. Chunks keep their dtype, as in ``PEAQ.process``, so
+    float64 input is evaluated in float64.
+    """
+
+    ACCUMULATORS = (
+        'num_frames', 'num_samples', 'abs_diff_sum', 'nmr_weighted_sum',
+        'distorted_frames', 'max_detection_prob', 'bw_ref_sum', 'bw_test_sum',
+    )
+
+    def __init__(self, fs, NF=2048, hop=None):
+        self.fs = fs
+        self.model = PEAQ(fs, frame_size=NF, hop_size=hop)
+        self.pq_eval = self.model.pq_eval
+        self._weights = band_weights(self.pq_eval.Nc)
+        self._bw_weights = np.arange(self.pq_eval.Nc)
+
+        # Samples received but not yet paired with the other signal
+        self._ref_pending = None
+        self._test_pending = None
+        # Paired samples not yet covered by a complete frame
+        self._ref_tail = None
+        self._test_tail = None
+        # Paired samples still to drop before the next frame starts (hop > frame size)
+        self._skip = 0
+
+        # Running accumulators
+        self.num_frames = 0
+        self.num_samples = 0
+        self.abs_diff_sum = 0.0
+        self.nmr_weighted_sum = 0.0
+        self.distorted_frames = 0
+        self.max_detection_prob = 0.0
+        self.bw_ref_sum = 0.0
+        self.bw_test_sum = 0.0
+
+    @staticmethod
+    def _join(head, chunk):
+        chunk = np.asarray(chunk)
+        return chunk if head is None else np.concatenate([head, chunk], axis=-1)
+
+    def update(self, ref_chunk, test_chunk, on_block=None):
+        """Add the next aligned chunks; returns the number of frames evaluated (see add_frames for ``on_block``)."""
+        ref = self._join(self._ref_pending, ref_chunk)
+        test = self._join(self._test_pending, test_chunk)
+
+        paired = min(ref.shape[-1], test.shape[-1])
+        self._ref_pending = ref[..., paired:]
+        self._test_pending = test[..., paired:]
+        if paired == 0:
+            return 0
+
+        ref, test = ref[..., :paired], test[..., :paired]
+        self.add_difference(ref, test)
+
+        ref = self._join(self._ref_tail, ref)
+        test = self._join(self._test_tail, test)
+        if self._skip:
+            drop = min(self._skip, ref.shape[-1])
+            ref, test = ref[..., drop:], test[..., drop:]
+            self._skip -= drop
+        num_frames = self.add_frames(ref, test, on_block=self._offset_blocks(on_block))
+
+        # The next frame starts num_frames hops in, which may lie past this chunk
+        consumed = max(num_frames, 0) * self.pq_eval.hopsize
+        self._skip += max(consumed - ref.shape[-1], 0)
+        self._ref_tail = ref[..., consumed:].copy()
+        self._test_tail = test[..., consumed:].copy()
+        return num_frames
+
+    def add_difference(self, ref, test):
+        """Accumulate the added-energy term over equal-length sample runs."""
+        self.abs_diff_sum = self.abs_diff_sum + np.sum(np.abs(test - ref), axis=-1, dtype=np.float64)
+        self.num_samples += np.shape(ref)[-1]
+
+    def _offset_blocks(self, on_block):
+        """on_block with frame indices counted from the first update() instead of this call."""
+        if on_block is None:
+            return None
+        first = self.num_frames
+        return lambda start, stop, *blocks: on_block(first + start, first + stop, *blocks)
+
+    def add_frames(self, ref, test, num_frames=None, on_block=None):
+        """
+        Accumulate the complete frames of ``ref``/``test`` with no carry-over.
+        ``on_block(start, stop, EbR, EhsR, EbT)`` sees each block of per-frame
+        excitations, e.g. to keep them for plotting.
+        """
+        if num_frames is None:
+            num_frames = self.model.num_frames(min(np.shape(ref)[-1], np.shape(test)[-1]))
+        if num_frames <= 0:
+            return 0
+        for start, stop, EbR, EhsR, EbT in self.model.iter_excitation_blocks(ref, test, num_frames):
+            self._accumulate(EbR, EhsR, EbT)
+            if on_block is not None:
+                on_block(start, stop, EbR, EhsR, EbT)
+        return num_frames
+
+    def _accumulate(self, EbR, EhsR, EbT):
+        NMR = frame_nmr(EbT, EhsR)
+        self.num_frames += len(NMR)
+        self.nmr_weighted_sum = self.nmr_weighted_sum + np.sum(NMR * self._weights, axis=FRAME_BAND_AXES)
+        self.distorted_frames = self.distorted_frames + np.sum(np.any(NMR > ADB_THRESHOLD_DB, axis=-1), axis=0)
+        self.max_detection_prob = np.maximum(
+            self.max_detection_prob, np.max(detection_probability(NMR), axis=FRAME_BAND_AXES)
+        )
+        self.bw_ref_sum = self.bw_ref_sum + np.sum(EbR * self._bw_weights, axis=FRAME_BAND_AXES)
+        self.bw_test_sum = self.bw_test_sum + np.sum(EbT * self._bw_weights, axis=FRAME_BAND_AXES)
+
+    def state(self):
+        """Picklable snapshot of the running accumulators."""
+        return {name: getattr(self, name) for name in self.ACCUMULATORS}
+
+    def merge(self, other):
+        """Fold in another evaluator's accumulators (or a ``state()`` dict).
+
+        Used to combine shards that covered disjoint frames and samples.
+        """
+        state = other.state() if isinstance(other, StreamingPEAQ) else other
+        for name in self.ACCUMULATORS:
+            if name == 'max_detection_prob':
+                self.max_detection_prob = np.maximum(self.max_detection_prob, state[name])
+            else:
+                setattr(self, name, getattr(self, name) + state[name])
+        return self
+
+    def computeODG(self):
+        """ODG and MOVs over everything fed so far."""
+        if self.num_frames == 0:
+            raise ValueError("Not enough audio for a single PEAQ frame")
+
+        NMR_avg = self.nmr_weighted_sum / (self.num_frames * self.pq_eval.Nc)
+        ADB = np.log10(self.distorted_frames / self.num_frames + 1e-12)
+        MFPD = self.max_detection_prob
+        AvgBwRef = self.bw_ref_sum / self.num_frames
+        AvgBwTst = self.bw_test_sum / self.num_frames
+        added_energy = self.abs_diff_sum / self.num_samples
+
+        return combine_movs(NMR_avg, ADB, MFPD, AvgBwRef, AvgBwTst, added_energy)
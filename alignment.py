@@ -0,0 +1,286 @@
+## alignment.py
+"""
+Lag estimation between a reference and its recording.
+
+Cross-correlation is computed blockwise with FFTs (overlap-save) and only for
+lags inside a bounded window. Each block costs O(B log B) and memory stays
+O(block + window), so alignment is cheap even on hour-long captures. The
+search runs coarse-to-fine: the amplitude envelope at ~1 kHz gives the
+approximate lag, then a full-rate correlation over a short window around it
+makes the result sample-accurate.
+
+Lag convention (same as the rest of the repo): lag > 0 means the test signal
+starts late, i.e. ``test[n + lag] ~ ref[n]``.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+from scipy.fft import irfft, next_fast_len, rfft
+
+AlignmentResult = namedtuple("AlignmentResult", "lag confidence coarse_lag")
+
+BLOCK_SAMPLES = 1 << 16
+
+
+def xcorr_bounded(ref, test, min_lag, max_lag, block=BLOCK_SAMPLES):
+    """
+    ``c[k - min_lag] = sum_n ref[n] * test[n + k]`` for integer k in
+    [min_lag, max_lag], samples outside ``test`` counting as zero.
+    """
+    width = max_lag - min_lag
+    out = np.zeros(width + 1)
+    for start in range(0, len(ref), block):
+        r = np.asarray(ref[start:start + block], dtype=np.float64)
+        # test samples [start + min_lag, start + len(r) + max_lag), zero padded at the edges
+        lo, hi = start + min_lag, start + len(r) + max_lag
+        src_lo, src_hi = max(lo, 0), min(hi, len(test))
+        if src_hi <= src_lo:
+            continue
+        seg = np.zeros(hi - lo)
+        seg[src_lo - lo:src_hi - lo] = test[src_lo:src_hi]
+        nfft = next_fast_len(len(seg))
+        out += irfft(np.conj(rfft(r, nfft)) * rfft(seg, nfft), nfft)[:width + 1]
+    return out
+
+
+def envelope(signal, factor):
+    """Mean absolute amplitude over consecutive blocks of ``factor`` samples."""
+    signal = np.asarray(signal)
+    n = len(signal) // factor * factor
+    env = np.abs(signal[:n]).reshape(-1, factor).mean(axis=1, dtype=np.float64)
+    return env - env.mean() if len(env) else env
+
+
+def estimate_lag(ref, test, sr, max_lag_seconds=1.0, envelope_rate=1000, refine_seconds=60.0):
+    """
+    Coarse-to-fine lag of ``test`` relative to ``ref``.
+
+    ``confidence`` is the normalized correlation (-1..1) at the chosen lag
+    over the refinement excerpt; values near 1 mean a clean match, values
+    near 0 mean the signals did not correlate and the lag should not be
+    trusted.
+    """
+    max_lag = int(round(max_lag_seconds * sr))
+    factor = max(1, int(sr // envelope_rate))
+
+    # Coarse: envelopes at ~envelope_rate Hz
+    max_env_lag = -(-max_lag // factor)
+    env_corr = xcorr_bounded(envelope(ref, factor), envelope(test, factor), -max_env_lag, max_env_lag)
+    coarse_lag = (int(np.argmax(env_corr)) - max_env_lag) * factor
+
+    # Fine: full rate, a few envelope blocks either side of the coarse lag
+    window = 2 * factor
+    excerpt = ref[:int(refine_seconds * sr)] if refine_seconds else ref
+    fine_corr = xcorr_bounded(excerpt, test, coarse_lag - window, coarse_lag + window)
+    lag = coarse_lag - window + int(np.argmax(fine_corr))
+
+    # Normalize by the energy of the overlapping samples at that lag
+    start = max(0, -lag)
+    stop = min(len(excerpt), len(test) - lag)
+    if stop <= start:
+        return AlignmentResult(lag, 0.0, coarse_lag)
+    r = np.asarray(excerpt[start:stop], dtype=np.float64)
+    t = np.asarray(test[start + lag:stop + lag], dtype=np.float64)
+    denom = np.sqrt(np.dot(r, r) * np.dot(t, t))
+    confidence = float(np.dot(r, t) / denom) if denom > 0 else 0.0
+    return AlignmentResult(lag, confidence, coarse_lag)
+
+
+def apply_lag(ref, test, lag):
+    """
+    Drop the leading offset from whichever signal starts late and truncate
+    both to a common length (along the last axis, so (C, N) works too).
+    """
+    if lag > 0:
+        test = test[..., lag:]
+    elif lag < 0:
+        ref = ref[..., -lag:]
+    n = min(ref.shape[-1], test.shape[-1])
+    return ref[..., :n], test[..., :n]
+
+
+# ---------------------------------------------------------------------------
+# Clock drift: piecewise-linear lag tracking and warping
+# ---------------------------------------------------------------------------
+
+DriftAnchor = namedtuple("DriftAnchor", "position lag confidence")
+
+
+def _mono(block):
+    """float64 downmix of a (n,) or channels-first (C, n) block."""
+    block = np.asarray(block, dtype=np.float64)
+    return block if block.ndim == 1 else block.mean(axis=0)
+
+
+def _measure_anchor(read_ref, read_test, center, half, predicted, search):
+    """Lag of the test around ref sample ``center``, searched within ``predicted ± search``."""
+    r0 = max(0, center - half)
+    ref = _mono(read_ref(r0, center + half))
+    t0 = max(0, r0 + predicted - search)
+    test = _mono(read_test(t0, r0 + len(ref) + predicted + search))
+    if len(ref) == 0 or len(test) == 0:
+        return float(predicted), 0.0
+
+    # local lag k relates ref[n] to test[n + k]; global lag = k + t0 - r0
+    k_lo, k_hi = r0 + predicted - search - t0, r0 + predicted + search - t0
+    corr = xcorr_bounded(ref, test, k_lo, k_hi)
+    peak = int(np.argmax(corr))
+    k = k_lo + peak
+    lag = float(k + t0 - r0)
+    if 0 < peak < len(corr) - 1:
+        # Sub-sample peak from a parabola through the neighbours
+        y0, y1, y2 = corr[peak - 1:peak + 2]
+        denom = y0 - 2 * y1 + y2
+        if denom < 0:
+            lag += 0.5 * (y0 - y2) / denom
+            lag = round(lag * INTERP_PHASES) / INTERP_PHASES
+
+    seg = test[max(k, 0):k + len(ref)]
+    r = ref[max(-k, 0):max(-k, 0) + len(seg)]
+    denom = np.sqrt(np.dot(r, r) * np.dot(seg, seg))
+    return lag, float(np.dot(r, seg) / denom) if denom > 0 else 0.0
+
+
+def _lag_between(a, b, n):
+    """Lag at positions ``n`` on the line through anchors ``a`` and ``b`` (extrapolates)."""
+    if b.position == a.position:
+        return np.full(len(n), float(a.lag))
+    slope = (b.lag - a.lag) / (b.position - a.position)
+    return a.lag + slope * (n - a.position)
+
+
+INTERP_PHASES = 512
+
+
+@lru_cache(maxsize=8)
+def _sinc_table(half_taps, phases=INTERP_PHASES, beta=8.0):
+    """Kaiser-windowed sinc weights for ``phases`` fractional offsets in [0, 1)."""
+    frac = np.arange(phases) / phases
+    offsets = np.arange(-half_taps + 1, half_taps + 1)
+    d = frac[:, None] - offsets[None, :]
+    window = np.i0(beta * np.sqrt(np.clip(1 - (d / half_taps) ** 2, 0, 1))) / np.i0(beta)
+    table = np.sinc(d) * window
+    return table / table.sum(axis=1, keepdims=True)
+
+
+def _sinc_interpolate(read_test, x, half_taps):
+    """Band-limited test samples (per channel for (C, n) reads) at fractional positions ``x``."""
+    base = np.floor(x).astype(np.int64)
+    phase = np.minimum(((x - base) * INTERP_PHASES + 0.5).astype(np.int64), INTERP_PHASES)
+    carry = phase == INTERP_PHASES  # rounds up to the next whole sample
+    base += carry
+    phase[carry] = 0
+
+    lo = int(base.min()) - half_taps + 1
+    hi = int(base.max()) + half_taps + 1
+    avail = np.asarray(read_test(max(lo, 0), hi), dtype=np.float32)
+    src = np.zeros(avail.shape[:-1] + (hi - lo,), dtype=np.float32)
+    src[..., max(0, -lo):max(0, -lo) + avail.shape[-1]] = avail
+
+    table = _sinc_table(half_taps).astype(np.float32)
+    out = np.zeros(avail.shape[:-1] + (len(x),), dtype=np.float32)
+    rel = base - lo
+    for j, offset in enumerate(range(-half_taps + 1, half_taps + 1)):
+        out += src[..., rel + offset] * table[phase, j]
+    return out
+
+
+def iter_drift_corrected(read_ref, read_test, num_samples, test_length, sr, initial_lag=0,
+                         window_seconds=1.0, hop_seconds=30.0, search_seconds=0.05,
+                         min_confidence=0.3, half_taps=8, chunk=1 << 16, anchors=None):
+    """
+    One forward pass over a long pair that keeps the test sample-aligned even
+    when the two clocks drift apart.
+
+    ``read_ref(start, stop)`` / ``read_test(start, stop)`` return mono or
+    channels-first (C, n) samples (array slices or file reads); lags are
+    measured on the downmix and every channel is warped alike. Every ``hop_seconds`` the lag is re-measured
+    on a ``window_seconds`` window, searching only ``search_seconds`` around
+    the lag predicted by the previous anchors. Between anchors the lag is
+    interpolated linearly, and the test is resampled at the resulting
+    fractional positions. Anchors below ``min_confidence`` (silence, for
+    example) are replaced by the prediction.
+
+    Yields aligned ``(ref_chunk, test_chunk)`` float32 pairs. If ``anchors``
+    is a list, each DriftAnchor is appended to it as it is measured.
+    """
+    half = int(window_seconds * sr) // 2
+    hop = max(1, int(hop_seconds * sr))
+    search = max(1, int(search_seconds * sr))
+    centers = list(range(min(half, num_samples // 2), num_samples, hop))
+    if anchors is None:
+        anchors = []
+
+    def measure(center, predicted):
+        lag, confidence = _measure_anchor(read_ref, read_test, center, half, int(round(predicted)), search)
+        if confidence < min_confidence:
+            lag = float(predicted)
+        anchor = DriftAnchor(center, lag, confidence)
+        anchors.append(anchor)
+        return anchor
+
+    def emit(start, stop, a, b):
+        for s in range(start, stop, chunk):
+            n = np.arange(s, min(s + chunk, stop), dtype=np.float64)
+            x = n + _lag_between(a, b, n)
+            keep = x <= test_length - 1
+            if not keep.all():
+                n, x = n[keep], x[keep]
+                if len(n) == 0:
+                    return False
+            ref_chunk = np.asarray(read_ref(int(n[0]), int(n[-1]) + 1), dtype=np.float32)
+            yield ref_chunk, _sinc_interpolate(read_test, x, half_taps)
+            if not keep.all():
+                return False
+        return True
+
+    first = measure(centers[0], initial_lag)
+    prev2, prev = first, first
+    if len(centers) > 1:
+        prev = measure(centers[1], first.lag)
+    pos = 0
+    for center in centers[2:]:
+        slope_lag = _lag_between(prev2, prev, np.array([center], dtype=np.float64))[0]
+        nxt = measure(center, slope_lag)
+        if not (yield from emit(pos, prev.position, prev2, prev)):
+            return
+        pos, prev2, prev = prev.position, prev, nxt
+    yield from emit(pos, num_samples, prev2, prev)
+
+
+def fit_drift(anchors, sr, min_confidence=0.3):
+    """(offset samples, drift in ppm) of a least-squares line through confident anchors."""
+    good = [a for a in anchors if a.confidence >= min_confidence]
+    if len(good) < 2:
+        return (good[0].lag if good else 0), 0.0
+    pos = np.array([a.position for a in good], dtype=np.float64)
+    lag = np.array([a.lag for a in good], dtype=np.float64)
+    slope, offset = np.polyfit(pos, lag, 1)
+    return float(offset), float(slope * 1e6)
+
+
+def correct_drift_file(ref_path, test_path, output_path, initial_lag=0, **kwargs):
+    """
+    Write ``test_path`` warped onto ``ref_path``'s timeline as a mono float
+    WAV, streaming both files once. Returns the DriftAnchor list.
+    """
+    import soundfile as sf
+
+    ref_info, test_info = sf.info(ref_path), sf.info(test_path)
+    if ref_info.samplerate != test_info.samplerate:
+        raise ValueError("Drift correction needs both files at the same sample rate")
+
+    def reader(path):
+        def read(start, stop):
+            block, _ = sf.read(path, start=start, stop=stop, dtype='float32', always_2d=True)
+            return block.mean(axis=1)
+        return read
+
+    anchors = []
+    with sf.SoundFile(output_path, 'w', samplerate=ref_info.samplerate, channels=1, subtype='FLOAT') as out:
+        for _, test_chunk in iter_drift_corrected(reader(ref_path), reader(test_path), ref_info.frames,
+                                                  test_info.frames, ref_info.samplerate,
+                                                  initial_lag=initial_lag, anchors=anchors, **kwargs):
+            out.write(test_chunk)
+    return anchors
@@ -0,0 +1,168 @@
+## audio_metadata.py
+"""
+One place to ask "how long is this file, at what rate, how many channels".
+
+Reads container headers (soundfile, then ffprobe) instead of decoding, and
+caches results by (path, size, mtime) so the repeated lookups made by the
+recorder, playback helpers and mode loops cost one probe per file.
+"""
+import json
+import os
+import shutil
+import subprocess
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import soundfile as sf
+import config
+
+AudioInfo = namedtuple("AudioInfo", "duration samplerate channels frames source")
+
+_CACHE_MAX_ENTRIES = 4096
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+def _probe_soundfile(path):
+    info = sf.info(path)
+    if info.samplerate <= 0 or info.frames <= 0:
+        raise ValueError("no frame count in header")
+    return AudioInfo(info.frames / info.samplerate, info.samplerate, info.channels, info.frames, "soundfile")
+
+
+def _ffprobe_command():
+    if shutil.which("ffprobe"):
+        return "ffprobe"
+    try:
+        from audio_utils import validate_ffmpeg
+        ffmpeg = validate_ffmpeg()
+    except Exception:
+        return None
+    # ffprobe ships next to ffmpeg
+    candidate = os.path.join(os.path.dirname(ffmpeg), "ffprobe" + os.path.splitext(ffmpeg)[1])
+    return candidate if os.path.isfile(candidate) else None
+
+
+def _probe_ffprobe(path):
+    ffprobe = _ffprobe_command()
+    if not ffprobe:
+        raise RuntimeError("ffprobe not found")
+    result = subprocess.run(
+        [ffprobe, "-v", "error", "-select_streams", "a:0",
+         "-show_entries", "format=duration:stream=sample_rate,channels,duration",
+         "-of", "json", path],
+        capture_output=True, text=True, timeout=30
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "ffprobe failed")
+    data = json.loads(result.stdout or "{}")
+    stream = (data.get("streams") or [{}])[0]
+    duration = float(data.get("format", {}).get("duration") or stream.get("duration"))
+    samplerate = int(stream.get("sample_rate", 0))
+    return AudioInfo(duration, samplerate, int(stream.get("channels", 0)),
+                     int(round(duration * samplerate)), "ffprobe")
+
+
+def _probe_decode(path):
+    # Last resort when ffprobe is unavailable: full decode through pydub
+    from pydub import AudioSegment
+    audio = AudioSegment.from_file(path)
+    return AudioInfo(len(audio) / 1000.0, audio.frame_rate, audio.channels,
+                     int(audio.frame_count()), "decode")
+
+
+def _probe_uncached(path):
+    errors = []
+    for probe in (_probe_soundfile, _probe_ffprobe, _probe_decode):
+        try:
+            return probe(path)
+        except Exception as e:
+            errors.append(f"{probe.__name__[7:]}: {e}")
+    raise RuntimeError(f"Could not read audio metadata for {path} ({'; '.join(errors)})")
+
+
+def probe_audio(path):
+    """AudioInfo for ``path`` from headers; cached until the file changes."""
+    key = _file_key(path)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    info = _probe_uncached(path)
+    with _cache_lock:
+        _cache[key] = info
+        while len(_cache) > _CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return info
+
+
+def get_audio_duration(path):
+    """Duration in seconds of any audio file (wav, mp3, m4a, aac, flac, ...)."""
+    return probe_audio(path).duration
+
+
+def clear_metadata_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def validate_audio_files(paths, workers=None):
+    """
+    Probe ``paths`` in parallel before a long batch starts.
+    Returns (valid, invalid): {path: AudioInfo} and {path: error message}.
+    """
+    paths = list(paths)
+    workers = workers or getattr(config, 'METADATA_PROBE_WORKERS', 8)
+
+    def check(path):
+        try:
+            info = probe_audio(path)
+            if info.duration <= 0:
+                return path, None, "zero duration"
+            return path, info, None
+        except Exception as e:
+            return path, None, str(e)
+
+    valid, invalid = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(paths) or 1))) as pool:
+        for path, info, error in pool.map(check, paths):
+            if error is None:
+                valid[path] = info
+            else:
+                invalid[path] = error
+    return valid, invalid
+
+
+def validate_audio_folder(folder, extensions=None, workers=None):
+    """validate_audio_files over every file in ``folder`` with a supported extension."""
+    if extensions is None:
+        from utils.validation_utils import SUPPORTED_AUDIO_EXTENSIONS
+        extensions = SUPPORTED_AUDIO_EXTENSIONS
+    extensions = {ext.lower() for ext in extensions}
+    paths = sorted(
+        os.path.join(folder, name) for name in os.listdir(folder)
+        if os.path.splitext(name)[1].lower() in extensions
+    )
+    return validate_audio_files(paths, workers)
+
+
+def filter_playable(paths, workers=None):
+    """
+    Validate ``paths`` up front, print a short report and return only the
+    playable ones (in input order) so a batch never dies halfway on a bad file.
+    """
+    paths = list(paths)
+    valid, invalid = validate_audio_files(paths, workers)
+    total = sum(info.duration for info in valid.values())
+    print(f"🔎 Probed {len(paths)} files: {len(valid)} OK, {len(invalid)} unreadable "
+          f"({total / 60:.1f} min of audio)")
+    for path, error in invalid.items():
+        print(f"   ⚠️ Skipping {os.path.basename(path)}: {error}")
+    return [path for path in paths if path in valid]
@@ -2,13 +2,15 @@
 import os
 import wave
 import numpy as np
-import librosa
 import subprocess
 import soundfile as sf
 import shutil
 import config
-
-from pydub import AudioSegment
+import audio_metadata
+from decoded_audio_cache import get_decoded_audio_cache
+from wav_slicer import is_canonical_wav, trim_wav
+from alignment import apply_lag, estimate_lag
+from resampler import StreamingResampler, output_length, resample
 
 def validate_ffmpeg():
     """
@@ -40,23 +42,194 @@ def validate_ffmpeg():
 def get_audio_duration(file):
     """
     Get duration of any audio file (wav, mp3, m4a, aac, flac, etc.)
-    Requires FFmpeg to be installed and available in PATH.
+    from its headers; see audio_metadata.probe_audio.
+    """
+    return audio_metadata.get_audio_duration(file)
+
+# PCM containers soundfile reads without any real decoding
+_CANONICAL_FORMATS = {'WAV', 'WAVEX', 'RF64', 'W64'}
+
+def _read_native(path, target_sr, mono, formats=None, allow_resample=False):
     """
-    audio = AudioSegment.from_file(file)
-    return len(audio) / 1000.0  # Duration in seconds
+    Samples straight from soundfile when the file is already at ``target_sr``
+    (and in one of ``formats``, if given); None otherwise. With
+    ``allow_resample`` other rates are read too and brought to ``target_sr``
+    by the polyphase resampler.
+    Layout matches librosa.load: (N,) mono or (channels, N).
+    """
+    try:
+        info = sf.info(path)
+    except Exception:
+        return None  # not a container soundfile can open (mp3 on old libsndfile, m4a, ...)
+    if target_sr is not None and info.samplerate != target_sr and not allow_resample:
+        return None
+    if formats is not None and info.format not in formats:
+        return None
+    audio, sr = sf.read(path, dtype='float32', always_2d=True)
+    audio = audio.mean(axis=1) if mono or audio.shape[1] == 1 else np.ascontiguousarray(audio.T)
+    if target_sr is not None and sr != target_sr:
+        audio, sr = resample(audio, sr, target_sr), target_sr
+    return sr, audio
+
+def _normalize(audio):
+    audio = audio.astype(np.float32, copy=False)
+    peak = np.max(np.abs(audio)) if audio.size else 0
+    if peak > 0:
+        audio /= peak  # Normalize
+    return audio
+
+def _decode(path, target_sr, mono, fast):
+    native = _read_native(path, target_sr, mono, allow_resample=True) if fast else None
+    if native is not None:
+        sr, audio = native
+        print(f"📥 Decoded {os.path.basename(path)} via soundfile → {sr}Hz (polyphase resample if needed)")
+    else:
+        import librosa
+        # librosa/audioread only decodes; the rate change is ours, same as above
+        audio, sr = librosa.load(path, sr=None, mono=mono)
+        if target_sr is not None and sr != target_sr:
+            audio, sr = resample(audio, sr, target_sr), target_sr
+        print(f"📥 Decoded {os.path.basename(path)} via librosa decode + polyphase resample → {sr}Hz")
+    return sr, _normalize(audio)
 
 def load_audio(path, target_sr=44100, mono=True):
-    """Stable audio loader using librosa for resampling and normalization"""
-    audio, sr = librosa.load(path, sr=target_sr, mono=mono)
-    audio = audio.astype(np.float32)
-    if np.max(np.abs(audio)) > 0:
-        audio /= np.max(np.abs(audio))  # Normalize
+    """
+    Stable audio loader with peak normalization. PCM WAVs already at
+    ``target_sr`` are read directly with soundfile. Anything else is decoded
+    once (soundfile, or librosa imported only for codecs soundfile cannot
+    open), resampled by resampler.resample into the decoded-audio cache and
+    later served from it as a read-only memmap.
+    """
+    fast = getattr(config, 'AUDIO_FAST_LOAD', True)
+    native = _read_native(path, target_sr, mono, _CANONICAL_FORMATS) if fast else None
+    if native is not None:
+        sr, audio = native
+        print(f"📥 Loaded {os.path.basename(path)} via soundfile ({sr}Hz, no resample)")
+        return sr, _normalize(audio)
+
+    cache = get_decoded_audio_cache() if target_sr is not None else None
+    if cache is None:
+        return _decode(path, target_sr, mono, fast)
+
+    key = cache.key(path, target_sr, mono)
+    audio = cache.load(key)
+    if audio is not None:
+        print(f"♻️ Loaded {os.path.basename(path)} from decoded-audio cache (mmap)")
+        return target_sr, audio
+
+    sr, audio = _decode(path, target_sr, mono, fast)
+    cache.store(key, audio)
     return sr, audio
 
+def prepare_audio(samples, sr, target_sr=44100, mono=True):
+    """
+    load_audio for samples already in memory (e.g. an AUX capture):
+    (frames, channels) integer PCM is scaled like soundfile's float reads,
+    then downmixed, resampled and peak normalized exactly as load_audio does.
+    """
+    audio = np.asarray(samples)
+    if np.issubdtype(audio.dtype, np.integer):
+        audio = audio.astype(np.float32) / np.float32(-np.iinfo(audio.dtype).min)
+    audio = audio.astype(np.float32, copy=False).reshape(len(audio), -1)
+    audio = audio.mean(axis=1) if mono or audio.shape[1] == 1 else np.ascontiguousarray(audio.T)
+    if target_sr is not None and sr != target_sr:
+        audio, sr = resample(audio, sr, target_sr), target_sr
+    return sr, _normalize(audio)
+
+def analysis_sample_rate(ref_path, *test_paths):
+    """
+    Rate to run PEAQ at: config.ANALYSIS_SAMPLE_RATE when set, otherwise the
+    reference's own rate, so pairs recorded at a common rate (48kHz captures
+    of 48kHz sources) are never resampled. Tests at another rate are
+    resampled to it by load_audio. Falls back to 44.1kHz when the reference
+    header cannot be read.
+    """
+    forced = getattr(config, 'ANALYSIS_SAMPLE_RATE', None)
+    if forced:
+        return int(forced)
+    try:
+        sr = audio_metadata.probe_audio(ref_path).samplerate
+    except Exception:
+        return 44100
+    for path in test_paths:
+        try:
+            test_sr = audio_metadata.probe_audio(path).samplerate
+        except Exception:
+            continue
+        if test_sr != sr:
+            print(f"🔁 {os.path.basename(path)} is {test_sr}Hz; resampling it to the reference's {sr}Hz")
+    return sr or 44100
+
+def _iter_mono_blocks(path, chunk_frames, target_sr=None):
+    """Mono float32 blocks of ``path``, resampled on the fly to ``target_sr`` if the rates differ."""
+    blocks = (block.mean(axis=1) for block in
+              sf.blocks(path, blocksize=chunk_frames, dtype='float32', always_2d=True))
+    native_sr = sf.info(path).samplerate
+    if target_sr is None or native_sr == target_sr:
+        yield from blocks
+        return
+    stream = StreamingResampler(native_sr, target_sr)
+    for block in blocks:
+        yield stream.process(block)
+    yield stream.flush()
+
+def audio_frames(path, target_sr=None):
+    """Frame count of ``path`` once resampled to ``target_sr`` (header only)."""
+    info = sf.info(path)
+    if target_sr is None or info.samplerate == target_sr:
+        return info.frames
+    return output_length(info.frames, info.samplerate, target_sr)
+
+def audio_peak(path, chunk_frames=441000, target_sr=None):
+    """Peak of the mono downmix (at ``target_sr``), as used by load_audio's normalization."""
+    peak = np.float32(0.0)
+    for mono in _iter_mono_blocks(path, chunk_frames, target_sr):
+        if mono.size:
+            peak = max(peak, np.max(np.abs(mono)))
+    return peak
+
+def read_audio_segment(path, start, stop, peak):
+    """Mono float32 samples [start, stop) scaled by ``peak`` like load_audio."""
+    block, _ = sf.read(path, start=start, stop=stop, dtype='float32', always_2d=True)
+    mono = block.mean(axis=1)
+    if peak > 0:
+        mono /= peak
+    return mono
+
+def iter_audio_chunks(path, chunk_frames=441000, target_sr=44100, skip_samples=0):
+    """
+    Yield mono float32 chunks of ``chunk_frames`` samples at ``target_sr``,
+    normalized exactly like load_audio, without holding the whole file in
+    memory. Files at another rate are resampled chunk by chunk with a
+    StreamingResampler (``skip_samples`` counts target-rate samples). Reads
+    the file twice (peak, then data), so it needs a format soundfile can open.
+    """
+    peak = audio_peak(path, chunk_frames, target_sr)
+
+    pending, skip = [], skip_samples
+    buffered = 0
+    for mono in _iter_mono_blocks(path, chunk_frames, target_sr):
+        if skip:
+            dropped = min(skip, len(mono))
+            mono, skip = mono[dropped:], skip - dropped
+        if not len(mono):
+            continue
+        if peak > 0:
+            mono = mono / peak
+        pending.append(mono)
+        buffered += len(mono)
+        while buffered >= chunk_frames:
+            joined = np.concatenate(pending)
+            yield joined[:chunk_frames]
+            pending, buffered = [joined[chunk_frames:]], buffered - chunk_frames
+    if buffered:
+        yield np.concatenate(pending)
+
 def quick_quality_check(ref_path, test_path):
     """Quick quality check to identify major issues"""
-    ref_sr, ref_audio = load_audio(ref_path)
-    test_sr, test_audio = load_audio(test_path)
+    sr = analysis_sample_rate(ref_path, test_path)
+    ref_sr, ref_audio = load_audio(ref_path, target_sr=sr)
+    test_sr, test_audio = load_audio(test_path, target_sr=sr)
 
     min_len = min(len(ref_audio), len(test_audio))
     ref_audio = ref_audio[:min_len]
@@ -102,56 +275,53 @@ def quick_quality_check(ref_path, test_path):
 
     return ref_bw - test_bw, test_rms / ref_rms
 
-def align_signals_by_cross_correlation(sig1, sig2, original_sr=44100, downsample_sr=8000, use_alignment=True):
+def align_signals_by_cross_correlation(sig1, sig2, original_sr=44100, use_alignment=True, max_lag_seconds=None):
     """
-    Efficient alignment using downsampled cross-correlation for lag estimation,
-    but extracts aligned segments from original high-res signals.
+    Align two signals with the FFT, lag-bounded coarse-to-fine search in
+    alignment.estimate_lag (envelope lag, then sample-accurate refinement).
     Set use_alignment=False to skip alignment and return original signals.
+    Returns (sig1_aligned, sig2_aligned, lag); lag > 0 means sig2 starts late.
     """
     # Skip alignment if sample-level delay compensation is already applied
     if (hasattr(config, 'ENABLE_AUTO_DELAY_COMPENSATION') and 
         config.ENABLE_AUTO_DELAY_COMPENSATION):
         print("🔧 Sample-level delay compensation enabled - skipping cross-correlation alignment")
         use_alignment = False
-    
+
     if not use_alignment:
         print("🚫 Alignment is turned OFF. Returning original signals.")
         min_len = min(len(sig1), len(sig2))
         return sig1[:min_len], sig2[:min_len], 0
 
-    # Step 1: Downsample for alignment
-    sig1_ds = librosa.resample(sig1, orig_sr=original_sr, target_sr=downsample_sr)
-    sig2_ds = librosa.resample(sig2, orig_sr=original_sr, target_sr=downsample_sr)
-
-    # Step 2: Find lag
-    corr = np.correlate(sig2_ds, sig1_ds, mode='full')
-    lag_ds = np.argmax(corr) - len(sig1_ds) + 1
-    lag_orig = int(round(lag_ds * (original_sr / downsample_sr)))
-
-    print(f"⚡ Fast cross-correlation lag: {lag_ds} samples @ {downsample_sr}Hz → {lag_orig} samples @ 44.1kHz")
-
-    # Step 3: Align original full-res signals
-    if lag_orig > 0:
-        sig2_aligned = sig2[lag_orig:]
-        sig1_aligned = sig1[:len(sig2_aligned)]
-    elif lag_orig < 0:
-        sig1_aligned = sig1[-lag_orig:]
-        sig2_aligned = sig2[:len(sig1_aligned)]
-    else:
-        sig1_aligned = sig1
-        sig2_aligned = sig2
-
-    # Step 4: Truncate to same length
-    min_len = min(len(sig1_aligned), len(sig2_aligned))
-    sig1_aligned = sig1_aligned[:min_len]
-    sig2_aligned = sig2_aligned[:min_len]
+    if max_lag_seconds is None:
+        max_lag_seconds = getattr(config, 'ALIGN_MAX_LAG_SECONDS', 1.0)
+    result = estimate_lag(sig1, sig2, original_sr, max_lag_seconds=max_lag_seconds)
+    print(f"⚡ Cross-correlation lag: {result.lag} samples "
+          f"({result.lag / original_sr * 1000:.1f}ms), confidence {result.confidence:.2f}")
 
+    sig1_aligned, sig2_aligned = apply_lag(sig1, sig2, result.lag)
+    min_len = len(sig1_aligned)
     print(f"✅ Aligned signals length: {min_len} samples ({min_len/original_sr:.2f} sec)")
 
-    return sig1_aligned, sig2_aligned, lag_orig
+    return sig1_aligned, sig2_aligned, result.lag
+
+def _trim_canonical_wav(input_path, output_path, start_sec, duration_sec):
+    """
+    Trim in-process when the input already is 44.1kHz stereo 16-bit PCM (the
+    format the ffmpeg paths below produce); returns False to fall back to ffmpeg.
+    """
+    if not is_canonical_wav(input_path):
+        return False
+    out_dir = os.path.dirname(output_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    trim_wav(input_path, output_path, start_sec, duration_sec)
+    return True
 
 def trim_audio_with_ffmpeg(input_path, output_path, start_sec, duration_sec):
     """Trim audio using FFmpeg with hard duration and start time"""
+    if _trim_canonical_wav(input_path, output_path, start_sec, duration_sec):
+        return True
     try:
         ffmpeg_cmd = validate_ffmpeg()
     except RuntimeError as e:
@@ -177,6 +347,9 @@ def convert_and_trim_audio_with_ffmpeg(input_path, output_path, start_sec=0, dur
     Convert and trim audio using FFmpeg with robust format handling
     Handles ADPCM_MS, MP3, M4A, and other formats → standardized WAV output
     """
+    if _trim_canonical_wav(input_path, output_path, start_sec, duration_sec):
+        print(f"✅ Trimmed: {os.path.basename(input_path)} → {os.path.basename(output_path)}")
+        return True
     try:
         ffmpeg_cmd = validate_ffmpeg()
     except RuntimeError as e:
@@ -221,14 +394,6 @@ def trim_test_audio_with_delay_compensation(input_path, output_path, start_sec=0
     Trim audio with automatic delay compensation for test files
     Automatically trims 9ms from test files to align with reference
     """
-    try:
-        ffmpeg_cmd = validate_ffmpeg()
-    except RuntimeError as e:
-        print(str(e))
-        return False
-        
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    
     # Calculate actual start time with delay compensation
     actual_start = start_sec
     if (is_test_file and 
@@ -237,7 +402,20 @@ def trim_test_audio_with_delay_compensation(input_path, output_path, start_sec=0
         hasattr(config, 'TEST_AUDIO_START_DELAY')):
         actual_start += config.TEST_AUDIO_START_DELAY
         print(f"🔧 Applying {config.TEST_AUDIO_START_DELAY*1000:.1f}ms delay compensation to test file")
-    
+
+    delay_info = f" (with {config.TEST_AUDIO_START_DELAY*1000:.1f}ms compensation)" if is_test_file and config.ENABLE_AUTO_DELAY_COMPENSATION else ""
+    if _trim_canonical_wav(input_path, output_path, actual_start, duration_sec):
+        print(f"✅ Processed: {os.path.basename(input_path)} → {os.path.basename(output_path)}{delay_info} (sample-accurate trim)")
+        return True
+
+    try:
+        ffmpeg_cmd = validate_ffmpeg()
+    except RuntimeError as e:
+        print(str(e))
+        return False
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
     cmd = [
         ffmpeg_cmd, "-y",
         "-ss", str(actual_start),  # Start with delay compensation
@@ -266,7 +444,6 @@ def trim_test_audio_with_delay_compensation(input_path, output_path, start_sec=0
         print(f"Error: {result.stderr}")
         return False
     
-    delay_info = f" (with {config.TEST_AUDIO_START_DELAY*1000:.1f}ms compensation)" if is_test_file and config.ENABLE_AUTO_DELAY_COMPENSATION else ""
     print(f"✅ Processed: {os.path.basename(input_path)} → {os.path.basename(output_path)}{delay_info}")
     return True
 
@@ -1,13 +1,20 @@
 import subprocess
 import os
 import datetime
+import json
 import re
 import threading
 import time
 
-from audio_utils import get_audio_duration
+import config
+from audio_utils import get_audio_duration, load_audio
+from capture_stream import (CaptureHealthLog, CaptureMonitor, CaptureProblem, PcmCapture, archive_async,
+                            ffmpeg_capture_command)
+from wav_slicer import WAVE_FORMAT_PCM, read_wav_layout, trim_wav
 from config import output_audio_dir, selected_audio_device  # Add selected_audio_device import
 
+DELAY_BEFORE_PLAY = 3.0  # seconds of pre-roll cut from the start of every take
+
 class AuxRecorder:
     def __init__(self, ffmpeg_path="ffmpeg"):
         self.output_file = None
@@ -15,6 +22,106 @@ class AuxRecorder:
         self.tracker = self
         self.interruptions = []
         self.ffmpeg_path = ffmpeg_path
+        # Stream mode: takes cut from their capture waiting for post_process, and
+        # trimmed takes waiting for analysis
+        self._captures = []
+        self._captured_audio = {}
+        self._live_results = {}
+        self._capture_lock = threading.Lock()
+        # Stream mode: set when a take is over (aborted, or the end of playback
+        # detected) so the player can stop waiting too
+        self.playback_stop = threading.Event()
+        self.health = CaptureHealthLog(getattr(config, 'MONITOR_RECENT_TAKES', 20))
+        # Capture session: one continuous capture for a whole batch, its offset
+        # index, and the playback events of the take in progress
+        self._session = None
+        self._session_started = None
+        self.session_index = []
+        self._take_events = []
+        self._take_monitor = None
+
+    @staticmethod
+    def stream_capture_enabled():
+        return getattr(config, 'AUX_CAPTURE_MODE', 'file') == 'stream'
+
+    @classmethod
+    def adaptive_stop_enabled(cls):
+        return cls.stream_capture_enabled() and getattr(config, 'AUX_ADAPTIVE_STOP', True)
+
+    @classmethod
+    def session_capture_enabled(cls):
+        return cls.stream_capture_enabled() and getattr(config, 'AUX_CAPTURE_SESSION', False)
+
+    def start_session(self):
+        """
+        Batch modes: start one continuous capture that every following
+        start() cuts its take from, instead of opening the device per file.
+        Returns True while a session is running; False leaves the per-file
+        captures in use (sessions disabled, or the device gave no audio).
+        """
+        if self._session is not None:
+            return True
+        if not self.session_capture_enabled() or not self.selected_device:
+            return False
+
+        samplerate = getattr(config, 'AUX_CAPTURE_SAMPLE_RATE', 44100)
+        channels = getattr(config, 'AUX_CAPTURE_CHANNELS', 2)
+        command = ffmpeg_capture_command(self.ffmpeg_path, self.selected_device, None, samplerate, channels)
+        capture = PcmCapture(command, samplerate, channels,
+                             capacity_seconds=getattr(config, 'AUX_SESSION_BUFFER_SECONDS', 900))
+        print(f"\n🎙️ Starting continuous capture session on '{self.selected_device}'...")
+        try:
+            capture.start()
+        except Exception as e:
+            print(f"❌ Could not start the capture session ({e}); recording each file separately")
+            return False
+        if not capture.wait_for_frames(1, getattr(config, 'MONITOR_STALL_SECONDS', 5.0)):
+            print("❌ Capture session produced no audio; recording each file separately")
+            capture.stop()
+            return False
+
+        self._session = capture
+        self._session_started = datetime.datetime.now()
+        self.session_index = []
+        return True
+
+    def end_session(self):
+        """Stop the session capture and save its offset index as JSON; returns the index path."""
+        capture, self._session = self._session, None
+        if capture is None:
+            return None
+        capture.stop()
+        timestamp = self._session_started.strftime("%Y%m%d_%H%M%S")
+        index_path = os.path.join(output_audio_dir, f"capture_session_{timestamp}.json")
+        os.makedirs(output_audio_dir, exist_ok=True)
+        with open(index_path, 'w') as f:
+            json.dump({"samplerate": capture.samplerate, "channels": capture.channels,
+                       "frames": capture.buffer.frames_written, "takes": self.session_index}, f, indent=2)
+        print(f"📑 Capture session ended after {capture.duration:.1f}s; offset index saved to {index_path}")
+        return index_path
+
+    def log_playback_event(self, name):
+        """Players report "play" / "stop" here; the capture monitor places them on the sample clock."""
+        timestamp = time.monotonic()
+        with self._capture_lock:
+            self._take_events.append((name, timestamp))
+        monitor = self._take_monitor
+        if name == "play" and monitor is not None:
+            monitor.mark_playback_started(monitor.capture.frame_at(timestamp))
+
+    def _session_usable(self, duration):
+        if self._session is None:
+            return False
+        if self._session.finished:
+            print(f"⚠️ Capture session stopped ({self._session.error or 'device closed'}); "
+                  f"recording each file separately")
+            self.end_session()
+            return False
+        needed = duration + getattr(config, 'AUX_MAX_START_SECONDS', 15.0) + 4.0
+        if needed > self._session.buffer.capacity / self._session.samplerate:
+            print(f"⚠️ {duration:.0f}s track does not fit the session buffer; recording it separately")
+            return False
+        return True
 
     def list_dshow_audio_devices(self):
         print("🔍 Scanning for available audio input devices...\n")
@@ -54,6 +161,11 @@ class AuxRecorder:
 
 
     def start(self, audio_file, play_func):
+        """
+        Record ``audio_file`` while ``play_func`` plays it. Returns None for a
+        usable take, or the CaptureProblem that made the capture monitor abort
+        it (stream mode); aborted takes are not queued for post_process.
+        """
         if not self.selected_device:
             print("❌ No input device selected. Call prompt_and_set_device() first.")
             return
@@ -62,6 +174,15 @@ class AuxRecorder:
         buffer_seconds = 4.0  # Full raw buffer before/after
         total_duration = original_duration + buffer_seconds
 
+        if self._session_usable(original_duration):
+            return self._record_in_session(audio_file, play_func, original_duration)
+
+        if self.stream_capture_enabled():
+            if self.adaptive_stop_enabled():
+                # Hard timeout only; the monitor stops the capture once playback has ended
+                total_duration = original_duration + getattr(config, 'AUX_MAX_START_SECONDS', 15.0) + buffer_seconds
+            return self._start_stream(audio_file, play_func, original_duration, total_duration)
+
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         self.output_file = os.path.join(output_audio_dir, f"aux_recording_{timestamp}.wav")
 
@@ -91,10 +212,226 @@ class AuxRecorder:
 
         record_thread.join()
 
+    def _capture_monitor(self, audio_file, capture, original_duration, total_duration,
+                         playback_start=DELAY_BEFORE_PLAY, **kwargs):
+        return CaptureMonitor(
+            capture, playback_start, original_duration, total_duration,
+            load_reference=lambda: load_audio(audio_file, target_sr=capture.samplerate)[1],
+            on_problem=lambda problem: self.playback_stop.set(),
+            on_end=self.playback_stop.set,
+            check_health=getattr(config, 'CAPTURE_MONITOR', True),
+            adaptive_stop=self.adaptive_stop_enabled(),
+            window_seconds=getattr(config, 'MONITOR_WINDOW_SECONDS', 0.5),
+            silence_dbfs=getattr(config, 'MONITOR_SILENCE_DBFS', -50.0),
+            silence_seconds=getattr(config, 'MONITOR_SILENCE_SECONDS', 4.0),
+            clip_fraction=getattr(config, 'MONITOR_CLIP_FRACTION', 0.001),
+            clip_seconds=getattr(config, 'MONITOR_CLIP_SECONDS', 1.0),
+            stall_seconds=getattr(config, 'MONITOR_STALL_SECONDS', 5.0),
+            max_lag_seconds=getattr(config, 'ALIGN_MAX_LAG_SECONDS', 1.0),
+            max_start_seconds=getattr(config, 'AUX_MAX_START_SECONDS', 15.0),
+            end_silence_seconds=getattr(config, 'AUX_END_SILENCE_SECONDS', 0.5),
+            end_timeout_seconds=getattr(config, 'AUX_END_TIMEOUT_SECONDS', 1.0),
+            onset_min_seconds=getattr(config, 'AUX_ONSET_MIN_SECONDS', 0.1),
+            onset_rise_db=getattr(config, 'AUX_ONSET_RISE_DB', 10.0),
+            noise_floor_seconds=getattr(config, 'AUX_NOISE_FLOOR_SECONDS', 0.5),
+            **kwargs
+        )
+
+    def _start_live_analysis(self, audio_file, capture, monitor, cancel):
+        """LIVE_ANALYSIS: score the take from the ring buffer while it is being recorded (until ``cancel`` is set)."""
+        if not getattr(config, 'LIVE_ANALYSIS', False):
+            return None
+        from peaq_analyzer import run_peaq_analysis_live
+
+        def analyse():
+            take_start = monitor.wait_for_take_start() if monitor is not None else DELAY_BEFORE_PLAY
+            if take_start is None:
+                return
+            result = run_peaq_analysis_live(audio_file, capture, pre_roll_seconds=take_start, cancel=cancel)
+            with self._capture_lock:
+                self._live_results[audio_file] = result
+
+        live_thread = threading.Thread(target=analyse)
+        live_thread.start()
+        return live_thread
+
+    def _finish_take(self, audio_file, capture, problem, start_frame, num_frames):
+        """Log the take's health; queue a good take (cut out of the capture now) for post_process."""
+        self.health.record(audio_file, problem)
+        print(f"🩺 Capture health: {self.health.summary()}")
+        if problem is not None:
+            with self._capture_lock:
+                self._live_results.pop(audio_file, None)
+            return problem
+
+        frames = capture.buffer.read(start_frame, start_frame + num_frames)
+        print(f"✂️ Take cut from {start_frame / capture.samplerate:.2f}s "
+              f"({len(frames) / capture.samplerate:.2f}s, array slice)")
+        with self._capture_lock:
+            self._captures.append((capture.samplerate, frames))
+        return None
+
+    def _record_in_session(self, audio_file, play_func, original_duration):
+        """start() inside a capture session: the take is cut from the continuous capture."""
+        capture = self._session
+        sr = capture.samplerate
+        start_frame = capture.buffer.frames_written
+        monitor = self._capture_monitor(
+            audio_file, capture, original_duration,
+            original_duration + getattr(config, 'AUX_MAX_START_SECONDS', 15.0),
+            playback_start=None, start_frame=start_frame, stop_capture=False)
+        with self._capture_lock:
+            self._take_events = []
+        self._take_monitor = monitor
+
+        print(f"\n🎙️ Recording take {len(self.session_index) + 1} in the capture session "
+              f"(from {start_frame / sr:.2f}s)...")
+        self.playback_stop.clear()
+        monitor.start()
+        live_cancel = threading.Event()
+        live_thread = self._start_live_analysis(audio_file, capture, monitor, live_cancel)
+        play_func(audio_file)
+        self._take_monitor = None
+
+        if not monitor.adaptive_stop and monitor.take_start is None:
+            # The player logged no "play" event: fall back to the fixed pre-roll
+            monitor.set_take_start((start_frame + int(DELAY_BEFORE_PLAY * sr)) / sr)
+        max_start = getattr(config, 'AUX_MAX_START_SECONDS', 15.0)
+        take_start = monitor.wait_for_take_start(timeout=original_duration + max_start)
+        num_frames = int(round(original_duration * sr))
+        problem = None
+        if take_start is None:
+            # Only possible with adaptive stop and the health checks off: never cut from a guess
+            problem = CaptureProblem("no_onset", f"no playback onset found within "
+                                                 f"{original_duration + max_start:.0f}s of the take")
+        else:
+            take_start = int(round(take_start * sr))
+            if not capture.wait_for_frames(take_start + num_frames, getattr(config, 'MONITOR_STALL_SECONDS', 5.0)):
+                missing = (take_start + num_frames - capture.buffer.frames_written) / sr
+                problem = CaptureProblem("short", f"capture session stopped {missing:.1f}s before the end of the take")
+        monitor.cancel()
+        problem = monitor.join() or problem
+        if live_thread is not None:
+            if problem is not None:
+                live_cancel.set()
+            live_thread.join()
+
+        with self._capture_lock:
+            events = list(self._take_events)
+        self.session_index.append({
+            "file": audio_file,
+            "start_frame": start_frame,
+            "events": [{"event": name, "monotonic": t, "frame": capture.frame_at(t)} for name, t in events],
+            "take_start_frame": take_start,
+            "take_frames": num_frames,
+            "onset_detected": monitor.adaptive_stop,
+            "problem": problem.kind if problem else None,
+        })
+        return self._finish_take(audio_file, capture, problem, take_start, num_frames)
+
+    def _start_stream(self, audio_file, play_func, original_duration, total_duration):
+        """start() for AUX_CAPTURE_MODE = "stream": PCM from ffmpeg's stdout into a ring buffer."""
+        samplerate = getattr(config, 'AUX_CAPTURE_SAMPLE_RATE', 44100)
+        channels = getattr(config, 'AUX_CAPTURE_CHANNELS', 2)
+        command = ffmpeg_capture_command(self.ffmpeg_path, self.selected_device, total_duration,
+                                         samplerate, channels)
+        capture = PcmCapture(command, samplerate, channels, capacity_seconds=total_duration + 1.0)
+        monitor = None
+        if getattr(config, 'CAPTURE_MONITOR', True) or self.adaptive_stop_enabled():
+            monitor = self._capture_monitor(audio_file, capture, original_duration, total_duration)
+
+        print("\n🎙️ Starting in-memory capture before playback...")
+        start_event = threading.Event()
+
+        def record():
+            print(f"🎧 Capturing '{self.selected_device}' for up to {total_duration:.2f} seconds (PCM pipe)...")
+            start_event.wait()
+            capture.start().wait()
+
+        record_thread = threading.Thread(target=record)
+        record_thread.start()
+
+        live_cancel = threading.Event()
+        live_thread = self._start_live_analysis(audio_file, capture, monitor, live_cancel)
+
+        self.playback_stop.clear()
+        with self._capture_lock:
+            self._take_events = []
+        self._take_monitor = monitor
+        time.sleep(0.1)  # Let recording thread prepare
+        start_event.set()
+        if monitor is not None:
+            monitor.start()
+        play_func(audio_file)
+        self._take_monitor = None
+
+        record_thread.join()
+        problem = monitor.join() if monitor is not None else None
+        if live_thread is not None:
+            if problem is not None:
+                live_cancel.set()
+            live_thread.join()
+        if capture.error:
+            print(f"⚠️ Capture reader stopped early: {capture.error}")
+        print(f"📼 Captured {capture.duration:.2f}s in memory")
+
+        take_start = monitor.take_start if monitor is not None else None
+        if take_start is None:
+            take_start = DELAY_BEFORE_PLAY
+        return self._finish_take(audio_file, capture, problem, int(round(take_start * samplerate)),
+                                 int(round(original_duration * samplerate)))
+
     def stop(self):
         print("⏳ Waiting for FFmpeg to finish (handled automatically)...")
 
+    def take_live_result(self, audio_file):
+        """(odg, quality) scored live for ``audio_file`` (LIVE_ANALYSIS), or None; handed out once."""
+        with self._capture_lock:
+            result = self._live_results.pop(audio_file, None)
+        return result if result and result[0] is not None else None
+
+    def take_captured_audio(self, output_path):
+        """
+        ``(samplerate, (frames, channels) int16)`` of the take that
+        post_process trimmed for ``output_path`` in stream mode, or None
+        (file mode: analyse ``output_path`` as usual). Each take is handed
+        out once.
+        """
+        with self._capture_lock:
+            return self._captured_audio.pop(output_path, None)
+
+    def _post_process_stream(self, original_audio, output_path):
+        with self._capture_lock:
+            samplerate, frames = self._captures.pop(0) if self._captures else (None, None)
+        if frames is None:
+            print("❌ No in-memory AUX capture to post-process.")
+            return False
+        if len(frames) == 0:
+            print("❌ AUX capture is shorter than the pre-roll; nothing recorded.")
+            return False
+
+        with self._capture_lock:
+            self._captured_audio[output_path] = (samplerate, frames)
+        if output_path and getattr(config, 'AUX_STREAM_ARCHIVE', True):
+            archive_async(output_path, frames, samplerate)
+            print(f"✅ AUX capture trimmed in memory ({len(frames) / samplerate:.2f}s); "
+                  f"archiving to {output_path} in the background")
+        else:
+            print(f"✅ AUX capture trimmed in memory ({len(frames) / samplerate:.2f}s)")
+        return True
+
+    @staticmethod
+    def _is_pcm16_wav(path):
+        try:
+            layout = read_wav_layout(path)
+        except (OSError, ValueError):
+            return False
+        return layout.format_tag == WAVE_FORMAT_PCM and layout.bits_per_sample == 16
+
     def post_process(self, video_path, original_audio, output_path):
+        if self.stream_capture_enabled():
+            return self._post_process_stream(original_audio, output_path)
+
         if not os.path.exists(self.output_file):
             print("❌ AUX recording file not found.")
             return False
@@ -107,9 +444,16 @@ class AuxRecorder:
             temp_trimmed = self.output_file.replace(".wav", "_trimmed.wav")
 
             # Exact timing
-            delay_before_play = 3.0  # seconds to skip at beginning
+            delay_before_play = DELAY_BEFORE_PLAY
             duration = get_audio_duration(original_audio)
 
+            if self._is_pcm16_wav(self.output_file):
+                # Sample-accurate byte-range copy; no ffmpeg decode/encode pass
+                trim_wav(self.output_file, output_path, delay_before_play, duration)
+                os.remove(self.output_file)
+                print(f"✅ AUX recording trimmed and saved: {output_path}")
+                return True
+
             print(f"[DEBUG] Using ffmpeg at: {self.ffmpeg_path}")
             trim_result = subprocess.run([
                 self.ffmpeg_path,
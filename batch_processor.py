@@ -5,6 +5,8 @@ from tkinter import filedialog
 from openpyxl import Workbook
 from openpyxl.styles import Font
 
+import config
+
 class BatchProcessor:
     SUPPORTED_EXTENSIONS = ['.wav', '.mp3', '.flac', '.m4a', '.aac', '.ogg', '.opus', '.wma', '.webm', '.mid', '.mp4']
 
@@ -16,6 +18,8 @@ class BatchProcessor:
 
         self.excel_path = os.path.join(self.batch_root, "batch_results.xlsx")
         self.results = []
+        self.retry_counts = {}
+        self.max_retries = getattr(config, 'CAPTURE_MAX_RETRIES', 1)
 
     def add_result(self, filename, odg, quality, duration, interruptions=None, graph_path=None, success=True, error_message=None):
         self.results.append({
@@ -29,6 +33,23 @@ class BatchProcessor:
             "error": error_message
         })
 
+    def mark_for_retry(self, filename, problem):
+        """
+        Called for a take the capture monitor rejected. Returns True if
+        ``filename`` should be queued for another recording; once its retries
+        are used up it is logged as a failed result instead.
+        """
+        attempts = self.retry_counts.get(filename, 0) + 1
+        self.retry_counts[filename] = attempts
+        if attempts <= self.max_retries:
+            print(f"🔁 Re-queueing {os.path.basename(filename)} (retry {attempts}/{self.max_retries}): "
+                  f"{problem.message}")
+            return True
+        print(f"❌ Giving up on {os.path.basename(filename)} after {attempts} bad take(s)")
+        self.add_result(filename, None, None, None, success=False,
+                        error_message=f"Capture rejected ({problem.kind}): {problem.message}")
+        return False
+
     def print_batch_summary(self):
         print("\n📊 Batch Summary:")
         for r in self.results:
@@ -36,6 +57,13 @@ class BatchProcessor:
             print(f"{status} {os.path.basename(r['filename'])}")
             if not r["success"]:
                 print(f"   ↳ Error: {r['error']}")
+        # Every file with a rejected take was re-recorded at least once (unless retries are off)
+        retried = len(self.retry_counts) if self.max_retries > 0 else 0
+        gave_up = sum(1 for n in self.retry_counts.values() if n > self.max_retries)
+        if retried:
+            print(f"🔁 {retried} file(s) were re-recorded after a rejected take")
+        if gave_up:
+            print(f"🚫 {gave_up} file(s) gave up after {self.max_retries} retr{'y' if self.max_retries == 1 else 'ies'}")
 
     def save_results_to_excel(self):
         wb = Workbook()
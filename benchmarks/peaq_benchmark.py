@@ -0,0 +1,195 @@
+# benchmarks/peaq_benchmark.py
+"""
+PEAQ kernel benchmarks on synthetic signals.
+
+    python -m benchmarks.peaq_benchmark                      # 10 s, 5 min, 60 min
+    python -m benchmarks.peaq_benchmark --lengths 10 300     # subset
+    python -m benchmarks.peaq_benchmark --update-golden      # re-record golden ODG/MOVs
+
+Each length runs in its own process so peak RSS is per length. Results are
+printed as JSON (and written with --output); the run fails when ODG/MOVs
+drift from benchmarks/golden_peaq.json.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PEAQ import PEAQ
+from audio_utils import load_audio
+from alignment import estimate_lag
+
+SAMPLE_RATE = 44100
+DEFAULT_LENGTHS = (10, 5 * 60, 60 * 60)
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_peaq.json")
+GOLDEN_RTOL = 1e-6
+GOLDEN_ATOL = 1e-9
+PER_FRAME_SAMPLE = 200       # frames timed through the single-frame PQEval kernels
+
+
+def synthetic_pair(seconds, fs=SAMPLE_RATE, seed=0, chunk_seconds=60):
+    """Deterministic reference (tones + noise) and a band-limited, noisier test copy.
+
+    Built a chunk at a time into float32 so a 60 min pair stays ~1.3 GB.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * fs)
+    ref = np.empty(n, dtype=np.float32)
+    test = np.empty(n, dtype=np.float32)
+    step = int(chunk_seconds * fs)
+    prev = np.float32(0.0)
+    for start in range(0, n, step):
+        t = np.arange(start, min(start + step, n), dtype=np.float64) / fs
+        chunk = 0.05 * rng.standard_normal(len(t))
+        for freq, amp in ((220.0, 0.4), (1000.0, 0.25), (4400.0, 0.1)):
+            chunk += amp * np.sin(2 * np.pi * freq * t) * (1 + 0.5 * np.sin(2 * np.pi * 0.25 * t))
+        chunk = (chunk / 1.2).astype(np.float32)
+        ref[start:start + len(t)] = chunk
+
+        # Test: two-tap low-pass, a little gain loss and added noise
+        delayed = np.concatenate([[prev], chunk[:-1]])
+        test[start:start + len(t)] = 0.475 * (chunk + delayed) + 0.01 * rng.standard_normal(len(t))
+        prev = chunk[-1]
+    return ref, test
+
+
+class _Timer:
+    def __init__(self, timings, name):
+        self.timings, self.name = timings, name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.timings[self.name] = time.perf_counter() - self.start
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / 2**20  # Windows
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+
+def run_length(seconds):
+    """Benchmark every kernel on one synthetic length; returns a JSON-able dict."""
+    timings = {}
+    with _Timer(timings, "synthesize"):
+        ref, test = synthetic_pair(seconds)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ref.wav")
+        sf.write(path, ref, SAMPLE_RATE, subtype="PCM_16")
+        with _Timer(timings, "load_audio"):
+            load_audio(path)
+
+    with _Timer(timings, "estimate_lag"):
+        estimate_lag(ref, test, SAMPLE_RATE)
+
+    model = PEAQ(SAMPLE_RATE)
+    pq_eval = model.pq_eval
+    sample = min(PER_FRAME_SAMPLE, model.num_frames(len(ref)))
+    frames = model._frame_view(ref, sample)
+    start = time.perf_counter()
+    spectra = [pq_eval.PQDFTFrame(frame) for frame in frames]
+    timings["PQDFTFrame_per_frame"] = (time.perf_counter() - start) / sample
+    start = time.perf_counter()
+    for X2 in spectra:
+        pq_eval.PQ_excitCB(X2)
+    timings["PQ_excitCB_per_frame"] = (time.perf_counter() - start) / sample
+
+    with _Timer(timings, "PEAQ.process"):
+        model.process(ref, test)
+    with _Timer(timings, "computeODG"):
+        odg, movs = model.computeODG()
+
+    num_frames = len(model.EbNMatR)
+    return {
+        "seconds": seconds,
+        "num_frames": num_frames,
+        "frames_per_sec": num_frames / timings["PEAQ.process"],
+        "peak_rss_mb": _peak_rss_mb(),
+        "timings": timings,
+        "odg": float(odg),
+        "movs": {name: float(value) for name, value in movs.items()},
+    }
+
+
+def _compare(result, golden):
+    """Names of ODG/MOV values that drifted from ``golden``."""
+    expected = dict(golden["movs"], odg=golden["odg"])
+    actual = dict(result["movs"], odg=result["odg"])
+    return [
+        name for name, value in expected.items()
+        if name not in actual or not np.isclose(actual[name], value, rtol=GOLDEN_RTOL, atol=GOLDEN_ATOL)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PEAQ kernel benchmarks")
+    parser.add_argument("--lengths", type=float, nargs="+", default=DEFAULT_LENGTHS,
+                        help="synthetic signal lengths in seconds")
+    parser.add_argument("--output", help="also write the JSON report here")
+    parser.add_argument("--update-golden", action="store_true",
+                        help="record ODG/MOVs of this run as the golden values")
+    args = parser.parse_args(argv)
+
+    results = []
+    for seconds in args.lengths:
+        print(f"⏱️ Benchmarking {seconds:g} s ...", file=sys.stderr)
+        # Fresh process per length so ru_maxrss is that length's peak
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            results.append(pool.submit(run_length, seconds).result())
+
+    golden = {}
+    if os.path.exists(GOLDEN_PATH):
+        with open(GOLDEN_PATH) as f:
+            golden = json.load(f)
+
+    failures = {}
+    for result in results:
+        key = f"{result['seconds']:g}"
+        if args.update_golden:
+            golden[key] = {"odg": result["odg"], "movs": result["movs"]}
+        elif key in golden:
+            drifted = _compare(result, golden[key])
+            result["golden"] = "drift" if drifted else "ok"
+            if drifted:
+                failures[key] = drifted
+        else:
+            result["golden"] = "missing"
+
+    if args.update_golden:
+        with open(GOLDEN_PATH, "w") as f:
+            json.dump(golden, f, indent=2, sort_keys=True)
+        print(f"💾 Golden values written to {GOLDEN_PATH}", file=sys.stderr)
+
+    report = json.dumps({"sample_rate": SAMPLE_RATE, "results": results}, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+
+    if failures:
+        for key, names in failures.items():
+            print(f"❌ {key} s: drifted from golden values: {', '.join(names)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
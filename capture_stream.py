@@ -0,0 +1,563 @@
+## capture_stream.py
+"""
+In-memory AUX capture: ffmpeg writes raw interleaved PCM to stdout, and a
+reader thread copies it into a preallocated numpy ring buffer. Trimming a
+take is then a slice of that buffer. No WAV is written or decoded between
+the recording and the analysis; archiving to disk is optional and runs on a
+background writer thread.
+"""
+import os
+import subprocess
+import threading
+import time
+import wave
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+READ_BLOCK_FRAMES = 4096
+
+
+class RingBuffer:
+    """
+    Fixed-capacity (frames, channels) sample buffer addressed by absolute
+    frame index. Once more than ``capacity`` frames have been written, the
+    oldest ones are overwritten; reads of overwritten frames raise ValueError.
+    """
+
+    def __init__(self, capacity_frames, channels, dtype=np.int16):
+        self.capacity = int(capacity_frames)
+        self.channels = channels
+        self._data = np.zeros((self.capacity, channels), dtype=dtype)
+        self._written = 0
+        self._lock = threading.Lock()
+
+    @property
+    def frames_written(self):
+        return self._written
+
+    @property
+    def first_frame(self):
+        """Oldest absolute frame still held."""
+        return max(0, self._written - self.capacity)
+
+    def write(self, block):
+        block = np.asarray(block, dtype=self._data.dtype).reshape(-1, self.channels)
+        if len(block) > self.capacity:
+            skipped, block = len(block) - self.capacity, block[-self.capacity:]
+        else:
+            skipped = 0
+        with self._lock:
+            start = (self._written + skipped) % self.capacity
+            head = min(len(block), self.capacity - start)
+            self._data[start:start + head] = block[:head]
+            self._data[:len(block) - head] = block[head:]
+            self._written += skipped + len(block)
+
+    def read(self, start, stop):
+        """Copy of absolute frames [start, stop), clipped to what has been written."""
+        with self._lock:
+            stop = min(int(stop), self._written)
+            start = max(int(start), 0)
+            if start < self.first_frame:
+                raise ValueError(f"Frames from {start} were already overwritten "
+                                 f"(buffer holds {self.first_frame}..{self._written})")
+            if stop <= start:
+                return self._data[:0].copy()
+            idx = np.arange(start, stop) % self.capacity
+            return self._data[idx]
+
+
+def ffmpeg_capture_command(ffmpeg_path, device, duration_sec, samplerate=44100, channels=2):
+    """ffmpeg arguments that record ``device`` (DirectShow) as s16le PCM on stdout (duration None = until stopped)."""
+    limit = [] if duration_sec is None else ["-t", f"{duration_sec:.3f}"]
+    return [
+        ffmpeg_path,
+        "-f", "dshow",
+        "-i", f"audio={device}",
+        *limit,
+        "-f", "s16le", "-acodec", "pcm_s16le",
+        "-ac", str(channels), "-ar", str(samplerate),
+        "pipe:1",
+    ]
+
+
+CLOCK_WINDOW_BLOCKS = 512
+
+
+class PcmCapture:
+    """
+    Runs a capture command that emits 16-bit interleaved PCM on stdout and
+    keeps the samples in a RingBuffer of ``capacity_seconds``.
+
+    Each block read is also stamped with time.monotonic(), so ``frame_at``
+    can map an event timestamp (e.g. "playback started") onto the sample
+    clock. Pipe buffering only ever delays a block, so the earliest
+    arrival over the last CLOCK_WINDOW_BLOCKS blocks gives the mapping;
+    the window also follows slow drift between the two clocks.
+    """
+
+    def __init__(self, command, samplerate=44100, channels=2, capacity_seconds=60.0,
+                 block_frames=READ_BLOCK_FRAMES):
+        self.command = command
+        self.samplerate = samplerate
+        self.channels = channels
+        self.block_frames = block_frames
+        self.buffer = RingBuffer(int(capacity_seconds * samplerate), channels)
+        self.process = None
+        self.error = None
+        self.finished = False
+        self._reader = None
+        self._data_ready = threading.Condition()
+        self._clock = deque(maxlen=CLOCK_WINDOW_BLOCKS)  # (monotonic - frames / samplerate) per block
+
+    def start(self):
+        try:
+            self.process = subprocess.Popen(self.command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except Exception as e:
+            self.error = e
+            self._finish()
+            raise
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+        return self
+
+    def _finish(self):
+        with self._data_ready:
+            self.finished = True
+            self._data_ready.notify_all()
+
+    def wait_for_frames(self, frames, stall_timeout=None):
+        """
+        Block until at least ``frames`` frames have been captured (True), or
+        until the capture ends or no data arrives for ``stall_timeout``
+        seconds first (False). Lets consumers follow a capture in progress.
+        """
+        with self._data_ready:
+            while self.buffer.frames_written < frames:
+                if self.finished:
+                    return False
+                if not self._data_ready.wait(stall_timeout) and stall_timeout is not None:
+                    return self.buffer.frames_written >= frames
+            return True
+
+    def _read_loop(self):
+        frame_bytes = 2 * self.channels
+        block_bytes = self.block_frames * frame_bytes
+        remainder = b''
+        try:
+            while True:
+                data = self.process.stdout.read(block_bytes)
+                if not data:
+                    break
+                data = remainder + data
+                usable = len(data) - len(data) % frame_bytes
+                remainder = data[usable:]
+                if usable:
+                    self.buffer.write(np.frombuffer(data[:usable], dtype='<i2'))
+                    arrived = time.monotonic()
+                    with self._data_ready:
+                        self._clock.append(arrived - self.buffer.frames_written / self.samplerate)
+                        self._data_ready.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            self._finish()
+
+    def wait(self, timeout=None):
+        """Block until the capture command exits and stdout is drained; returns frames captured."""
+        if self.process is not None:
+            self.process.wait(timeout=timeout)
+        if self._reader is not None:
+            self._reader.join()
+        return self.buffer.frames_written
+
+    def frame_at(self, timestamp):
+        """Absolute frame index captured at ``timestamp`` (time.monotonic()), or None before any data."""
+        with self._data_ready:
+            if not self._clock:
+                return None
+            origin = min(self._clock)
+        return max(0, int(round((timestamp - origin) * self.samplerate)))
+
+    def abort(self):
+        """Terminate the capture command from any thread without waiting (stop() joins the reader)."""
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+
+    def stop(self):
+        """Stop capturing early (the samples read so far stay available)."""
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+        return self.wait()
+
+    @property
+    def duration(self):
+        return self.buffer.frames_written / self.samplerate
+
+    def read_seconds(self, start_sec, duration_sec=None):
+        """(frames, channels) int16 samples for ``duration_sec`` seconds from ``start_sec`` (None = to the end)."""
+        start = int(round(start_sec * self.samplerate))
+        stop = self.buffer.frames_written if duration_sec is None else \
+            start + int(round(duration_sec * self.samplerate))
+        return self.buffer.read(start, stop)
+
+
+# ---------------------------------------------------------------------------
+# Capture health: silence / clipping / stall detection while recording
+# ---------------------------------------------------------------------------
+
+CaptureProblem = namedtuple("CaptureProblem", "kind message")
+
+FULL_SCALE = 32767
+
+
+def window_levels_dbfs(samples, window):
+    """RMS level in dBFS of consecutive ``window``-sample blocks of a mono float signal."""
+    n = len(samples) // window * window
+    blocks = np.asarray(samples[:n], dtype=np.float64).reshape(-1, window)
+    return 20 * np.log10(np.sqrt(np.mean(blocks ** 2, axis=1)) + 1e-12)
+
+
+def noise_floor_dbfs(samples, block):
+    """Noise floor in dBFS of a mono float signal: the 25th percentile of its ``block`` levels."""
+    levels = window_levels_dbfs(samples, block)
+    return float(np.percentile(levels, 25)) if len(levels) else -np.inf
+
+
+def find_onset(samples, block, threshold_dbfs, min_blocks=1):
+    """
+    Index of the first ``block`` of a mono float signal that starts a run of
+    ``min_blocks`` blocks above ``threshold_dbfs`` (None if there is none).
+    """
+    above = window_levels_dbfs(samples, block) > threshold_dbfs
+    if len(above) < min_blocks:
+        return None
+    runs = np.convolve(above, np.ones(min_blocks, dtype=int), mode='valid')
+    starts = np.flatnonzero(runs == min_blocks)
+    return int(starts[0]) * block if len(starts) else None
+
+
+class CaptureMonitor:
+    """
+    Follows a PcmCapture from the ring buffer in fixed windows.
+
+    Health checks (``check_health``) abort the take as soon as it is clearly
+    unusable:
+
+    - silence: no signal for ``silence_seconds`` while the reference is
+      playing (a dead line, a muted device, or the wrong input selected).
+      Before the onset is found, that clock starts at the player's "play"
+      event (``mark_playback_started``); players that report no events are
+      only given up on after ``max_start_seconds``;
+    - clipping: ``clip_seconds`` worth of windows with more than
+      ``clip_fraction`` of samples at full scale;
+    - stall: no data at all for ``stall_seconds`` (ffmpeg hung on the device);
+    - short: the capture ended before the take was complete.
+
+    With ``adaptive_stop`` the take boundaries come from the audio instead of
+    fixed delays. The onset is the first run of ``onset_min_seconds`` above
+    both ``silence_dbfs`` and the input's noise floor plus ``onset_rise_db``;
+    the floor is measured over ``noise_floor_seconds`` of input before the
+    monitor's start frame (or right after it, when the buffer holds nothing
+    earlier), i.e. before the player starts. The take starts at the onset,
+    minus the reference's own leading silence and ``onset_margin_seconds``. The capture
+    is stopped once the whole reference span is in and followed by
+    ``end_silence_seconds`` of silence, or ``end_timeout_seconds`` after the
+    span if the input never goes quiet. Without it, takes start at
+    ``playback_start`` and last until ``expected_seconds``.
+
+    ``load_reference()`` may return the mono reference at the capture rate;
+    it is called on the monitor thread, and windows where the reference
+    itself is quiet (plus the alignment tolerance) are never counted as
+    silence. ``on_problem(problem)`` runs once after the capture command was
+    terminated for a problem; ``on_end()`` runs once after it was stopped
+    because playback ended.
+
+    In a capture session (one capture spanning many takes) the monitor
+    starts at ``start_frame``, all times are absolute capture times, and
+    with ``stop_capture=False`` problems and the end of playback are only
+    reported, never acted on by stopping the capture; ``cancel()`` then
+    ends the watch once the take has been cut.
+    """
+
+    ONSET_BLOCK_SECONDS = 0.01
+
+    def __init__(self, capture, playback_start, playback_seconds, expected_seconds,
+                 load_reference=None, on_problem=None, on_end=None, check_health=True,
+                 adaptive_stop=False, window_seconds=0.5, silence_dbfs=-50.0, silence_seconds=4.0,
+                 clip_fraction=0.001, clip_seconds=1.0, stall_seconds=5.0, max_lag_seconds=1.0,
+                 max_start_seconds=15.0, end_silence_seconds=0.5, end_timeout_seconds=1.0,
+                 onset_margin_seconds=0.05, onset_min_seconds=0.1, onset_rise_db=10.0,
+                 noise_floor_seconds=0.5, start_frame=0, stop_capture=True):
+        self.capture = capture
+        self.start_frame = start_frame
+        self.stop_capture = stop_capture
+        self.playback_seconds = playback_seconds
+        self.expected_seconds = expected_seconds
+        self.load_reference = load_reference
+        self.on_problem = on_problem
+        self.on_end = on_end
+        self.check_health = check_health
+        self.adaptive_stop = adaptive_stop
+        self.window = max(1, int(window_seconds * capture.samplerate))
+        self.silence_dbfs = silence_dbfs
+        self.silence_seconds = silence_seconds
+        self.clip_fraction = clip_fraction
+        self.clip_seconds = clip_seconds
+        self.stall_seconds = stall_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.max_start_seconds = max_start_seconds
+        self.end_silence_seconds = end_silence_seconds
+        self.end_timeout_seconds = end_timeout_seconds
+        self.onset_margin_seconds = onset_margin_seconds
+        self.onset_min_seconds = onset_min_seconds
+        self.onset_rise_db = onset_rise_db
+        self.noise_floor_seconds = noise_floor_seconds
+        self.noise_floor = None
+        self.problem = None
+        self.ended = False
+        self.take_start = None if adaptive_stop else playback_start
+        self._take_start_known = threading.Event()
+        if self.take_start is not None:
+            self._take_start_known.set()
+        self._cancelled = False
+        self._playback_frame = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
+        return self.problem
+
+    def cancel(self):
+        """Stop watching after the current window (the capture itself keeps running)."""
+        self._cancelled = True
+
+    def mark_playback_started(self, frame):
+        """
+        The player reported starting playback at capture ``frame``. Audio must
+        now appear within ``silence_seconds``; without onset detection the
+        take starts here.
+        """
+        if frame is None:
+            frame = self.capture.buffer.frames_written
+        self._playback_frame = frame
+        if not self.adaptive_stop:
+            self.set_take_start(frame / self.capture.samplerate)
+
+    def set_take_start(self, seconds):
+        """Take start found elsewhere (e.g. from a playback event timestamp), unless already detected."""
+        if self.take_start is None:
+            self.take_start = seconds
+            self._take_start_known.set()
+
+    def wait_for_take_start(self, timeout=None):
+        """Seconds into the capture where the take starts, once known (None if it never was)."""
+        self._take_start_known.wait(timeout)
+        return self.take_start
+
+    def _reference_profile(self):
+        """(per-window flags from the take start where the reference is audible, its leading silence in frames)."""
+        sr = self.capture.samplerate
+        num_windows = int(self.playback_seconds * sr) // self.window
+        reference = None
+        if self.load_reference is not None:
+            try:
+                reference = self.load_reference()
+            except Exception as e:
+                print(f"⚠️ Capture monitor could not load the reference ({e}); assuming it is never silent")
+        if reference is None:
+            return np.ones(num_windows, dtype=bool), 0
+        active = window_levels_dbfs(reference, self.window) > self.silence_dbfs
+        margin = -(-int(self.max_lag_seconds * sr) // self.window)
+        expected = np.convolve(active, np.ones(2 * margin + 1), mode='same')[:num_windows] > 0
+        return expected, self._find_onset(reference, self.silence_dbfs) or 0
+
+    def _onset_blocks(self):
+        """(ONSET_BLOCK_SECONDS block in frames, number of blocks an onset must last)."""
+        block = max(1, int(self.ONSET_BLOCK_SECONDS * self.capture.samplerate))
+        return block, max(1, int(round(self.onset_min_seconds / self.ONSET_BLOCK_SECONDS)))
+
+    def _find_onset(self, samples, threshold_dbfs):
+        block, min_blocks = self._onset_blocks()
+        return find_onset(samples, block, threshold_dbfs, min_blocks)
+
+    def _measure_noise_floor(self):
+        """Noise floor of the input before playback; returns the onset threshold in dBFS."""
+        sr = self.capture.samplerate
+        frames = max(self.window, int(self.noise_floor_seconds * sr))
+        buffer = self.capture.buffer
+        if self.start_frame - frames >= buffer.first_frame:
+            start = self.start_frame - frames
+        else:
+            start = self.start_frame
+            self.capture.wait_for_frames(start + frames, self.stall_seconds)
+        lead_in = buffer.read(start, start + frames)
+        if len(lead_in):
+            block, _ = self._onset_blocks()
+            self.noise_floor = noise_floor_dbfs(lead_in.astype(np.float32).mean(axis=1) / 32768.0, block)
+        if self.noise_floor is None or self.noise_floor + self.onset_rise_db <= self.silence_dbfs:
+            return self.silence_dbfs
+        print(f"🔈 Input noise floor {self.noise_floor:.0f} dBFS; onset needs "
+              f"{self.noise_floor + self.onset_rise_db:.0f} dBFS")
+        return self.noise_floor + self.onset_rise_db
+
+    def _flag(self, kind, message):
+        self.problem = CaptureProblem(kind, message)
+        print(f"🚨 Capture problem ({kind}): {message}; aborting take")
+        if self.stop_capture:
+            self.capture.abort()
+        if self.on_problem is not None:
+            self.on_problem(self.problem)
+
+    def _end(self, position):
+        self.ended = True
+        print(f"🏁 Playback ended at {position / self.capture.samplerate:.1f}s; stopping capture")
+        if self.stop_capture:
+            self.capture.abort()
+        if self.on_end is not None:
+            self.on_end()
+
+    def _run(self):
+        try:
+            self._watch()
+        finally:
+            self._take_start_known.set()
+
+    def _watch(self):
+        expected_signal, ref_onset = self._reference_profile()
+        sr = self.capture.samplerate
+        window_sec = self.window / sr
+        take_start = None if self.take_start is None else int(round(self.take_start * sr))
+        take_frames = int(round(self.playback_seconds * sr))
+        position = self.start_frame
+        silent = clipped = quiet = 0
+        onset_threshold = self._measure_noise_floor() if take_start is None and self.adaptive_stop else None
+        onset_block, onset_min_blocks = self._onset_blocks()
+        scan_from = position
+
+        while self.problem is None and not self.ended and not self._cancelled:
+            ready = self.capture.wait_for_frames(position + self.window, self.stall_seconds)
+            if not ready and not self.capture.finished:
+                if self.check_health:
+                    self._flag("stall", f"no audio data for {self.stall_seconds:.0f}s "
+                                        f"after {position / sr:.1f}s")
+                break
+            block = self.capture.buffer.read(position, position + self.window)
+            if len(block) < self.window and not self.capture.finished:
+                continue
+            if len(block) == 0:
+                break
+
+            samples = block.astype(np.float32) / 32768.0
+            level = 20 * np.log10(np.sqrt(np.mean(samples ** 2)) + 1e-12)
+            audible = level > self.silence_dbfs
+            if take_start is None and self.take_start is not None:
+                take_start = int(round(self.take_start * sr))
+            elif take_start is None and self.adaptive_stop:
+                # Rescan the tail of the previous window too, so a run spanning two windows counts
+                pending = self.capture.buffer.read(scan_from, position + len(block))
+                onset = self._find_onset(pending.astype(np.float32).mean(axis=1) / 32768.0, onset_threshold)
+                if onset is not None:
+                    onset += scan_from
+                    take_start = max(0, onset - ref_onset - int(self.onset_margin_seconds * sr))
+                    self.take_start = take_start / sr
+                    self._take_start_known.set()
+                    print(f"🎬 Playback detected at {onset / sr:.2f}s; take starts at {self.take_start:.2f}s")
+                else:
+                    scanned = len(pending) // onset_block * onset_block
+                    scan_from += max(0, scanned - (onset_min_blocks - 1) * onset_block)
+
+            if take_start is not None:
+                index = (position - take_start) // self.window
+                if 0 <= index < len(expected_signal) and expected_signal[index]:
+                    silent = silent + 1 if not audible else 0
+            if np.mean(np.abs(block.astype(np.int32)) >= FULL_SCALE) > self.clip_fraction:
+                clipped += 1
+            quiet = 0 if audible else quiet + 1
+            position += len(block)
+
+            playback_frame = self._playback_frame
+            if (self.check_health and self.adaptive_stop and take_start is None and
+                    playback_frame is not None and position - playback_frame >= self.silence_seconds * sr):
+                self._flag("silence", f"no audio {self.silence_seconds:.1f}s after playback started "
+                                      f"(wrong or muted input?)")
+            elif (self.check_health and self.adaptive_stop and take_start is None and
+                    position - self.start_frame >= self.max_start_seconds * sr):
+                self._flag("silence", f"no playback detected within {self.max_start_seconds:.0f}s "
+                                      f"(wrong or muted input?)")
+            elif self.check_health and silent * window_sec >= self.silence_seconds:
+                self._flag("silence", f"below {self.silence_dbfs:.0f} dBFS for {silent * window_sec:.1f}s "
+                                      f"at {position / sr:.1f}s (wrong or muted input?)")
+            elif self.check_health and clipped * window_sec >= self.clip_seconds:
+                self._flag("clipping", f"{clipped * window_sec:.1f}s of clipped audio "
+                                       f"by {position / sr:.1f}s (input gain too high?)")
+            elif (self.adaptive_stop and take_start is not None and position >= take_start + take_frames and
+                  (quiet * window_sec >= self.end_silence_seconds or
+                   position >= take_start + take_frames + self.end_timeout_seconds * sr)):
+                self._end(position)
+            elif len(block) < self.window:
+                break
+
+        if self.problem is None and not self.ended and not self._cancelled and self.check_health:
+            captured = self.capture.buffer.frames_written / sr
+            needed = self.expected_seconds if take_start is None or not self.adaptive_stop \
+                else (take_start + take_frames) / sr
+            if captured < needed - max(0.5, window_sec):
+                self._flag("short", f"capture ended after {captured:.1f}s of {needed:.1f}s")
+
+
+class CaptureHealthLog:
+    """Outcomes of the most recent takes ("ok" or a CaptureProblem kind) for running counters."""
+
+    def __init__(self, size=20):
+        self.takes = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, name, problem=None):
+        with self._lock:
+            self.takes.append((name, problem.kind if problem else "ok"))
+
+    def counts(self):
+        with self._lock:
+            return Counter(kind for _, kind in self.takes)
+
+    def summary(self):
+        counts = self.counts()
+        parts = [f"{counts.pop('ok', 0)} ok"] + [f"{n} {kind}" for kind, n in counts.most_common()]
+        return f"{', '.join(parts)} (last {len(self.takes)} takes)"
+
+
+def write_pcm16_wav(path, frames, samplerate):
+    """Write (frames, channels) int16 samples as a PCM WAV (atomically via a temp file)."""
+    frames = np.asarray(frames, dtype='<i2').reshape(len(frames), -1)
+    out_dir = os.path.dirname(os.path.abspath(path))
+    os.makedirs(out_dir, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with wave.open(tmp_path, 'wb') as out:
+        out.setnchannels(frames.shape[1])
+        out.setsampwidth(2)
+        out.setframerate(samplerate)
+        out.writeframes(frames.tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+_archive_pool = None
+_archive_lock = threading.Lock()
+
+
+def archive_async(path, frames, samplerate):
+    """Queue ``frames`` to be written to ``path`` on the background writer; returns the Future."""
+    global _archive_pool
+    with _archive_lock:
+        if _archive_pool is None:
+            _archive_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="capture-archive")
+    return _archive_pool.submit(write_pcm16_wav, path, frames, samplerate)
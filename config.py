@@ -14,9 +14,76 @@ batch_graphs_dir = "./batch_graphs"
 SHOW_GRAPHS = True
 FAST_MODE = False
 
-# PEAQ frame settings
-FRAME_SIZE = 1024
-HOP_SIZE = 1024 if FAST_MODE else 512
+# PEAQ frame settings (FFT size and hop of the ear model, in samples)
+FRAME_SIZE = 2048
+HOP_SIZE = FRAME_SIZE // 2
+
+# FAST_MODE: every analysis (comparison, batch, excel and folder-push modes)
+# first scores at FAST_HOP_SIZE, then re-runs at HOP_SIZE only when the ODG lies
+# within FAST_MODE_ODG_MARGIN of -1, -2 or -3 or at/below FAST_MODE_REGRESSION_ODG
+# (None = off).
+FAST_HOP_SIZE = 4 * FRAME_SIZE
+FAST_MODE_ODG_MARGIN = 0.25
+FAST_MODE_REGRESSION_ODG = None
+
+# Read audio already at the analysis rate straight through soundfile instead of
+# the decode/resample path (other rates go through resampler.py; librosa is
+# only used to decode codecs soundfile cannot open).
+AUDIO_FAST_LOAD = True
+
+# PEAQ runs at the reference's own sample rate; a test at another rate is
+# resampled to it. Set a rate (e.g. 44100) to force every analysis onto it.
+ANALYSIS_SAMPLE_RATE = None
+
+# Polyphase resampler (resampler.py): Kaiser-windowed sinc low-pass with this
+# many zero crossings per side, cutoff at RESAMPLE_ROLLOFF x the lower Nyquist.
+# Filters are designed once per (orig_sr, target_sr) and cached.
+RESAMPLE_ZERO_CROSSINGS = 32
+RESAMPLE_ROLLOFF = 0.95
+RESAMPLE_KAISER_BETA = 9.0
+
+# Decoded-audio cache: non-WAV sources (mp3/m4a/flac, other rates) are decoded
+# once to 44.1kHz float32 .npy files and memory-mapped on later loads.
+# Set the directory to None to disable.
+DECODED_AUDIO_CACHE_DIR = "./cache/decoded_audio"
+DECODED_AUDIO_CACHE_MAX_MB = 4096
+
+# Threads used to probe audio headers when validating a batch's input files
+METADATA_PROBE_WORKERS = 8
+
+# Evaluate each channel of stereo pairs separately (one batched pass) and
+# report per-channel MOVs next to the combined ODG, so a one-sided dropout or
+# L/R imbalance shows up. Off = analyse the mono downmix. Streamed captures
+# are always analysed as mono.
+PEAQ_PER_CHANNEL = False
+
+# Streaming PEAQ: recordings at least this long (seconds) are evaluated in
+# bounded-memory chunks instead of being loaded whole. Set to None to disable.
+STREAMING_ANALYSIS_MIN_SECONDS = 20 * 60
+STREAMING_CHUNK_SECONDS = 10
+
+# Write per-frame PEAQ matrices to .npy memmaps under <graphs>/frames/<track>
+# instead of keeping them in RAM (multi-hour captures on small workers).
+PEAQ_FRAME_STORE = False
+
+# Parallel PEAQ in the comparison modes: worker processes (None = one per CPU
+# core, 1 = serial) and BLAS/FFT threads allowed inside each worker.
+PEAQ_WORKERS = None
+PEAQ_THREADS_PER_WORKER = 1
+
+# Intra-track parallelism (opt-in): pairs at least PEAQ_SHARD_MIN_SECONDS long
+# are split into frame-aligned shards evaluated on PEAQ_SHARD_WORKERS processes
+# (1 = off, None = one per core). Shard and per-track pools share the cores:
+# neither starts more workers than the other leaves free. Streamed captures use
+# shards of at most PEAQ_SHARD_MAX_SECONDS each so worker memory stays bounded.
+PEAQ_SHARD_WORKERS = 1
+PEAQ_SHARD_MIN_SECONDS = 5 * 60
+PEAQ_SHARD_MAX_SECONDS = 5 * 60
+
+# Reference excitation cache: decoded-audio hash + PQEval parameters -> .npz of
+# the reference-side per-frame matrices. Set the directory to None to disable.
+REFERENCE_CACHE_DIR = "./cache/reference_excitation"
+REFERENCE_CACHE_MAX_MB = 2048
 
 # Audio processing settings
 # Fine-tune this value based on your specific setup
@@ -26,6 +93,83 @@ ENABLE_AUTO_DELAY_COMPENSATION = True  # Toggle for delay compensation
 # Sample-level delay compensation (9ms at 44.1kHz = ~397 samples)
 SAMPLE_DELAY_COMPENSATION = int(TEST_AUDIO_START_DELAY * 44100)  # 397 samples at 44.1kHz
 
+# Measure each pair's lag by FFT cross-correlation (searching ±ALIGN_MAX_LAG_SECONDS)
+# instead of trusting the fixed compensation above. Pairs whose normalized
+# correlation is below ALIGN_MIN_CONFIDENCE fall back to the fixed delay.
+AUTO_ALIGN = True
+ALIGN_MAX_LAG_SECONDS = 1.0
+ALIGN_MIN_CONFIDENCE = 0.3
+ALIGN_EXCERPT_SECONDS = 60  # streamed captures: measure on this much audio from the start
+
+# Clock drift between phone and capture card: pairs at least DRIFT_MIN_SECONDS
+# long get their lag re-measured every DRIFT_HOP_SECONDS (on DRIFT_WINDOW_SECONDS
+# of audio) and the test resampled onto the reference timeline (all channels
+# alike with PEAQ_PER_CHANNEL). Meant for hour-long captures: the warp
+# resamples the test, so ordinary tracks are left alone. None = off.
+DRIFT_MIN_SECONDS = 30 * 60
+DRIFT_WINDOW_SECONDS = 1.0
+DRIFT_HOP_SECONDS = 30
+
+# AUX capture: "file" has ffmpeg write a WAV that post_process trims; "stream"
+# pipes raw PCM from ffmpeg into an in-memory ring buffer, trims by array
+# slicing and hands the samples straight to the PEAQ analysis. With
+# AUX_STREAM_ARCHIVE the trimmed take is still written to the usual
+# *_clean.wav path, on a background thread.
+AUX_CAPTURE_MODE = "file"
+AUX_CAPTURE_SAMPLE_RATE = 44100
+AUX_CAPTURE_CHANNELS = 2
+AUX_STREAM_ARCHIVE = True
+
+# Live analysis (stream capture only): score the take while it records and
+# skip the offline pass. The lag is measured once LIVE_ALIGN_SECONDS of the
+# take are in; chunks of LIVE_CHUNK_SECONDS are transformed as they arrive.
+# A capture silent for LIVE_STALL_SECONDS is treated as finished.
+LIVE_ANALYSIS = False
+LIVE_ALIGN_SECONDS = 10
+LIVE_CHUNK_SECONDS = 1.0
+LIVE_STALL_SECONDS = 10
+
+# Capture health monitor (stream capture only): abort a take within seconds when
+# the input is silent while the reference plays, clipped, or stalled, and let
+# the batch modes record it again up to CAPTURE_MAX_RETRIES times.
+CAPTURE_MONITOR = True
+MONITOR_WINDOW_SECONDS = 0.5
+MONITOR_SILENCE_DBFS = -50.0
+MONITOR_SILENCE_SECONDS = 4.0
+MONITOR_CLIP_FRACTION = 0.001   # share of full-scale samples that makes a window "clipped"
+MONITOR_CLIP_SECONDS = 1.0
+MONITOR_STALL_SECONDS = 5.0
+MONITOR_RECENT_TAKES = 20
+CAPTURE_MAX_RETRIES = 1
+
+# Adaptive stop (stream capture only): trim each take from the detected playback
+# onset instead of a fixed 3 s pre-roll, and stop recording once the reference
+# span is in and AUX_END_SILENCE_SECONDS of silence follow it (at most
+# AUX_END_TIMEOUT_SECONDS later). Players that report their "play" event (the
+# Files / YT Music players in the batch modes) must be audible within
+# MONITOR_SILENCE_SECONDS of it; for other players the input cannot be told
+# apart from "not started yet", so a silent take is only rejected after
+# AUX_MAX_START_SECONDS (long enough for a slow push + app launch).
+AUX_ADAPTIVE_STOP = True
+AUX_MAX_START_SECONDS = 15.0
+AUX_END_SILENCE_SECONDS = 0.5
+AUX_END_TIMEOUT_SECONDS = 1.0
+# The onset must stay AUX_ONSET_RISE_DB above the input's noise floor (measured
+# over AUX_NOISE_FLOOR_SECONDS before the player starts) for AUX_ONSET_MIN_SECONDS,
+# so hiss, hum or a click on a noisy input does not start the take early.
+AUX_ONSET_MIN_SECONDS = 0.1
+AUX_ONSET_RISE_DB = 10.0
+AUX_NOISE_FLOOR_SECONDS = 0.5
+
+# Capture session (stream capture, batch modes): keep one ffmpeg capture running
+# for the whole batch and cut each take out of it, using the players' play/stop
+# timestamps (and onset detection with AUX_ADAPTIVE_STOP). Takes and their frame
+# offsets are indexed in output_audio_dir/capture_session_<timestamp>.json. The
+# ring buffer holds AUX_SESSION_BUFFER_SECONDS (about 10 MB per minute at
+# 44.1 kHz stereo) and must fit the longest track plus its start-up time.
+AUX_CAPTURE_SESSION = False
+AUX_SESSION_BUFFER_SECONDS = 900
+
 selected_audio_device = "Microphone (USB PnP Sound Device)"  # Replace with your actual device name
 playback_method = "files"  # or "ytmusic"
 spotify_comparison_range = "1-2"  # Use the same format as before
@@ -34,7 +178,7 @@ excel_path = r"C:/Users/KIIT/OneDrive/Desktop/timestamps.xlsx"     # Full or rel
 recording_phone = "phone1"                # "phone1" or "phone2"
 playback_app = "audible"                  # Choose from: "audible", "gaana", "jiosaavn", "spotify"
 
-selected_mode = "6"  # Replace with "1" to "7" depending on what you want to run
+selected_mode = "6"  # Replace with "1" to "8" depending on what you want to run
 #        case '1': run_single_mode()
 #        case '2': run_batch_mode()
 #        case '3': run_folder_push_batch_mode()
@@ -42,3 +186,4 @@ selected_mode = "6"  # Replace with "1" to "7" depending on what you want to run
 #        case '5': run_excel_based_testing_mode()
 #        case '6': run_spotify_record_mode()
 #        case '7': run_spotify_comparison_mode() 
+#        case '8': run_reference_matrix_mode()
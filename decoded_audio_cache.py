@@ -0,0 +1,93 @@
+## decoded_audio_cache.py
+import hashlib
+import os
+import tempfile
+import threading
+
+import numpy as np
+from PEAQ.reference_cache import ReferenceCache
+from resampler import _filter_settings
+import config
+
+# Bump when load_audio's decode/normalization changes so stale entries are never reused
+DECODED_CACHE_VERSION = 2
+
+_content_hashes = {}
+_content_hashes_lock = threading.Lock()
+_decoded_audio_cache = None
+
+
+def get_decoded_audio_cache():
+    """Process-wide DecodedAudioCache from config (None when DECODED_AUDIO_CACHE_DIR is unset)."""
+    global _decoded_audio_cache
+    cache_dir = getattr(config, 'DECODED_AUDIO_CACHE_DIR', None)
+    if not cache_dir:
+        return None
+    if _decoded_audio_cache is None or _decoded_audio_cache.cache_dir != cache_dir:
+        max_mb = getattr(config, 'DECODED_AUDIO_CACHE_MAX_MB', 4096)
+        _decoded_audio_cache = DecodedAudioCache(cache_dir, max_bytes=int(max_mb * 1024 * 1024))
+    return _decoded_audio_cache
+
+
+def file_content_hash(path, chunk_bytes=1 << 20):
+    """blake2b of the file bytes, memoized per (path, size, mtime)."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _content_hashes_lock:
+        if memo_key in _content_hashes:
+            return _content_hashes[memo_key]
+
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_bytes), b''):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _content_hashes_lock:
+        _content_hashes[memo_key] = digest
+    return digest
+
+
+class DecodedAudioCache(ReferenceCache):
+    """
+    Canonical decoded audio (float32, normalized exactly as load_audio returns
+    it) stored as .npy files keyed by the source file's content hash and the
+    decode parameters. Hits are opened with mmap_mode='r', so they cost no
+    decode and only the pages actually read. Same LRU size cap and atomic
+    writes as ReferenceCache.
+    """
+
+    SUFFIX = ".npy"
+
+    @staticmethod
+    def key(path, target_sr, mono):
+        # The resampling filter shapes the decoded samples too
+        zero_crossings, rolloff, beta = _filter_settings()
+        params = (f"v{DECODED_CACHE_VERSION}:{target_sr}:{'mono' if mono else 'multi'}:"
+                  f"{zero_crossings}:{rolloff}:{beta}")
+        return hashlib.blake2b(f"{file_content_hash(path)}:{params}".encode(), digest_size=20).hexdigest()
+
+    def load(self, key):
+        """Read-only memmap of the decoded samples, or None on a miss."""
+        path = self._path(key)
+        try:
+            audio = np.load(path, mmap_mode='r')
+            os.utime(path)
+            return audio
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key, audio):
+        """Save decoded samples; returns False (instead of raising) if the disk write fails."""
+        tmp_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, np.ascontiguousarray(audio, dtype=np.float32))
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        self.evict()
+        return True
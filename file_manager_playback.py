@@ -2,6 +2,7 @@ import os
 import time
 import subprocess
 import shutil  # <-- add at top
+import audio_metadata
 
 FILES_APP_PACKAGE = "com.google.android.apps.nbu.files"
 FILES_TAP_X, FILES_TAP_Y = 221, 700
@@ -33,17 +34,12 @@ def adb_safe(command_parts):
 
 def get_audio_duration(filepath):
     try:
-        result = subprocess.run(
-            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
-             "-of", "default=noprint_wrappers=1:nokey=1", filepath],
-            capture_output=True, text=True
-        )
-        return float(result.stdout.strip())
+        return audio_metadata.get_audio_duration(filepath)
     except Exception as e:
         print(f"❌ Could not get duration for {filepath}: {e}")
         return 0.0
 
-def play_via_files_app(file_path, on_kill_callback=None):
+def play_via_files_app(file_path, on_kill_callback=None, stop_event=None, on_event=None):
     filename = os.path.basename(file_path)
     remote_path = f"{FILES_TARGET_FOLDER}{filename}"
 
@@ -71,13 +67,20 @@ def play_via_files_app(file_path, on_kill_callback=None):
     print(f"👆 Sending tap at ({FILES_TAP_X},{FILES_TAP_Y})")
     adb(f"shell input tap {FILES_TAP_X} {FILES_TAP_Y}")
     tap_time = time.time()
+    if on_event:
+        on_event("play")
 
     wait_time = duration + 1
     print(f"⏳ Waiting {wait_time:.2f} seconds before killing Files app...")
-    time.sleep(wait_time)
+    if stop_event is None:
+        time.sleep(wait_time)
+    elif stop_event.wait(wait_time):
+        print("⏹️ Capture is over; stopping playback early")
 
     print("❌ Force-stopping Files app...")
     adb(f"shell am force-stop {FILES_APP_PACKAGE}")
+    if on_event:
+        on_event("stop")
 
     if on_kill_callback:
         print("⏹️ Stopping AUX recording after playback finishes...")
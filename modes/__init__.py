@@ -5,3 +5,4 @@ from .batch_mode import run_batch_mode
 from .folder_push_mode import run_folder_push_batch_mode
 from .manual_comparison_mode import run_manual_comparison_mode
 from .excel_mode import run_excel_based_testing_mode
+from .reference_matrix_mode import run_reference_matrix_mode
@@ -3,9 +3,10 @@ import time
 import threading
 from adb_controller import check_adb_connection, push_audio
 from aux_recorder import AuxRecorder
-from peaq_analyzer import run_peaq_analysis
+from peaq_analyzer import run_peaq_analyses
 from batch_processor import BatchProcessor
 from audio_utils import get_audio_duration
+from audio_metadata import filter_playable
 from file_manager import select_audio_files
 from playback_options import choose_playback_method
 import matplotlib
@@ -28,6 +29,12 @@ def run_batch_mode():
 
     print(f"📁 Selected {len(audio_files)} audio file(s)")
 
+    audio_files = filter_playable(audio_files)
+    if not audio_files:
+        print("❌ None of the selected files could be read.")
+        return
+
+    audio_files = list(audio_files)  # grows when a rejected take is re-queued
     recorder = AuxRecorder()
     if not recorder.prompt_and_set_device():
         print("❌ Aborting: No valid AUX device selected.")
@@ -40,6 +47,7 @@ def run_batch_mode():
     playback_func = choose_playback_method()
     total_start_time = time.time()
     analysis_thread = None
+    recorder.start_session()
 
     try:
         for i, file_path in enumerate(audio_files):
@@ -55,11 +63,13 @@ def run_batch_mode():
                 push_audio(path)
 
                 print("🎙️ Starting AUX recording...")
-                recorder.start(path, lambda f: playback_func(f, on_kill_callback=recorder.stop))
+                problem = recorder.start(path, lambda f: playback_func(
+                    f, on_kill_callback=recorder.stop, stop_event=recorder.playback_stop,
+                    on_event=recorder.log_playback_event))
 
                 print("⏳ Waiting for AUX recording to complete...")
                 recorder.stop()
-                return path
+                return path, problem
 
             def run_analysis(input_path):
                 output_clean = os.path.join("extracted_audio", f"{base_name}_clean.wav")
@@ -70,12 +80,14 @@ def run_batch_mode():
                 if not recorder.post_process(None, input_path, output_clean):
                     print("❌ Post-processing failed")
                     return
-                if not os.path.exists(output_clean):
+                captured = recorder.take_captured_audio(output_clean)
+                if captured is None and not os.path.exists(output_clean):
                     print(f"❌ Post-processed file not found: {output_clean}")
                     return
 
                 print("📈 Running PEAQ analysis...")
-                odg, quality = run_peaq_analysis(input_path, output_clean, processor.graphs_folder)
+                odg, quality = recorder.take_live_result(input_path) or run_peaq_analyses(
+                    [(input_path, output_clean)], processor.graphs_folder, test_audio=[captured])[0]
                 if odg is None or quality is None:
                     print("❌ PEAQ analysis failed")
                     return
@@ -92,8 +104,12 @@ def run_batch_mode():
                 )
                 print(f"✅ Successfully processed: ODG={odg:.2f}, Quality={quality}")
 
-            # Run this file
-            input_path = push_and_record(file_path)
+            # Run this file; rejected takes go back on the end of the list
+            input_path, problem = push_and_record(file_path)
+            if problem is not None:
+                if processor.mark_for_retry(input_path, problem):
+                    audio_files.append(input_path)
+                continue
 
             if analysis_thread:
                 analysis_thread.join()
@@ -114,6 +130,8 @@ def run_batch_mode():
 
     except Exception as e:
         print(f"❌ Batch mode failed: {e}")
+    finally:
+        recorder.end_session()
 
     total_time = time.time() - total_start_time
     print(f"\n{'=' * 50}")
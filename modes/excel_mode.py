@@ -8,7 +8,8 @@ from batch_processor import BatchProcessor
 from aux_recorder import AuxRecorder
 from adb_controller import check_adb_connection, push_audio
 from audio_utils import get_audio_duration
-from peaq_analyzer import run_peaq_analysis
+from audio_metadata import filter_playable
+from peaq_analyzer import run_peaq_analyses
 from config import output_audio_dir
 from playback_options import choose_playback_method
 import matplotlib
@@ -37,6 +38,7 @@ def run_excel_based_testing_mode():
         print("❌ No folder selected or folder does not exist. Aborting.")
         return
 
+    recorder = None
     try:
         df = pd.read_excel(excel_path)
         if 'Audio File' not in df.columns:
@@ -50,6 +52,7 @@ def run_excel_based_testing_mode():
             if os.path.exists(os.path.join(folder_path, f))
         ]
 
+        local_audio_files = filter_playable(local_audio_files)
         if not local_audio_files:
             print("❌ No valid audio files found in the selected folder.")
             return
@@ -60,6 +63,7 @@ def run_excel_based_testing_mode():
             return
 
         processor = BatchProcessor()
+        local_audio_files = list(local_audio_files)  # grows when a rejected take is re-queued
 
         print(f"📁 Using Excel: {os.path.basename(excel_path)}")
         print(f"📁 Audio Folder: {folder_path}")
@@ -71,6 +75,7 @@ def run_excel_based_testing_mode():
 
         total_start_time = time.time()
         analysis_thread = None
+        recorder.start_session()
 
         for i, audio_file in enumerate(local_audio_files):
             base_name = os.path.basename(audio_file)  # Keeps extension like song.mp3
@@ -82,11 +87,13 @@ def run_excel_based_testing_mode():
                 push_audio(audio_input)
 
                 print("🎙️ Starting AUX recording with Files app sync...")
-                recorder.start(audio_input, lambda f: playback_func(f, on_kill_callback=recorder.stop))
+                problem = recorder.start(audio_input, lambda f: playback_func(
+                    f, on_kill_callback=recorder.stop, stop_event=recorder.playback_stop,
+                    on_event=recorder.log_playback_event))
 
                 print("⏳ Waiting for AUX recording to complete...")
                 recorder.stop()
-                return audio_input
+                return audio_input, problem
 
             def run_analysis(audio_input, base_name):
                 output_audio = os.path.join("extracted_audio", f"{base_name}_clean.wav")
@@ -95,7 +102,9 @@ def run_excel_based_testing_mode():
                 if not recorder.post_process(None, audio_input, output_audio):
                     print("❌ Post-processing failed (AUX mode)")
                     return
-                odg, quality = run_peaq_analysis(audio_input, output_audio, processor.graphs_folder)
+                captured = recorder.take_captured_audio(output_audio)
+                odg, quality = recorder.take_live_result(audio_input) or run_peaq_analyses(
+                    [(audio_input, output_audio)], processor.graphs_folder, test_audio=[captured])[0]
                 graph_path = os.path.join(processor.graphs_folder, f"{base_name}.png")
                 interruptions = len(getattr(recorder.tracker, 'interruptions', []))
                 processor.add_result(base_name, odg, quality, time.time() - total_start_time,
@@ -103,7 +112,12 @@ def run_excel_based_testing_mode():
                 processor.save_results_to_excel()
                 print(f"✅ Successfully processed: ODG={odg:.2f}, Quality={quality}")
 
-            audio_input = push_and_record(audio_file)
+            # Rejected takes go back on the end of the list
+            audio_input, problem = push_and_record(audio_file)
+            if problem is not None:
+                if processor.mark_for_retry(audio_input, problem):
+                    local_audio_files.append(audio_input)
+                continue
 
             if analysis_thread:
                 analysis_thread.join()
@@ -125,3 +139,6 @@ def run_excel_based_testing_mode():
 
     except Exception as e:
         print(f"❌ Failed to run Excel-driven test: {e}")
+    finally:
+        if recorder is not None:
+            recorder.end_session()
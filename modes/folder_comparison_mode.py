@@ -3,7 +3,7 @@
 import os
 import glob
 import pandas as pd
-from peaq_analyzer import run_peaq_analysis
+from peaq_analyzer import run_peaq_analyses
 
 def run_folder_comparison_mode():
     print("📂 Folder Comparison Mode — Batch PEAQ Evaluation\n")
@@ -32,13 +32,11 @@ def run_folder_comparison_mode():
     graph_dir = os.path.join(output_dir, "graphs")
     os.makedirs(graph_dir, exist_ok=True)
 
-    for file in common_files:
-        ref_path = os.path.join(folder1, file)
-        test_path = os.path.join(folder2, file)
-
-        print(f"\n🔬 Comparing: {file}")
-        odg, quality = run_peaq_analysis(ref_path, test_path, graph_output_folder=graph_dir)
+    pairs = [(os.path.join(folder1, file), os.path.join(folder2, file)) for file in common_files]
+    print(f"\n🔬 Comparing {len(pairs)} file pairs...")
+    analyses = run_peaq_analyses(pairs, graph_output_folder=graph_dir)
 
+    for file, (odg, quality) in zip(common_files, analyses):
         results.append({
             "Filename": file,
             "ODG": odg,
@@ -6,7 +6,8 @@ from batch_processor import BatchProcessor
 from aux_recorder import AuxRecorder
 from adb_controller import check_adb_connection, push_audio
 from audio_utils import get_audio_duration
-from peaq_analyzer import run_peaq_analysis
+from audio_metadata import filter_playable
+from peaq_analyzer import run_peaq_analyses
 from playback_options import choose_playback_method
 import matplotlib
 matplotlib.use('Agg')  # ✅ Safe for threads; no GUI dependencies
@@ -31,8 +32,9 @@ def run_folder_push_batch_mode():
     local_folder, audio_files = folder_result
     print(f"📁 Selected folder: {local_folder} with {len(audio_files)} audio files.")
 
+    audio_files = list(filter_playable(audio_files))  # grows when a rejected take is re-queued
     if not audio_files:
-        print("❌ No audio files found in the selected folder.")
+        print("❌ No readable audio files found in the selected folder.")
         return
 
     playback_func = choose_playback_method()
@@ -42,60 +44,73 @@ def run_folder_push_batch_mode():
     total_start_time = time.time()
     analysis_thread = None
 
-    for i, audio_file in enumerate(audio_files):
-        def push_and_record(path):
-            audio_input = path  # No conversion
-
-            duration = get_audio_duration(audio_input)
-            push_audio(audio_input)
-
-            print("🎙️ Starting recording with Files app sync...")
-            recorder.start(audio_input, lambda f: playback_func(f, on_kill_callback=recorder.stop))
-
-            print("⏳ Waiting for AUX recording to complete...")
-            recorder.stop()
-            return audio_input
-
-        def run_analysis(audio_input):
-            base_name = os.path.basename(audio_input)
-            clean_name = os.path.splitext(base_name)[0]
-            output_clean = os.path.join("extracted_audio", f"{clean_name}_clean.wav")
-            if os.path.exists(output_clean):
-                os.remove(output_clean)
-            if not recorder.post_process(None, audio_input, output_clean):
-                print("❌ Post-processing failed.")
-                return
-            odg, quality = run_peaq_analysis(audio_input, output_clean, processor.graphs_folder)
-            if odg is None:
-                print("❌ PEAQ analysis failed.")
-                return
-            graph_path = os.path.join(processor.graphs_folder, f"{clean_name}.png")
-            interruptions = len(getattr(recorder.tracker, 'interruptions', []))
-            processor.add_result(
-                base_name, odg, quality,
-                time.time() - total_start_time,
-                interruptions,
-                graph_path
-            )
-            processor.save_results_to_excel()
-            print(f"✅ Successfully processed: ODG={odg:.2f}, Quality={quality}")
-
-        audio_input = push_and_record(audio_file)
+    recorder.start_session()
+    try:
+        for i, audio_file in enumerate(audio_files):
+            def push_and_record(path):
+                audio_input = path  # No conversion
+
+                duration = get_audio_duration(audio_input)
+                push_audio(audio_input)
+
+                print("🎙️ Starting recording with Files app sync...")
+                problem = recorder.start(audio_input, lambda f: playback_func(
+                    f, on_kill_callback=recorder.stop, stop_event=recorder.playback_stop,
+                    on_event=recorder.log_playback_event))
+
+                print("⏳ Waiting for AUX recording to complete...")
+                recorder.stop()
+                return audio_input, problem
+
+            def run_analysis(audio_input):
+                base_name = os.path.basename(audio_input)
+                clean_name = os.path.splitext(base_name)[0]
+                output_clean = os.path.join("extracted_audio", f"{clean_name}_clean.wav")
+                if os.path.exists(output_clean):
+                    os.remove(output_clean)
+                if not recorder.post_process(None, audio_input, output_clean):
+                    print("❌ Post-processing failed.")
+                    return
+                captured = recorder.take_captured_audio(output_clean)
+                odg, quality = recorder.take_live_result(audio_input) or run_peaq_analyses(
+                    [(audio_input, output_clean)], processor.graphs_folder, test_audio=[captured])[0]
+                if odg is None:
+                    print("❌ PEAQ analysis failed.")
+                    return
+                graph_path = os.path.join(processor.graphs_folder, f"{clean_name}.png")
+                interruptions = len(getattr(recorder.tracker, 'interruptions', []))
+                processor.add_result(
+                    base_name, odg, quality,
+                    time.time() - total_start_time,
+                    interruptions,
+                    graph_path
+                )
+                processor.save_results_to_excel()
+                print(f"✅ Successfully processed: ODG={odg:.2f}, Quality={quality}")
+
+            # Rejected takes go back on the end of the list
+            audio_input, problem = push_and_record(audio_file)
+            if problem is not None:
+                if processor.mark_for_retry(audio_input, problem):
+                    audio_files.append(audio_input)
+                continue
+
+            if analysis_thread:
+                analysis_thread.join()
+
+            analysis_thread = threading.Thread(target=run_analysis, args=(audio_input,))
+            analysis_thread.start()
+
+            if i + 1 < len(audio_files):
+                next_file = audio_files[i + 1]
+                next_push_thread = threading.Thread(target=push_audio, args=(next_file,))
+                next_push_thread.start()
+                next_push_thread.join()
 
         if analysis_thread:
             analysis_thread.join()
-
-        analysis_thread = threading.Thread(target=run_analysis, args=(audio_input,))
-        analysis_thread.start()
-
-        if i + 1 < len(audio_files):
-            next_file = audio_files[i + 1]
-            next_push_thread = threading.Thread(target=push_audio, args=(next_file,))
-            next_push_thread.start()
-            next_push_thread.join()
-
-    if analysis_thread:
-        analysis_thread.join()
+    finally:
+        recorder.end_session()
 
     processor.save_results_to_excel()
     processor.print_batch_summary()
@@ -0,0 +1,69 @@
+# modes/reference_matrix_mode.py
+
+import os
+import pandas as pd
+from peaq_analyzer import run_peaq_reference_matrix
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac', '.m4a')
+
+
+def run_reference_matrix_mode():
+    print("🧮 Reference Matrix Mode — One Reference vs Many Phones\n")
+
+    ref_folder = input("Enter path to reference folder: ").strip('"')
+    if not os.path.isdir(ref_folder):
+        print("❌ Reference folder does not exist.")
+        return
+
+    print("Enter test folders one per line (e.g. phone1, phone2, ...). Leave empty to finish.")
+    test_folders = []
+    while True:
+        folder = input(f"Test folder {len(test_folders) + 1}: ").strip().strip('"')
+        if not folder:
+            break
+        if not os.path.isdir(folder):
+            print(f"⚠️ Skipping missing folder: {folder}")
+            continue
+        test_folders.append(folder)
+
+    if not test_folders:
+        print("❌ No test folders given.")
+        return
+
+    labels = [os.path.basename(os.path.normpath(folder)) for folder in test_folders]
+    ref_files = sorted(f for f in os.listdir(ref_folder) if f.lower().endswith(AUDIO_EXTENSIONS))
+
+    # Only references that every test folder has a recording of
+    common_files = [
+        f for f in ref_files
+        if all(os.path.isfile(os.path.join(folder, f)) for folder in test_folders)
+    ]
+    if not common_files:
+        print("❌ No reference filenames found in every test folder.")
+        return
+
+    print(f"🔍 {len(common_files)} reference files × {len(test_folders)} test folders ({', '.join(labels)})")
+
+    output_dir = "reference_matrix_results"
+    graph_dir = os.path.join(output_dir, "graphs")
+    os.makedirs(graph_dir, exist_ok=True)
+
+    references = [
+        (os.path.join(ref_folder, f), [os.path.join(folder, f) for folder in test_folders])
+        for f in common_files
+    ]
+    matrix = run_peaq_reference_matrix(references, graph_dir, labels)
+
+    rows = []
+    for file, scores in zip(common_files, matrix):
+        row = {"Filename": file}
+        for label, (odg, quality) in zip(labels, scores):
+            row[f"ODG {label}"] = odg
+            row[f"Quality {label}"] = quality
+        rows.append(row)
+
+    df = pd.DataFrame(rows)
+    excel_path = os.path.join(output_dir, "reference_matrix.xlsx")
+    df.to_excel(excel_path, index=False)
+    print(f"\n✅ Reference matrix complete! Results saved to: {excel_path}")
+    print(f"📊 Graphs saved in: {graph_dir}")
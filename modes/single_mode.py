@@ -36,5 +36,7 @@ def run_single_mode():
 
     output_clean = os.path.join(output_audio_dir, f"{os.path.splitext(os.path.basename(audio_file))[0]}_clean.wav")
     if recorder.post_process(None, audio_file, output_clean):
-        odg, quality = run_peaq_analysis(audio_file, output_clean, "results/single")
+        captured = recorder.take_captured_audio(output_clean)
+        odg, quality = recorder.take_live_result(audio_file) or run_peaq_analysis(
+            audio_file, output_clean, "results/single", test_audio=captured)
         print(f"\n🎯 ODG: {odg:.2f} | Quality: {quality}")
@@ -1,12 +1,13 @@
 import threading
 import time
+import math
 import os
 import subprocess
 import shutil
 import pandas as pd
 from datetime import datetime
 
-from trim_utils import split_audio_by_durations
+from trim_utils import split_captures, parse_duration
 from spotify import (
     list_audio_input_devices,
     launch_gaana,
@@ -26,18 +27,6 @@ def get_adb_devices():
             devices.append(serial)
     return devices
 
-def parse_duration(duration_str):
-    if isinstance(duration_str, str) and ':' in duration_str:
-        try:
-            minutes, seconds = map(int, duration_str.strip().split(":"))
-            return minutes * 60 + seconds
-        except Exception:
-            return None
-    try:
-        return int(float(duration_str))
-    except Exception:
-        return None
-
 def calculate_total_duration_from_excel(excel_path):
     df = pd.read_excel(excel_path)
     if "duration" not in df.columns:
@@ -50,7 +39,8 @@ def calculate_total_duration_from_excel(excel_path):
             print(f"❌ Skipping invalid duration format: {val}")
             continue
         total_seconds += seconds
-    return total_seconds
+    # Whole seconds, rounded up so the recording covers every (fractional) track
+    return int(math.ceil(total_seconds))
 
 def record_audio(device_name, total_duration_sec, output_path):
     duration_with_buffer = total_duration_sec + 1
@@ -108,18 +98,12 @@ def run_for_device(phone_label, audio_device, app_choice, excel_path, adb_serial
     subprocess.run(["adb", "-s", adb_serial, "shell", "am", "force-stop", app_package])
     print(f"[{phone_label}] 🛑 {app_package} stopped. Recording complete.")
 
-    # Split tracks
-    print(f"[{phone_label}] ✂️ Splitting long recording into individual tracks...")
+def prepare_split_folder(phone_label):
     split_output_folder = f"{phone_label}_tracks"
     if os.path.exists(split_output_folder):
         shutil.rmtree(split_output_folder)
     os.makedirs(split_output_folder, exist_ok=True)
-    split_audio_by_durations(
-        input_audio=output_filename,
-        excel_path=excel_path,
-        output_dir=split_output_folder
-    )
-    print(f"[{phone_label}] ✅ All tracks saved in: {split_output_folder}")
+    return split_output_folder
 
 def main():
     print(f"Using Excel file from config: {excel_path}")
@@ -172,6 +156,16 @@ def main():
     for t in threads:
         t.join()
 
+    # Split tracks: every capture is read/decoded once, all phones at the same time
+    print("\n✂️ Splitting long recordings into individual tracks...")
+    captures = {
+        f"{phone_label}_spotify_raw.wav": prepare_split_folder(phone_label)
+        for phone_label in sorted(phone_serials.keys())
+    }
+    split_captures(captures, excel_path)
+    for split_output_folder in captures.values():
+        print(f"✅ All tracks saved in: {split_output_folder}")
+
     print("\nAll device recordings and splits complete.")
 
 if __name__ == "__main__":
@@ -1,59 +1,486 @@
 ## peaq_analyzer.py
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 import numpy as np
-from PEAQ import PEAQ
-from audio_utils import load_audio, align_signals_by_cross_correlation
+import soundfile as sf
+from PEAQ import PEAQ, StreamingPEAQ, ReferenceCache
+from PEAQ.sharding import plan_shards, evaluate_shard
+from audio_utils import (
+    load_audio, align_signals_by_cross_correlation, iter_audio_chunks,
+    audio_peak, audio_frames, read_audio_segment, analysis_sample_rate, prepare_audio,
+    get_audio_duration,
+)
+from alignment import apply_lag, estimate_lag, fit_drift, iter_drift_corrected
+from resampler import StreamingResampler, output_length, resample
 from utils.plotting_utils import plot_peaq_results
 import config
 
 
-def run_peaq_analysis(ref_path, test_path, graph_output_folder):
+_reference_cache = None
+
+
+def get_reference_cache():
+    """Process-wide ReferenceCache from config (None when REFERENCE_CACHE_DIR is unset)."""
+    global _reference_cache
+    cache_dir = getattr(config, 'REFERENCE_CACHE_DIR', None)
+    if not cache_dir:
+        return None
+    if _reference_cache is None or _reference_cache.cache_dir != cache_dir:
+        max_mb = getattr(config, 'REFERENCE_CACHE_MAX_MB', 2048)
+        _reference_cache = ReferenceCache(cache_dir, max_bytes=int(max_mb * 1024 * 1024))
+    return _reference_cache
+
+
+def _delay_compensation_samples(sr=44100):
+    """Fixed delay compensation in samples at ``sr`` (SAMPLE_DELAY_COMPENSATION is given at 44.1kHz)."""
+    if (hasattr(config, 'ENABLE_AUTO_DELAY_COMPENSATION') and
+        config.ENABLE_AUTO_DELAY_COMPENSATION and
+        hasattr(config, 'SAMPLE_DELAY_COMPENSATION')):
+        if sr == 44100:
+            return config.SAMPLE_DELAY_COMPENSATION
+        return int(round(config.SAMPLE_DELAY_COMPENSATION * sr / 44100))
+    return 0
+
+
+def _pair_lag(ref, test, sr):
+    """
+    Samples by which ``test`` starts after ``ref``: measured by cross-correlation
+    when AUTO_ALIGN is on and the match is confident, else the fixed compensation.
+    """
+    fixed = _delay_compensation_samples(sr)
+    if not getattr(config, 'AUTO_ALIGN', False):
+        return fixed
+    result = estimate_lag(ref, test, sr, max_lag_seconds=getattr(config, 'ALIGN_MAX_LAG_SECONDS', 1.0))
+    if result.confidence < getattr(config, 'ALIGN_MIN_CONFIDENCE', 0.3):
+        print(f"⚠️ Cross-correlation inconclusive (confidence {result.confidence:.2f}); "
+              f"using fixed {fixed} sample delay")
+        return fixed
+    print(f"🎯 Measured lag: {result.lag} samples ({result.lag/sr*1000:.1f}ms), confidence {result.confidence:.2f}")
+    return result.lag
+
+
+def _file_lag(ref_path, test_path, sr):
+    """_pair_lag measured on the first ALIGN_EXCERPT_SECONDS of two files (streamed captures)."""
+    if not getattr(config, 'AUTO_ALIGN', False):
+        return _delay_compensation_samples(sr)
+    excerpt = int(getattr(config, 'ALIGN_EXCERPT_SECONDS', 60) * sr)
+    max_lag = int(getattr(config, 'ALIGN_MAX_LAG_SECONDS', 1.0) * sr)
+    ref = _read_excerpt(ref_path, excerpt, sr)
+    test = _read_excerpt(test_path, excerpt + max_lag, sr)
+    return _pair_lag(ref, test, sr)
+
+
+def _read_excerpt(path, num_samples, sr):
+    """First ``num_samples`` mono samples of ``path`` at ``sr`` (resampled when the file's rate differs)."""
+    native_sr = sf.info(path).samplerate
+    if native_sr == sr:
+        return read_audio_segment(path, 0, num_samples, 1.0)
+    # Read a little past the end so the resampler's tail does not fade the last samples
+    native = read_audio_segment(path, 0, int(num_samples * native_sr / sr) + native_sr // 10, 1.0)
+    return resample(native, native_sr, sr)[:num_samples]
+
+
+def _use_drift_correction(num_samples, sr):
+    min_seconds = getattr(config, 'DRIFT_MIN_SECONDS', None)
+    return bool(min_seconds) and num_samples >= min_seconds * sr
+
+
+def _drift_options():
+    return {
+        'window_seconds': getattr(config, 'DRIFT_WINDOW_SECONDS', 1.0),
+        'hop_seconds': getattr(config, 'DRIFT_HOP_SECONDS', 30),
+        'min_confidence': getattr(config, 'ALIGN_MIN_CONFIDENCE', 0.3),
+    }
+
+
+def _report_drift(anchors, sr):
+    offset, ppm = fit_drift(anchors, sr, getattr(config, 'ALIGN_MIN_CONFIDENCE', 0.3))
+    print(f"⏱️ Clock drift: {ppm:+.1f} ppm over {len(anchors)} anchors (lag {offset:.1f} samples at start)")
+
+
+def _drift_corrected(ref, test, sr):
+    """Already lag-aligned (N,) or (C, N) arrays with the test warped to follow clock drift."""
+    anchors = []
+    pairs = list(iter_drift_corrected(lambda a, b: ref[..., a:b], lambda a, b: test[..., a:b],
+                                      ref.shape[-1], test.shape[-1], sr, anchors=anchors, **_drift_options()))
+    _report_drift(anchors, sr)
+    if not pairs:
+        return ref[..., :0], test[..., :0]
+    return (np.concatenate([p[0] for p in pairs], axis=-1),
+            np.concatenate([p[1] for p in pairs], axis=-1))
+
+
+def _frame_params(hop_size=None):
+    """(frame_size, hop_size) for the ear model; hop_size overrides config.HOP_SIZE."""
+    frame_size = getattr(config, 'FRAME_SIZE', 2048)
+    hop_size = hop_size or getattr(config, 'HOP_SIZE', None) or frame_size // 2
+    return frame_size, hop_size
+
+
+def _should_stream(ref_path, test_path):
+    """Long captures soundfile can stream go through the bounded-memory streaming evaluator."""
+    min_seconds = getattr(config, 'STREAMING_ANALYSIS_MIN_SECONDS', None)
+    if not min_seconds:
+        return False
+    try:
+        ref_info = sf.info(ref_path)
+        test_info = sf.info(test_path)
+    except Exception:
+        return False
+    return ref_info.duration >= min_seconds and test_info.duration > 0
+
+
+def run_peaq_analysis_streaming(ref_path, test_path, chunk_seconds=None, hop_size=None):
+    """
+    PEAQ over fixed-size chunks with StreamingPEAQ: same ODG/MOVs as
+    run_peaq_analysis, but memory does not grow with track length.
+    No per-frame plot is produced.
+    """
     try:
         print("\n" + "=" * 60)
-        print("🔬 STARTING PEAQ AUDIO QUALITY ANALYSIS")
+        print("🔬 STARTING STREAMING PEAQ AUDIO QUALITY ANALYSIS")
         print("=" * 60)
+        print(f"📁 Reference: {ref_path}")
+        print(f"📁 Test: {test_path}")
+
+        sr = analysis_sample_rate(ref_path, test_path)
+        chunk_seconds = chunk_seconds or getattr(config, 'STREAMING_CHUNK_SECONDS', 10)
+        chunk_frames = int(chunk_seconds * sr)
+        frame_size, hop_size = _frame_params(hop_size)
+
+        delay_samples = _file_lag(ref_path, test_path, sr)
+        if delay_samples < 0:
+            print("⚠️ Test starts before the reference; streaming only trims the test side")
+            delay_samples = 0
+        if delay_samples:
+            print(f"🔧 Applying {delay_samples} sample delay compensation ({delay_samples/sr*1000:.1f}ms)")
+
+        num_samples = min(audio_frames(ref_path, sr), audio_frames(test_path, sr) - delay_samples)
+        # Drift tracking and shards read sample ranges straight from disk, so they need native-rate files
+        native_rate = sf.info(ref_path).samplerate == sf.info(test_path).samplerate == sr
+        if not native_rate:
+            print(f"🔁 Resampling to {sr}Hz on the fly (polyphase, chunked)")
+        shard_workers = _shard_workers(num_samples, sr) if native_rate else 1
+        if native_rate and _use_drift_correction(num_samples, sr):
+            # Drift tracking is one sequential pass, so it is not sharded
+            model = StreamingPEAQ(fs=sr, NF=frame_size, hop=hop_size)
+            ref_peak, test_peak = audio_peak(ref_path), audio_peak(test_path)
+            anchors = []
+            for ref_chunk, test_chunk in iter_drift_corrected(
+                lambda a, b: read_audio_segment(ref_path, a, b, ref_peak),
+                lambda a, b: read_audio_segment(test_path, a, b, test_peak),
+                sf.info(ref_path).frames, sf.info(test_path).frames, sr,
+                initial_lag=delay_samples, chunk=chunk_frames, anchors=anchors, **_drift_options()
+            ):
+                model.update(ref_chunk, test_chunk)
+            _report_drift(anchors, sr)
+        elif shard_workers > 1:
+            model = _evaluate_files_sharded(ref_path, test_path, sr, delay_samples, num_samples,
+                                            shard_workers, frame_size, hop_size)
+        else:
+            model = StreamingPEAQ(fs=sr, NF=frame_size, hop=hop_size)
+            ref_chunks = iter_audio_chunks(ref_path, chunk_frames, sr)
+            test_chunks = iter_audio_chunks(test_path, chunk_frames, sr, skip_samples=delay_samples)
+            for ref_chunk, test_chunk in zip(ref_chunks, test_chunks):
+                model.update(ref_chunk, test_chunk)
+
+        print(f"📐 Evaluated {model.num_samples} aligned samples in {model.num_frames} frames")
+        if model.num_samples < 1024:
+            raise ValueError("Signals too short for PEAQ analysis")
+
+        odg, movs = model.computeODG()
+
+        if odg is None or np.isnan(odg) or np.isinf(odg):
+            raise ValueError("ODG value is invalid")
+
+        quality = classify_quality(odg)
+        print(f"✅ ODG = {odg:.2f} | Quality = {quality}")
+        return odg, quality
+
+    except Exception as e:
+        print(f"❌ Streaming PEAQ Analysis Failed: {e}")
+        return None, None
+
+
+def _capture_mono(capture, start, stop):
+    """Mono float32 of capture frames [start, stop), scaled like prepare_audio (before normalization)."""
+    frames = capture.buffer.read(start, stop).astype(np.float32) / np.float32(32768)
+    return frames.mean(axis=1)
+
+
+class _LiveCancelled(Exception):
+    pass
+
 
-        ref_sr, ref = load_audio(ref_path)
-        test_sr, test = load_audio(test_path)
+class _LiveTake:
+    """
+    Capture frames [offset, offset + take_frames) as mono float32 at ``sr``,
+    resampled chunk by chunk as they arrive: the samples prepare_audio gives
+    for the finished take, before its peak normalization. Setting ``cancel``
+    stops the wait at the next chunk.
+    """
 
+    def __init__(self, capture, offset, take_frames, sr, chunk_frames, stall, cancel=None):
+        self.capture = capture
+        self.cancel = cancel
+        self.offset = offset
+        self.take_frames = take_frames
+        self.chunk_frames = chunk_frames
+        self.stall = stall
+        self.resampler = StreamingResampler(capture.samplerate, sr)
+        self.samples = np.zeros(output_length(take_frames, capture.samplerate, sr), dtype=np.float32)
+        self.available = 0
+        self.ended = False
+        self._read = 0
+
+    def fill(self, needed):
+        """Resample until ``needed`` samples are in; False if the capture ended first."""
+        while self.available < needed and not self.ended:
+            if self.cancel is not None and self.cancel.is_set():
+                raise _LiveCancelled()
+            stop = min(self._read + self.chunk_frames, self.take_frames)
+            complete = self.capture.wait_for_frames(self.offset + stop, self.stall)
+            raw = _capture_mono(self.capture, self.offset + self._read, self.offset + stop)
+            self._read += len(raw)
+            out = self.resampler.process(raw)
+            if self._read >= self.take_frames or not complete:
+                self.ended = True
+                out = np.concatenate([out, self.resampler.flush()])
+            out = out[:len(self.samples) - self.available]
+            self.samples[self.available:self.available + len(out)] = out
+            self.available += len(out)
+        return self.available >= needed
+
+
+def run_peaq_analysis_live(ref_path, capture, pre_roll_seconds=0.0, chunk_seconds=None, hop_size=None,
+                           cancel=None):
+    """
+    PEAQ of a capture while it is still recording (capture_stream.PcmCapture).
+    The take is resampled to the offline analysis rate as it arrives. After
+    its first LIVE_ALIGN_SECONDS the lag is estimated; from then on aligned
+    chunks are framed and transformed as soon as they are in. The take's peak
+    (prepare_audio's normalization) is only known at the end, so excitations
+    are computed at the raw capture scale and rescaled by the squared gain
+    afterwards. Once the take is complete the lag is measured on all of it,
+    as run_peaq_analysis does; if that differs from the live estimate (or
+    drift correction or per-channel analysis applies) the take is scored
+    again the offline way. Either way the score matches the offline analysis
+    of the same take. Setting the ``cancel`` event (a rejected take) ends
+    the analysis within a chunk; it then returns (None, None).
+    """
+    try:
+        print("\n" + "=" * 60)
+        print("🔬 STARTING LIVE PEAQ ANALYSIS (while recording)")
+        print("=" * 60)
         print(f"📁 Reference: {ref_path}")
-        print(f"📁 Test: {test_path}")
-        print(f"📐 Original lengths — ref: {len(ref)}, test: {len(test)}")
 
+        sr = analysis_sample_rate(ref_path)
+        mono = not getattr(config, 'PEAQ_PER_CHANNEL', False)
+        ref_sr, ref = load_audio(ref_path, target_sr=sr, mono=mono)
+        chunk_seconds = chunk_seconds or getattr(config, 'LIVE_CHUNK_SECONDS', 1.0)
+        stall = getattr(config, 'LIVE_STALL_SECONDS', 10)
+        frame_size, hop_size = _frame_params(hop_size)
+        # Same take boundaries as AuxRecorder.post_process
+        offset = int(round(pre_roll_seconds * capture.samplerate))
+        take_frames = int(round(get_audio_duration(ref_path) * capture.samplerate))
+        take = _LiveTake(capture, offset, take_frames, sr, int(chunk_seconds * capture.samplerate), stall,
+                         cancel)
+        if capture.samplerate != sr:
+            print(f"🔁 Resampling the capture from {capture.samplerate}Hz to {sr}Hz as it arrives")
+
+        blocks = []
+        live_delay = None
+        num_samples = 0
+        if mono:
+            # Wait for enough of the take to align on
+            excerpt = min(len(ref), int(getattr(config, 'LIVE_ALIGN_SECONDS', 10) * sr))
+            max_lag = int(getattr(config, 'ALIGN_MAX_LAG_SECONDS', 1.0) * sr)
+            take.fill(excerpt + max_lag)
+            test_head = take.samples[:min(take.available, excerpt + max_lag)]
+            if len(test_head) < 1024:
+                raise ValueError("Capture ended before the reference started playing")
+            live_delay = max(0, _pair_lag(ref[:excerpt], test_head, sr))
+            print(f"🔧 Live alignment: {live_delay} samples ({live_delay/sr*1000:.1f}ms)")
+
+            acc = StreamingPEAQ(fs=sr, NF=frame_size, hop=hop_size)
+            chunk = int(chunk_seconds * sr)
+            target = min(len(ref), len(take.samples) - live_delay)
+            while num_samples < target:
+                take.fill(live_delay + min(num_samples + chunk, target))
+                stop = min(num_samples + chunk, target, take.available - live_delay)
+                if stop <= num_samples:
+                    print(f"⚠️ Capture ended {(target - num_samples) / sr:.2f}s before the reference did")
+                    break
+                acc.update(ref[num_samples:stop], take.samples[live_delay + num_samples:live_delay + stop],
+                           on_block=lambda f0, f1, EbR, EhsR, EbT: blocks.append((EbR, EhsR, EbT)))
+                num_samples = stop
+            print(f"📐 Evaluated {num_samples} aligned samples in {acc.num_frames} frames while recording")
+        else:
+            print("🎚️ Per-channel analysis: the take is scored once it is complete")
+        take.fill(len(take.samples))
+
+        # What run_peaq_analysis sees for this take: peak normalized, lag measured on all of it
+        raw = take.samples[:take.available]
+        peak = np.max(np.abs(raw)) if len(raw) else 0
+        if mono:
+            test = raw / peak if peak > 0 else raw.copy()
+        else:
+            frames = capture.buffer.read(offset, offset + take_frames)
+            _, test = prepare_audio(frames, capture.samplerate, target_sr=sr, mono=False)
+            ref, test = _match_channels(ref, test)
+        delay_samples = _pair_lag(_downmix(ref), _downmix(test), sr)
+
+        model = PEAQ(fs=sr, frame_size=frame_size, hop_size=hop_size)
+        streamed = (live_delay is not None and delay_samples == live_delay and blocks and
+                    num_samples == min(len(ref), len(test) - delay_samples) and
+                    not _use_drift_correction(num_samples, sr))
+        if streamed:
+            gain = np.float64(1.0 / peak) if peak > 0 else np.float64(1.0)
+            EbNMatR, EhsR, EbNMatT = (np.concatenate([block[i] for block in blocks]) for i in range(3))
+            model.load_frames(EbNMatR, EhsR, EbNMatT * gain ** 2,
+                              np.mean(np.abs(test[delay_samples:delay_samples + num_samples] - ref[:num_samples])))
+        else:
+            if live_delay is not None:
+                print(f"🔁 Re-scoring the take offline (full-take lag {delay_samples}, live estimate {live_delay})")
+            ref, test, ref_full = _align_pair(ref, test, sr, delay_samples)
+            if ref.shape[-1] < 1024:
+                raise ValueError("Signals too short for PEAQ analysis")
+            model.process_reference(ref_full)
+            model.process_test(test)
+        if len(model.EbNMatT) == 0:
+            raise ValueError("Signals too short for PEAQ analysis")
+
+        odg, movs = model.computeODG()
+        if odg is None or np.isnan(odg) or np.isinf(odg):
+            raise ValueError("ODG value is invalid")
+
+        quality = classify_quality(odg)
+        print(f"✅ Live ODG = {odg:.2f} | Quality = {quality}")
+        _report_channels(movs)
+        return odg, quality
+
+    except _LiveCancelled:
+        print("⏹️ Live PEAQ analysis cancelled (take rejected)")
+        return None, None
+    except Exception as e:
+        print(f"❌ Live PEAQ Analysis Failed: {e}")
+        return None, None
+
+
+def _downmix(signal):
+    """Mono view of a (N,) or channels-first (C, N) signal."""
+    return signal if signal.ndim == 1 else signal.mean(axis=0)
+
+
+def _match_channels(ref, test):
+    """Keep per-channel signals only when both sides have the same channel layout."""
+    if ref.shape[:-1] == test.shape[:-1]:
+        return ref, test
+    print(f"⚠️ Channel layouts differ (ref {ref.shape[:-1] or 'mono'}, test {test.shape[:-1] or 'mono'}); "
+          f"analysing the mono downmix")
+    return _downmix(ref), _downmix(test)
+
+
+def _report_channels(movs):
+    for c, channel in enumerate(movs.get('channels', [])):
+        print(f"   🎚️ Channel {c + 1}: ODG = {channel['ODG']:.2f} | NMR = {channel['NMRtotB']:.2f}dB "
+              f"| ADB = {channel['ADB']:.2f} | BW ref/test = {channel['AvgBwRef']:.1f}/{channel['AvgBwTst']:.1f}")
+
+
+def _align_pair(ref, test, sr, delay_samples=None):
+    """
+    (ref, test, ref_full): the pair with the lag (measured on the downmix
+    unless given) and drift applied, and the reference to cache excitations
+    for (its head dropped when the test starts early).
+    """
+    ref_full = ref
+    if delay_samples is None:
         # Apply sample-level delay compensation BEFORE any other processing
-        if (hasattr(config, 'ENABLE_AUTO_DELAY_COMPENSATION') and 
-            config.ENABLE_AUTO_DELAY_COMPENSATION and
-            hasattr(config, 'SAMPLE_DELAY_COMPENSATION')):
-            
-            delay_samples = config.SAMPLE_DELAY_COMPENSATION
-            print(f"🔧 Applying {delay_samples} sample delay compensation ({delay_samples/ref_sr*1000:.1f}ms)")
-            
-            # Trim the delay from the test signal
-            if len(test) > delay_samples:
-                test = test[delay_samples:]
-                print(f"✂️ Test signal trimmed by {delay_samples} samples")
-            else:
-                print("⚠️ Test signal too short for delay compensation")
+        delay_samples = _pair_lag(_downmix(ref), _downmix(test), sr)
+    if delay_samples:
+        print(f"🔧 Applying {delay_samples} sample delay compensation ({delay_samples/sr*1000:.1f}ms)")
+        if abs(delay_samples) >= min(ref.shape[-1], test.shape[-1]):
+            print("⚠️ Signals too short for delay compensation")
+            delay_samples = 0
+        elif delay_samples > 0:
+            print(f"✂️ Test signal trimmed by {delay_samples} samples")
+        else:
+            # Test starts early: the reference loses its head instead
+            ref_full = ref[..., -delay_samples:]
+            print(f"✂️ Reference signal trimmed by {-delay_samples} samples")
+
+    # Trim the late signal and make both the same length
+    ref, test = apply_lag(ref, test, delay_samples)
+    if _use_drift_correction(ref.shape[-1], sr):
+        ref, test = _drift_corrected(ref, test, sr)
+    return ref, test, ref_full
+
+
+def run_peaq_analysis(ref_path, test_path, graph_output_folder, hop_size=None, test_audio=None,
+                      plot_title=None):
+    """
+    Full PEAQ comparison of ``test_path`` against ``ref_path`` with a per-frame
+    plot (titled ``plot_title`` if given). ``test_audio`` = (samplerate,
+    samples) analyses an in-memory capture (AuxRecorder stream mode) instead
+    of reading ``test_path``.
+    """
+    if test_audio is None and _should_stream(ref_path, test_path):
+        print("📼 Long recording detected - using streaming PEAQ (no per-frame plot)")
+        return run_peaq_analysis_streaming(ref_path, test_path, hop_size=hop_size)
+
+    try:
+        print("\n" + "=" * 60)
+        print("🔬 STARTING PEAQ AUDIO QUALITY ANALYSIS")
+        print("=" * 60)
 
-        # Ensure both signals are the same length after delay compensation
-        min_len = min(len(ref), len(test))
-        ref = ref[:min_len]
-        test = test[:min_len]
-        
-        print(f"📐 Final aligned lengths — ref: {len(ref)}, test: {len(test)}")
+        sr = analysis_sample_rate(ref_path, *([test_path] if test_audio is None else []))
+        # Per-channel analysis keeps (C, N) signals; lag and drift are measured on the downmix
+        mono = not getattr(config, 'PEAQ_PER_CHANNEL', False)
+        ref_sr, ref = load_audio(ref_path, target_sr=sr, mono=mono)
+        if test_audio is not None:
+            print(f"🧠 Using the in-memory capture ({len(test_audio[1]) / test_audio[0]:.2f}s) as test signal")
+            test_sr, test = prepare_audio(test_audio[1], test_audio[0], target_sr=sr, mono=mono)
+        else:
+            test_sr, test = load_audio(test_path, target_sr=sr, mono=mono)
+        ref, test = _match_channels(ref, test)
+
+        print(f"📁 Reference: {ref_path}")
+        print(f"📁 Test: {test_path}")
+        print(f"📐 Original lengths — ref: {ref.shape[-1]}, test: {test.shape[-1]}")
+        if ref.ndim > 1:
+            print(f"🎚️ Per-channel analysis: {ref.shape[0]} channels in one batched pass")
+
+        ref, test, ref_full = _align_pair(ref, test, ref_sr)
+        print(f"📐 Final aligned lengths — ref: {ref.shape[-1]}, test: {test.shape[-1]}")
 
         # Calculate signal difference after sample-level alignment
         diff_after = np.mean(np.abs(ref - test))
         print(f"🔍 Signal difference after sample-level alignment: {diff_after:.6f}")
 
-        # Skip cross-correlation alignment since we've done sample-level alignment
-        print("🚫 Skipping cross-correlation alignment (using sample-level compensation)")
-
-        if len(ref) < 1024 or len(test) < 1024:
+        if ref.shape[-1] < 1024 or test.shape[-1] < 1024:
             raise ValueError("Signals too short for PEAQ analysis")
 
-        model = PEAQ(fs=ref_sr)
-        model.process(ref, test)
+        base_name = os.path.splitext(os.path.basename(ref_path))[0]
+        frame_store = None
+        if getattr(config, 'PEAQ_FRAME_STORE', False):
+            # Per-frame matrices go to .npy memmaps next to the graphs instead of RAM
+            frame_store = os.path.join(graph_output_folder, "frames", base_name)
+            print(f"💾 Per-frame PEAQ data: {frame_store}")
+
+        frame_size, hop_size = _frame_params(hop_size)
+        model = PEAQ(fs=ref_sr, frame_store=frame_store, frame_size=frame_size, hop_size=hop_size)
+        shard_workers = _shard_workers(ref.shape[-1], ref_sr)
+        with _optional_pool(shard_workers) as pool:
+            if pool is not None:
+                print(f"🧩 Evaluating in frame-aligned shards on {shard_workers} worker processes")
+            # The untrimmed reference keeps its cache key stable across test lengths
+            model.process_reference(ref_full, cache=get_reference_cache(),
+                                    workers=shard_workers, executor=pool)
+            model.process_test(test, workers=shard_workers, executor=pool)
+        if model.reference_cache_hit:
+            print("♻️ Reference excitation patterns loaded from cache")
 
         if not hasattr(model, 'BWRef') or len(model.BWRef) == 0:
             raise ValueError("PEAQ model did not produce bandwidth output")
@@ -63,13 +490,13 @@ def run_peaq_analysis(ref_path, test_path, graph_output_folder):
         if odg is None or np.isnan(odg) or np.isinf(odg):
             raise ValueError("ODG value is invalid")
 
-        base_name = os.path.splitext(os.path.basename(ref_path))[0]
         graph_path = os.path.join(graph_output_folder, f"{base_name}.png")
-        plot_peaq_results(model, output_path=graph_path, show=False)
+        plot_peaq_results(model, output_path=graph_path, show=False, title=plot_title)
 
         quality = classify_quality(odg)
 
         print(f"✅ ODG = {odg:.2f} | Quality = {quality}")
+        _report_channels(movs)
         print(f"📊 Plot saved to: {graph_path}")
         return odg, quality
 
@@ -78,14 +505,289 @@ def run_peaq_analysis(ref_path, test_path, graph_output_folder):
         return None, None
 
 
+def run_peaq_analysis_multi(ref_path, test_paths, graph_output_folder, labels=None):
+    """
+    Score several test recordings against one reference. The reference is
+    decoded and its excitation patterns computed once; each test only pays
+    for its own side. Returns a list of (odg, quality) in ``test_paths`` order.
+    Graphs are saved as <reference>_<label>.png.
+    """
+    test_paths = list(test_paths)
+    labels = list(labels) if labels is not None else [
+        os.path.splitext(os.path.basename(p))[0] for p in test_paths
+    ]
+    try:
+        print("\n" + "=" * 60)
+        print(f"🔬 STARTING PEAQ ANALYSIS: 1 REFERENCE vs {len(test_paths)} TESTS")
+        print("=" * 60)
+        print(f"📁 Reference: {ref_path}")
+
+        ref_sr, ref = load_audio(ref_path, target_sr=analysis_sample_rate(ref_path, *test_paths))
+        if len(ref) < 1024:
+            raise ValueError("Reference too short for PEAQ analysis")
+
+        frame_size, hop_size = _frame_params()
+        model = PEAQ(fs=ref_sr, frame_size=frame_size, hop_size=hop_size)
+        model.process_reference(ref, cache=get_reference_cache())
+        if model.reference_cache_hit:
+            print("♻️ Reference excitation patterns loaded from cache")
+    except Exception as e:
+        print(f"❌ PEAQ Analysis Failed: {e}")
+        return [(None, None)] * len(test_paths)
+
+    base_name = os.path.splitext(os.path.basename(ref_path))[0]
+    results = []
+    for test_path, label in zip(test_paths, labels):
+        try:
+            print(f"\n📁 Test [{label}]: {test_path}")
+            test_sr, test = load_audio(test_path, target_sr=ref_sr)
+            if test_sr != ref_sr:
+                raise ValueError(f"Sample rate mismatch: ref {ref_sr}Hz, test {test_sr}Hz")
+
+            delay_samples = _pair_lag(ref, test, ref_sr)
+            if delay_samples < 0:
+                # The shared reference pass cannot drop samples for one test
+                print("⚠️ Test starts before the reference; using the fixed delay")
+                delay_samples = _delay_compensation_samples(ref_sr)
+            if delay_samples and len(test) > delay_samples:
+                test = test[delay_samples:]
+            if min(len(ref), len(test)) < 1024:
+                raise ValueError("Signals too short for PEAQ analysis")
+
+            model.process_test(test)
+            odg, movs = model.computeODG()
+            if odg is None or np.isnan(odg) or np.isinf(odg):
+                raise ValueError("ODG value is invalid")
+
+            graph_path = os.path.join(graph_output_folder, f"{base_name}_{label}.png")
+            plot_peaq_results(model, output_path=graph_path, show=False)
+
+            quality = classify_quality(odg)
+            print(f"✅ [{label}] ODG = {odg:.2f} | Quality = {quality}")
+            results.append((odg, quality))
+        except Exception as e:
+            print(f"❌ PEAQ Analysis Failed for {label}: {e}")
+            results.append((None, None))
+    return results
+
+
+# Native thread pools that would otherwise start one thread per core in every worker
+_THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS",
+)
+
+
+def _init_peaq_worker(threads_per_worker):
+    """
+    Pool worker setup, done in the worker so the parent's environment (and the
+    players and ffmpeg it launches meanwhile) is never touched: capped BLAS/FFT
+    threads (threadpoolctl for libraries numpy already loaded, the variables
+    for anything loaded later), headless plots, and no nested pools.
+    """
+    os.environ.update({var: str(threads_per_worker) for var in _THREAD_ENV_VARS})
+    os.environ["MPLBACKEND"] = "Agg"
+    os.environ["PEAQ_POOL_WORKER"] = "1"
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(threads_per_worker)
+    except ImportError:
+        pass
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+# Worker processes of the PEAQ pools open in this process (analysis threads may overlap)
+_pool_workers_running = 0
+_pool_lock = threading.Lock()
+
+
+def _available_workers(requested):
+    """``requested`` capped to the cores not already taken by PEAQ pools running in this process."""
+    with _pool_lock:
+        free = (os.cpu_count() or 1) - _pool_workers_running
+    return max(1, min(requested, free))
+
+
+@contextmanager
+def _peaq_pool(workers):
+    """ProcessPoolExecutor whose workers run with capped native threads."""
+    global _pool_workers_running
+    threads = getattr(config, 'PEAQ_THREADS_PER_WORKER', 1)
+    with _pool_lock:
+        _pool_workers_running += workers
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_peaq_worker,
+                                 initargs=(threads,)) as pool:
+            yield pool
+    finally:
+        with _pool_lock:
+            _pool_workers_running -= workers
+
+
+@contextmanager
+def _optional_pool(workers):
+    """_peaq_pool when workers > 1, otherwise None (run in this process)."""
+    if workers > 1:
+        with _peaq_pool(workers) as pool:
+            yield pool
+    else:
+        yield None
+
+
+def _run_peaq_pair(args):
+    return run_peaq_analysis(*args)
+
+
+def _run_peaq_multi(args):
+    return run_peaq_analysis_multi(*args)
+
+
+def resolve_peaq_workers(workers=None, setting='PEAQ_WORKERS'):
+    """Worker count from the argument or the config setting (None = one per core)."""
+    if workers is None:
+        workers = getattr(config, setting, 1)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def _shard_workers(num_samples, sr):
+    """
+    Processes to spread one pair over: 1 unless sharding is on and the pair is
+    long enough, and never more than the cores other PEAQ pools leave free.
+    """
+    if os.environ.get("PEAQ_POOL_WORKER"):
+        return 1
+    min_seconds = getattr(config, 'PEAQ_SHARD_MIN_SECONDS', None)
+    if not min_seconds or num_samples < min_seconds * sr:
+        return 1
+    return _available_workers(resolve_peaq_workers(setting='PEAQ_SHARD_WORKERS'))
+
+
+def _run_file_shard(args):
+    ref_path, test_path, sr, shard, ref_peak, test_peak, delay_samples, frame_size, hop_size = args
+    ref = read_audio_segment(ref_path, shard.sample_start, shard.sample_stop, ref_peak)
+    test = read_audio_segment(test_path, delay_samples + shard.sample_start,
+                              delay_samples + shard.sample_stop, test_peak)
+    state, _ = evaluate_shard(ref, test, sr, shard, NF=frame_size, hop=hop_size)
+    return state
+
+
+def _evaluate_files_sharded(ref_path, test_path, sr, delay_samples, num_samples, workers,
+                            frame_size=2048, hop_size=None):
+    """
+    StreamingPEAQ accumulators for two files, evaluated as frame-aligned shards
+    that each worker reads straight from disk, then merged. Shards are capped at
+    PEAQ_SHARD_MAX_SECONDS so per-worker memory stays bounded.
+    """
+    max_seconds = getattr(config, 'PEAQ_SHARD_MAX_SECONDS', 300)
+    num_shards = max(workers, -(-num_samples // int(max_seconds * sr)))
+    shards = plan_shards(num_samples, sr, num_shards, NF=frame_size, hop=hop_size)
+    print(f"🧩 Evaluating {len(shards)} frame-aligned shards on {workers} worker processes")
+
+    model = StreamingPEAQ(fs=sr, NF=frame_size, hop=hop_size)
+    with _peaq_pool(workers) as pool:
+        ref_peak, test_peak = pool.map(audio_peak, [ref_path, test_path])
+        jobs = [(ref_path, test_path, sr, shard, ref_peak, test_peak, delay_samples, frame_size, hop_size)
+                for shard in shards]
+        for state in pool.map(_run_file_shard, jobs):
+            model.merge(state)
+    return model
+
+
+def _map_on_pool(func, jobs, workers):
+    """pool.map(func, jobs) on a PEAQ worker pool; serial when workers <= 1 or the pool breaks."""
+    workers = _available_workers(min(resolve_peaq_workers(workers), len(jobs))) if jobs else 1
+    if workers <= 1:
+        return [func(job) for job in jobs]
+
+    print(f"🚀 Running {len(jobs)} PEAQ analyses on {workers} worker processes")
+    try:
+        with _peaq_pool(workers) as pool:
+            return list(pool.map(func, jobs))
+    except Exception as e:
+        print(f"⚠️ Parallel PEAQ failed ({e}); falling back to serial analysis")
+        return [func(job) for job in jobs]
+
+
+def run_peaq_analyses(pairs, graph_output_folder, workers=None, test_audio=None):
+    """
+    Run run_peaq_analysis over (ref_path, test_path) pairs on a process pool.
+    ``test_audio`` optionally gives each pair's in-memory capture (or None).
+    Returns a list of (odg, quality) in the same order as ``pairs``.
+    With config.FAST_MODE, see _run_peaq_two_tier.
+    """
+    test_audio = test_audio or [None] * len(pairs)
+    if getattr(config, 'FAST_MODE', False):
+        return _run_peaq_two_tier(pairs, graph_output_folder, workers, test_audio)
+    jobs = [(ref_path, test_path, graph_output_folder, None, audio)
+            for (ref_path, test_path), audio in zip(pairs, test_audio)]
+    return _map_on_pool(_run_peaq_pair, jobs, workers)
+
+
+# Boundaries a coarse-hop ODG must stay clear of; below -3 the ODG scale
+# saturates, so Poor/Bad verdicts are not worth a full-resolution re-run
+SCREENING_BOUNDARIES = (-1.0, -2.0, -3.0)
+
+
+def _needs_full_resolution(odg):
+    """True when a coarse-hop ODG is too close to a verdict change to trust."""
+    if odg is None:
+        return True
+    regression_odg = getattr(config, 'FAST_MODE_REGRESSION_ODG', None)
+    if regression_odg is not None and odg <= regression_odg:
+        return True
+    margin = getattr(config, 'FAST_MODE_ODG_MARGIN', 0.25)
+    return any(abs(odg - boundary) <= margin for boundary in SCREENING_BOUNDARIES)
+
+
+def _run_peaq_two_tier(pairs, graph_output_folder, workers=None, test_audio=None):
+    """
+    Screen every pair at config.FAST_HOP_SIZE, then re-evaluate at the full
+    hop only the pairs whose verdict is uncertain (_needs_full_resolution).
+    Each pair's graph comes from the pass its result comes from: screening
+    plots are titled as such and get replaced when the pair is re-evaluated.
+    """
+    test_audio = test_audio or [None] * len(pairs)
+    frame_size, _ = _frame_params()
+    fast_hop = getattr(config, 'FAST_HOP_SIZE', 4 * frame_size)
+    print(f"⚡ FAST_MODE: screening {len(pairs)} pairs at hop {fast_hop}")
+    title = f"FAST_MODE screening result: PEAQ frames {frame_size} samples, coarse hop {fast_hop}"
+    jobs = [(ref_path, test_path, graph_output_folder, fast_hop, audio, title)
+            for (ref_path, test_path), audio in zip(pairs, test_audio)]
+    results = _map_on_pool(_run_peaq_pair, jobs, workers)
+
+    uncertain = [i for i, (odg, _) in enumerate(results) if _needs_full_resolution(odg)]
+    print(f"🎯 FAST_MODE: {len(uncertain)}/{len(pairs)} pairs near a quality boundary - full evaluation")
+    full_jobs = [(pairs[i][0], pairs[i][1], graph_output_folder, None, test_audio[i]) for i in uncertain]
+    for i, result in zip(uncertain, _map_on_pool(_run_peaq_pair, full_jobs, workers)):
+        results[i] = result
+    return results
+
+
+def run_peaq_reference_matrix(references, graph_output_folder, labels, workers=None):
+    """
+    run_peaq_analysis_multi for many references on a process pool.
+    ``references`` is a list of (ref_path, [test_path per label]); returns one
+    list of (odg, quality) per reference, in input order.
+    """
+    jobs = [(ref_path, test_paths, graph_output_folder, labels) for ref_path, test_paths in references]
+    return _map_on_pool(_run_peaq_multi, jobs, workers)
+
+
+# ODG thresholds between Excellent / Good / Fair / Poor / Bad
+QUALITY_BOUNDARIES = (-1.0, -2.0, -3.0, -4.0)
+
+
 def classify_quality(odg):
-    if odg >= -1.0:
+    if odg >= QUALITY_BOUNDARIES[0]:
         return "Excellent"
-    elif odg >= -2.0:
+    elif odg >= QUALITY_BOUNDARIES[1]:
         return "Good"
-    elif odg >= -3.0:
+    elif odg >= QUALITY_BOUNDARIES[2]:
         return "Fair"
-    elif odg >= -4.0:
+    elif odg >= QUALITY_BOUNDARIES[3]:
         return "Poor"
     else:
         return "Bad"
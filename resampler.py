@@ -0,0 +1,155 @@
+## resampler.py
+"""
+Rational polyphase resampling (48 kHz -> 44.1 kHz and friends).
+
+The rate change is reduced to up/down = target/orig, and a Kaiser-windowed
+sinc low-pass is designed once per (orig_sr, target_sr) and cached. Filtering
+runs through scipy's polyphase upfirdn, so only the nonzero taps of each
+output phase are evaluated. ``StreamingResampler`` produces exactly the same
+samples as ``resample`` from arbitrary-sized chunks, carrying the filter
+history between calls, so long captures can be resampled inside the
+streaming pipeline without being loaded whole.
+"""
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+from scipy.signal import firwin, upfirdn
+
+import config
+
+
+def rational_ratio(orig_sr, target_sr):
+    """(up, down) in lowest terms with target_sr / orig_sr == up / down."""
+    orig_sr, target_sr = int(orig_sr), int(target_sr)
+    if orig_sr <= 0 or target_sr <= 0:
+        raise ValueError(f"Sample rates must be positive, got {orig_sr} -> {target_sr}")
+    g = gcd(orig_sr, target_sr)
+    return target_sr // g, orig_sr // g
+
+
+def _filter_settings():
+    return (getattr(config, 'RESAMPLE_ZERO_CROSSINGS', 32),
+            getattr(config, 'RESAMPLE_ROLLOFF', 0.95),
+            getattr(config, 'RESAMPLE_KAISER_BETA', 9.0))
+
+
+@lru_cache(maxsize=16)
+def _design(up, down, zero_crossings, rolloff, beta):
+    max_rate = max(up, down)
+    half_len = zero_crossings * max_rate
+    h = firwin(2 * half_len + 1, rolloff / max_rate, window=('kaiser', beta)) * up
+    # Pad the front so the filter delay is a whole number of output samples
+    pad = (-half_len) % down
+    h = np.concatenate([np.zeros(pad), h])
+    h.setflags(write=False)
+    return h, (half_len + pad) // down
+
+
+def design_filter(orig_sr, target_sr):
+    """
+    Cached (taps, delay) for ``orig_sr -> target_sr``: the zero-padded
+    polyphase low-pass and the number of leading output samples it delays by.
+    """
+    up, down = rational_ratio(orig_sr, target_sr)
+    return _design(up, down, *_filter_settings())
+
+
+def output_length(num_samples, orig_sr, target_sr):
+    """Samples produced from ``num_samples`` inputs (ceil(num_samples * up / down))."""
+    up, down = rational_ratio(orig_sr, target_sr)
+    return -(-num_samples * up // down)
+
+
+def _taps_for(x, h):
+    return h.astype(np.float32) if x.dtype == np.float32 else h
+
+
+def resample(x, orig_sr, target_sr, axis=-1):
+    """``x`` resampled along ``axis`` from ``orig_sr`` to ``target_sr``; float32 in, float32 out."""
+    x = np.asarray(x)
+    if not np.issubdtype(x.dtype, np.floating):
+        x = x.astype(np.float32)
+    up, down = rational_ratio(orig_sr, target_sr)
+    if up == down:
+        return x.copy()
+    h, delay = design_filter(orig_sr, target_sr)
+    n_out = output_length(x.shape[axis], orig_sr, target_sr)
+    y = upfirdn(_taps_for(x, h), x, up, down, axis=axis)
+    return np.take(y, np.arange(delay, delay + n_out), axis=axis)
+
+
+class StreamingResampler:
+    """
+    Chunked equivalent of ``resample`` along the last axis (mono (N,) or
+    channels-first (C, N) chunks). ``process`` returns every output sample
+    whose filter support has been seen so far; ``flush`` returns the tail once
+    the input has ended. Concatenating all outputs equals ``resample`` on the
+    concatenated input.
+    """
+
+    def __init__(self, orig_sr, target_sr):
+        self.orig_sr, self.target_sr = int(orig_sr), int(target_sr)
+        self.up, self.down = rational_ratio(orig_sr, target_sr)
+        self.h, self.delay = design_filter(orig_sr, target_sr)
+        self.reset()
+
+    def reset(self):
+        self._buffer = None      # input samples [self._start, self._received)
+        self._start = 0          # always a multiple of ``down``
+        self._received = 0
+        self._emitted = 0
+
+    @property
+    def passthrough(self):
+        return self.up == self.down
+
+    def _last_complete(self):
+        # Output n reads inputs up to floor(((n + delay) * down) / up); all of them must have arrived
+        return -(-(self._received * self.up) // self.down) - self.delay
+
+    def _render(self, stop):
+        """Outputs [self._emitted, stop) from the buffered input, then drop history no longer needed."""
+        if stop <= self._emitted:
+            return self._buffer[..., :0].astype(np.float32)
+        h = _taps_for(self._buffer, self.h)
+        y = upfirdn(h, self._buffer, self.up, self.down, axis=-1)
+        offset = self.delay - self._start * self.up // self.down
+        out = y[..., self._emitted + offset:stop + offset]
+        if out.shape[-1] < stop - self._emitted:  # upfirdn output ends early at the very tail
+            pad = np.zeros(out.shape[:-1] + (stop - self._emitted - out.shape[-1],), dtype=out.dtype)
+            out = np.concatenate([out, pad], axis=-1)
+        self._emitted = stop
+
+        # Oldest input still inside the support of the next output, rounded down to a multiple of down
+        first_needed = ((self._emitted + self.delay) * self.down - len(self.h)) // self.up + 1
+        start = max(0, first_needed) // self.down * self.down
+        if start > self._start:
+            self._buffer = self._buffer[..., start - self._start:]
+            self._start = start
+        return out.astype(np.float32, copy=False)
+
+    def process(self, chunk):
+        chunk = np.asarray(chunk, dtype=np.float32)
+        if self.passthrough:
+            return chunk
+        self._buffer = chunk if self._buffer is None else np.concatenate([self._buffer, chunk], axis=-1)
+        self._received += chunk.shape[-1]
+        return self._render(self._last_complete())
+
+    def flush(self):
+        if self.passthrough or self._buffer is None:
+            return np.zeros(0, dtype=np.float32)
+        return self._render(output_length(self._received, self.orig_sr, self.target_sr))
+
+
+def iter_resampled(chunks, orig_sr, target_sr):
+    """Resample an iterable of chunks on the fly; empty outputs are skipped."""
+    stream = StreamingResampler(orig_sr, target_sr)
+    for chunk in chunks:
+        out = stream.process(chunk)
+        if out.shape[-1]:
+            yield out
+    tail = stream.flush()
+    if tail.shape[-1]:
+        yield tail
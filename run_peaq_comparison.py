@@ -1,6 +1,6 @@
 import os
 import pandas as pd
-from wrapper_peaq import run_peaq_comparison
+from wrapper_peaq import run_peaq_comparisons
 
 def compare_folders(phone1_folder, phone2_folder, output_xlsx_path, graph_folder):
     os.makedirs(graph_folder, exist_ok=True)
@@ -9,15 +9,16 @@ def compare_folders(phone1_folder, phone2_folder, output_xlsx_path, graph_folder
     phone1_files = sorted(os.listdir(phone1_folder))
     phone2_files = sorted(os.listdir(phone2_folder))
 
-    for f1, f2 in zip(phone1_files, phone2_files):
-        path1 = os.path.join(phone1_folder, f1)
-        path2 = os.path.join(phone2_folder, f2)
-
-        odg_dict = run_peaq_comparison(path1, path2)
+    pairs = [
+        (os.path.join(phone1_folder, f1), os.path.join(phone2_folder, f2))
+        for f1, f2 in zip(phone1_files, phone2_files)
+    ]
+    comparisons = run_peaq_comparisons(pairs, graph_folder)
 
+    for f1, odg_dict in zip(phone1_files, comparisons):
         results.append({
             "Track": f1,
-            "ODG": odg_dict.get("ODG", None)
+            "ODG": odg_dict.get("odg", None)
         })
 
     df = pd.DataFrame(results)
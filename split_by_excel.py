@@ -1,21 +1,33 @@
 import os
 import pandas as pd
-from pydub import AudioSegment
+from wav_slicer import read_wav_layout, split_wav
 
 def split_audio_by_excel(full_audio_path, excel_path, output_folder, suffix="phone1"):
-    audio = AudioSegment.from_file(full_audio_path)
     df = pd.read_excel(excel_path)
+    names = [str(name) for name in df['track_name']]
+    durations = [float(d) for d in df['duration (in seconds)']]
+    out_paths = [os.path.join(output_folder, f"{name}_{suffix}.wav") for name in names]
+
+    try:
+        read_wav_layout(full_audio_path)
+    except (OSError, ValueError):
+        _split_with_pydub(full_audio_path, durations, out_paths)
+        return
 
-    current_pos = 0  # in milliseconds
+    # Byte-range copies at exact sample positions, no decode of the capture
+    split_wav(full_audio_path, durations, out_paths)
+    for out_path in out_paths:
+        print(f"🎧 Saved: {out_path}")
 
-    for _, row in df.iterrows():
-        name = str(row['track_name'])
-        duration = float(row['duration (in seconds)'])
-        end_pos = current_pos + int(duration * 1000)
+def _split_with_pydub(full_audio_path, durations, out_paths):
+    """Fallback for compressed captures, which have to be decoded anyway."""
+    from pydub import AudioSegment
+    audio = AudioSegment.from_file(full_audio_path)
 
-        segment = audio[current_pos:end_pos]
-        out_name = f"{name}_{suffix}.wav"
-        out_path = os.path.join(output_folder, out_name)
+    current_pos = 0.0  # in milliseconds
+    for duration, out_path in zip(durations, out_paths):
+        end_pos = current_pos + duration * 1000
+        segment = audio[int(round(current_pos)):int(round(end_pos))]
         segment.export(out_path, format="wav")
 
         print(f"🎧 Saved: {out_path}")
@@ -1,7 +1,7 @@
 import os
 import traceback
 from batch_processor import BatchProcessor
-from wrapper_peaq import run_peaq_comparison
+from wrapper_peaq import run_peaq_comparisons
 from audio_utils import get_audio_duration
 from config import spotify_comparison_range  # new import
 
@@ -36,6 +36,7 @@ def run_spotify_comparison_mode():
 
     print(f"🔍 Comparing files {start_idx+1} to {end_idx} (total: {len(selected_files)})")
 
+    pairs = []
     for fname in selected_files:
 
         ref_path = os.path.join(ref_folder, fname)
@@ -45,15 +46,21 @@ def run_spotify_comparison_mode():
             print(f"⚠️ Skipping {fname} — test file not found")
             continue
 
-        try:
-            print(f"\n============================================================")
-            print(f"🔬 STARTING PEAQ AUDIO QUALITY ANALYSIS")
-            print(f"📁 Reference: {ref_path}")
-            print(f"📁 Test: {test_path}")
-
-            # ✅ Expecting a dict return from run_peaq_comparison()
-            result = run_peaq_comparison(ref_path, test_path, processor.graphs_folder)
+        pairs.append((fname, ref_path, test_path))
 
+    # ✅ Expecting dict returns from run_peaq_comparisons(), in the same order as pairs
+    try:
+        comparisons = run_peaq_comparisons(
+            [(ref_path, test_path) for _, ref_path, test_path in pairs],
+            processor.graphs_folder
+        )
+    except Exception as e:
+        print(f"❌ Parallel comparison failed: {str(e)}")
+        traceback.print_exc()
+        comparisons = [{} for _ in pairs]
+
+    for (fname, ref_path, test_path), result in zip(pairs, comparisons):
+        try:
             odg = result.get("odg")
             quality = result.get("quality")
             graph_path = result.get("graph_path", None)
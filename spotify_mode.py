@@ -1,11 +1,12 @@
 # spotify_mode.py
+import math
 import os
 import shutil
 import subprocess
 from datetime import datetime
 import pandas as pd
 
-from trim_utils import split_audio_by_durations
+from trim_utils import split_audio_by_durations, parse_duration
 from spotify import (
     list_audio_input_devices,
     adb, 
@@ -22,19 +23,6 @@ from config import (
 )
 
 
-def parse_duration(duration_str):
-    if isinstance(duration_str, str) and ':' in duration_str:
-        try:
-            minutes, seconds = map(int, duration_str.strip().split(":"))
-            return minutes * 60 + seconds
-        except Exception:
-            return None
-    try:
-        return int(float(duration_str))
-    except Exception:
-        return None
-
-
 def calculate_total_duration_from_excel(excel_path):
     df = pd.read_excel(excel_path)
     if "duration" not in df.columns:
@@ -50,7 +38,8 @@ def calculate_total_duration_from_excel(excel_path):
             continue
         total_seconds += seconds
 
-    return total_seconds
+    # Whole seconds, rounded up so the recording covers every (fractional) track
+    return int(math.ceil(total_seconds))
 
 
 def record_audio(device_name, total_duration_sec, output_path):
@@ -0,0 +1,28 @@
+# tests/conftest.py
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Modules live at the repo root (no package install)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_RATE = 44100
+
+
+def make_pair(seconds, fs=SAMPLE_RATE, seed=0):
+    """Reference (tones + noise) and a slightly low-passed, noisier test copy, float32."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * fs)) / fs
+    ref = 0.05 * rng.standard_normal(len(t))
+    for freq, amp in ((220.0, 0.4), (1000.0, 0.25), (4400.0, 0.1)):
+        ref += amp * np.sin(2 * np.pi * freq * t)
+    ref = (ref / 1.2).astype(np.float32)
+    test = 0.475 * (ref + np.concatenate([[0.0], ref[:-1]])) + 0.01 * rng.standard_normal(len(t))
+    return ref, test.astype(np.float32)
+
+
+@pytest.fixture(scope="session")
+def pair():
+    return make_pair(12)
@@ -0,0 +1,32 @@
+# tests/test_alignment.py
+import numpy as np
+import pytest
+
+import config
+from audio_utils import align_signals_by_cross_correlation
+from conftest import SAMPLE_RATE
+
+
+@pytest.fixture
+def delayed_pair():
+    """Noise with a random 50 ms loudness pattern (so the envelope is unambiguous), delayed 300 samples."""
+    rng = np.random.default_rng(0)
+    gains = np.repeat(rng.uniform(0.05, 1.0, 5 * 20), SAMPLE_RATE // 20)
+    ref = (0.3 * gains * rng.standard_normal(len(gains))).astype(np.float32)
+    return ref, np.concatenate([np.zeros(300, dtype=np.float32), ref])
+
+
+def test_recovers_a_known_lag(delayed_pair, monkeypatch):
+    monkeypatch.setattr(config, "ENABLE_AUTO_DELAY_COMPENSATION", False)
+    ref, test = delayed_pair
+    ref_aligned, test_aligned, lag = align_signals_by_cross_correlation(ref, test, SAMPLE_RATE)
+    assert lag == 300
+    assert len(ref_aligned) == len(test_aligned) == len(ref)
+
+
+def test_fixed_delay_compensation_skips_alignment(delayed_pair, monkeypatch):
+    monkeypatch.setattr(config, "ENABLE_AUTO_DELAY_COMPENSATION", True)
+    ref, test = delayed_pair
+    ref_aligned, test_aligned, lag = align_signals_by_cross_correlation(ref, test, SAMPLE_RATE)
+    assert lag == 0
+    np.testing.assert_array_equal(test_aligned, test[:len(ref)])
@@ -0,0 +1,50 @@
+# tests/test_batched_engine.py
+import numpy as np
+import pytest
+
+from PEAQ import PEAQ
+from conftest import SAMPLE_RATE
+
+
+def _per_frame(model, ref, test):
+    """The pre-batching loop: one PQDFTFrame / PQ_excitCB call per frame."""
+    pq_eval = model.pq_eval
+    num_frames = model.num_frames(len(ref))
+    EbR, EhsR, EbT = (np.zeros((num_frames, pq_eval.Nc)) for _ in range(3))
+    for i in range(num_frames):
+        start = i * pq_eval.hopsize
+        EbR[i], EhsR[i] = pq_eval.PQ_excitCB(pq_eval.PQDFTFrame(ref[start:start + pq_eval.framesize]))
+        EbT[i], _ = pq_eval.PQ_excitCB(pq_eval.PQDFTFrame(test[start:start + pq_eval.framesize]))
+    return EbR, EhsR, EbT
+
+
+@pytest.mark.parametrize("hop", [None, 2048, 10000])
+def test_batched_matches_per_frame(pair, hop):
+    ref, test = pair
+    model = PEAQ(SAMPLE_RATE, hop_size=hop)
+    model.process(ref, test)
+    odg, movs = model.computeODG()
+
+    baseline = PEAQ(SAMPLE_RATE, hop_size=hop)
+    frames = _per_frame(baseline, ref, test)
+    for batched, looped in zip((model.EbNMatR, model.EhsR, model.EbNMatT), frames):
+        assert batched.shape == looped.shape
+        peak = np.max(looped, axis=1, keepdims=True)
+        assert np.all(np.abs(batched - looped) <= 1e-9 * peak)
+
+    baseline.load_frames(*frames, np.mean(np.abs(test - ref)))
+    base_odg, base_movs = baseline.computeODG()
+    assert odg == pytest.approx(base_odg, abs=1e-6)
+    for name, value in base_movs.items():
+        assert movs[name] == pytest.approx(value, rel=1e-6, abs=1e-9), name
+
+
+def test_block_boundaries(pair):
+    ref, test = pair
+    whole = PEAQ(SAMPLE_RATE)
+    whole.process(ref, test)
+    blocked = PEAQ(SAMPLE_RATE)
+    blocked.block_frames = 7
+    blocked.process(ref, test)
+    np.testing.assert_array_equal(blocked.EbNMatR, whole.EbNMatR)
+    np.testing.assert_array_equal(blocked.EbNMatT, whole.EbNMatT)
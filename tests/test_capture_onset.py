@@ -0,0 +1,50 @@
+# tests/test_capture_onset.py
+import sys
+
+import numpy as np
+import pytest
+
+from capture_stream import CaptureMonitor, PcmCapture, find_onset, noise_floor_dbfs
+from conftest import SAMPLE_RATE
+
+BLOCK = SAMPLE_RATE // 100
+LEAD_IN_SECONDS = 2.0
+
+
+def noisy_take(seed=0):
+    """Hiss at about -40 dBFS with a 5 ms click at 1 s, then a -10 dBFS tone from LEAD_IN_SECONDS on."""
+    rng = np.random.default_rng(seed)
+    lead_in = 0.01 * rng.standard_normal(int(LEAD_IN_SECONDS * SAMPLE_RATE))
+    lead_in[SAMPLE_RATE:SAMPLE_RATE + SAMPLE_RATE // 200] = 0.9
+    t = np.arange(3 * SAMPLE_RATE) / SAMPLE_RATE
+    tone = 0.45 * np.sin(2 * np.pi * 440.0 * t) + 0.01 * rng.standard_normal(len(t))
+    return np.concatenate([lead_in, tone]), tone
+
+
+def test_find_onset_needs_a_sustained_run():
+    signal, _ = noisy_take()
+    assert find_onset(signal, BLOCK, -50.0) == 0  # plain threshold: the hiss already counts
+    assert find_onset(signal, BLOCK, -30.0) == SAMPLE_RATE  # ...and so does the click
+    assert find_onset(signal, BLOCK, -30.0, min_blocks=10) == int(LEAD_IN_SECONDS * SAMPLE_RATE)
+    assert find_onset(np.zeros(SAMPLE_RATE), BLOCK, -50.0) is None
+
+
+def test_noise_floor_ignores_a_click():
+    signal, _ = noisy_take()
+    assert noise_floor_dbfs(signal[:SAMPLE_RATE + SAMPLE_RATE // 2], BLOCK) == pytest.approx(-40.0, abs=1.5)
+
+
+def test_monitor_onset_after_noisy_lead_in(tmp_path):
+    signal, reference = noisy_take()
+    pcm = tmp_path / "take.pcm"
+    stereo = np.repeat((signal * 32767).astype('<i2')[:, None], 2, axis=1)
+    pcm.write_bytes(stereo.tobytes())
+    command = [sys.executable, "-c",
+               f"import sys; sys.stdout.buffer.write(open({str(pcm)!r}, 'rb').read())"]
+    capture = PcmCapture(command, samplerate=SAMPLE_RATE).start()
+    monitor = CaptureMonitor(capture, None, 3.0, 5.0, load_reference=lambda: reference,
+                             check_health=False, adaptive_stop=True, onset_margin_seconds=0.0).start()
+    capture.wait()
+    monitor.join()
+    assert monitor.noise_floor == pytest.approx(-40.0, abs=1.5)
+    assert monitor.take_start == pytest.approx(LEAD_IN_SECONDS, abs=BLOCK / SAMPLE_RATE)
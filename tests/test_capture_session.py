@@ -0,0 +1,98 @@
+# tests/test_capture_session.py
+import json
+import sys
+import time
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+import aux_recorder
+import config
+from conftest import SAMPLE_RATE
+
+PACE = 4.0  # capture seconds per wall-clock second
+TAKE_SECONDS = 3.0
+
+
+def _tone(seconds):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return 0.3 * np.sin(2 * np.pi * 440.0 * t)
+
+
+def _idle(seconds, rng):
+    return rng.normal(0, 3, (int(seconds * SAMPLE_RATE), 2))
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    """An AuxRecorder whose "device" plays ``pcm`` (set by the test) at PACE x real time, then idles."""
+    for name, value in {"AUX_CAPTURE_MODE": "stream", "AUX_CAPTURE_SESSION": True, "AUX_ADAPTIVE_STOP": True,
+                        "AUX_STREAM_ARCHIVE": False, "LIVE_ANALYSIS": False,
+                        "DECODED_AUDIO_CACHE_DIR": None}.items():
+        monkeypatch.setattr(config, name, value, raising=False)
+    monkeypatch.setattr(aux_recorder, "output_audio_dir", str(tmp_path))
+    pcm = tmp_path / "device.pcm"
+    block = 4410
+    script = (f"import sys, time\nx = open({str(pcm)!r}, 'rb').read()\nt0 = time.time()\n"
+              f"for k, i in enumerate(range(0, len(x), {block * 4})):\n"
+              f"    sys.stdout.buffer.write(x[i:i + {block * 4}]); sys.stdout.flush()\n"
+              f"    time.sleep(max(0, t0 + (k + 1) * {block / SAMPLE_RATE / PACE} - time.time()))\n"
+              f"time.sleep(60)\n")
+    monkeypatch.setattr(aux_recorder, "ffmpeg_capture_command", lambda *args, **kwargs: [sys.executable, "-c", script])
+
+    reference = tmp_path / "reference.wav"
+    sf.write(reference, _tone(TAKE_SECONDS), SAMPLE_RATE, subtype="PCM_16")
+    recorder = aux_recorder.AuxRecorder()
+    recorder.selected_device = "fake"
+    yield recorder, pcm, str(reference)
+    recorder.end_session()
+
+
+def _player(recorder):
+    def play(path):
+        recorder.log_playback_event("play")
+        recorder.playback_stop.wait(TAKE_SECONDS + 2)
+        recorder.log_playback_event("stop")
+    return play
+
+
+def test_two_takes_cut_at_their_onsets(session, tmp_path):
+    recorder, pcm, reference = session
+    rng = np.random.default_rng(0)
+    tone = np.repeat((_tone(TAKE_SECONDS) * 32767)[:, None], 2, axis=1)
+    onsets = [2.0, 8.0]
+    device = np.concatenate([_idle(2.0, rng), tone, _idle(3.0, rng), tone, _idle(5.0, rng)]).astype('<i2')
+    pcm.write_bytes(device.tobytes())
+
+    assert recorder.start_session()
+    takes = []
+    for k in range(2):
+        assert recorder.start(reference, _player(recorder)) is None
+        output = str(tmp_path / f"take{k}.wav")
+        assert recorder.post_process(None, reference, output)
+        takes.append(recorder.take_captured_audio(output))
+    with open(recorder.end_session()) as f:
+        index = json.load(f)["takes"]
+
+    margin = int(0.05 * SAMPLE_RATE)
+    for onset, entry, (samplerate, frames) in zip(onsets, index, takes):
+        start = entry["take_start_frame"]
+        assert samplerate == SAMPLE_RATE
+        assert entry["problem"] is None and entry["take_frames"] == len(tone)
+        assert abs(start - (int(onset * SAMPLE_RATE) - margin)) <= SAMPLE_RATE // 100
+        np.testing.assert_array_equal(frames, device[start:start + len(tone)])
+
+
+def test_take_without_onset_is_rejected(session, monkeypatch):
+    recorder, pcm, reference = session
+    monkeypatch.setattr(config, "CAPTURE_MONITOR", False)
+    monkeypatch.setattr(config, "AUX_MAX_START_SECONDS", 0.5)
+    pcm.write_bytes(_idle(1.0, np.random.default_rng(1)).astype('<i2').tobytes())
+
+    assert recorder.start_session()
+    started = time.monotonic()
+    problem = recorder.start(reference, _player(recorder))
+    assert problem is not None and problem.kind == "no_onset"
+    assert time.monotonic() - started < 2 * TAKE_SECONDS + 5
+    assert recorder.take_captured_audio("missing.wav") is None
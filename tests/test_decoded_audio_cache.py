@@ -0,0 +1,18 @@
+# tests/test_decoded_audio_cache.py
+import numpy as np
+import soundfile as sf
+
+import config
+from decoded_audio_cache import DecodedAudioCache
+from conftest import SAMPLE_RATE
+
+
+def test_key_follows_the_resampling_filter(tmp_path, monkeypatch):
+    path = tmp_path / "track.wav"
+    sf.write(path, np.zeros(SAMPLE_RATE), SAMPLE_RATE, subtype="PCM_16")
+    keys = {DecodedAudioCache.key(str(path), 48000, True)}
+    for name, value in [("RESAMPLE_ZERO_CROSSINGS", 16), ("RESAMPLE_ROLLOFF", 0.9), ("RESAMPLE_KAISER_BETA", 6.0)]:
+        monkeypatch.setattr(config, name, value, raising=False)
+        keys.add(DecodedAudioCache.key(str(path), 48000, True))
+    assert len(keys) == 4
+    assert DecodedAudioCache.key(str(path), 48000, True) == DecodedAudioCache.key(str(path), 48000, True)
@@ -0,0 +1,67 @@
+# tests/test_drift.py
+import numpy as np
+import pytest
+
+from alignment import fit_drift, iter_drift_corrected
+
+SR = 8000
+SECONDS = 30
+PPM = 80.0
+INITIAL_LAG = 37
+
+
+def _band_limited(t, seed):
+    """Sum of random sinusoids below 1.5 kHz, evaluated at arbitrary times ``t`` (seconds)."""
+    rng = np.random.default_rng(seed)
+    freqs = rng.uniform(50, 1500, 60)
+    phases = rng.uniform(0, 2 * np.pi, 60)
+    out = np.zeros(len(t))
+    for start in range(0, len(t), 1 << 16):
+        block = t[start:start + (1 << 16), None]
+        out[start:start + len(block)] = np.sin(2 * np.pi * freqs * block + phases).sum(axis=1) / 10
+    return out.astype(np.float32)
+
+
+def _drifting_pair(channels=1):
+    """ref[n] lines up with test[n + INITIAL_LAG + PPM * 1e-6 * n]."""
+    n = np.arange(SECONDS * SR)
+    ref = np.stack([_band_limited(n / SR, seed) for seed in range(channels)])
+    warped = (n - INITIAL_LAG) / (1 + PPM * 1e-6) / SR
+    test = np.stack([_band_limited(warped, seed) for seed in range(channels)])
+    return (ref[0], test[0]) if channels == 1 else (ref, test)
+
+
+def _corrected(ref, test):
+    anchors = []
+    pairs = list(iter_drift_corrected(lambda a, b: ref[..., a:b], lambda a, b: test[..., a:b],
+                                      ref.shape[-1], test.shape[-1], SR, initial_lag=INITIAL_LAG,
+                                      hop_seconds=5, anchors=anchors))
+    return anchors, np.concatenate([p[0] for p in pairs], axis=-1), np.concatenate([p[1] for p in pairs], axis=-1)
+
+
+def test_recovers_known_drift():
+    ref, test = _drifting_pair()
+    anchors, ref_out, test_out = _corrected(ref, test)
+    offset, ppm = fit_drift(anchors, SR)
+    assert ppm == pytest.approx(PPM, abs=1.0)
+    assert offset == pytest.approx(INITIAL_LAG, abs=0.5)
+    # Without correction the pair ends up PPM * 1e-6 * N = 19 samples apart; warped it lines up again
+    skip = SR  # the interpolator's edge
+    assert np.max(np.abs(ref_out[skip:-skip] - test_out[skip:-skip])) < 0.05 * np.max(np.abs(ref))
+
+
+def test_channels_are_warped_alike():
+    ref, test = _drifting_pair(channels=2)
+    anchors, ref_out, test_out = _corrected(ref, test)
+    assert ref_out.shape == test_out.shape and ref_out.shape[0] == 2
+    assert fit_drift(anchors, SR)[1] == pytest.approx(PPM, abs=1.0)
+    skip = SR
+    for channel in range(2):
+        error = np.abs(ref_out[channel, skip:-skip] - test_out[channel, skip:-skip])
+        assert np.max(error) < 0.05 * np.max(np.abs(ref[channel]))
+
+
+def test_default_leaves_ordinary_tracks_alone():
+    from peaq_analyzer import _use_drift_correction
+    assert not _use_drift_correction(5 * 60 * 44100, 44100)
+    assert _use_drift_correction(60 * 60 * 44100, 44100)
@@ -0,0 +1,42 @@
+# tests/test_fast_mode.py
+import pytest
+
+import config
+import peaq_analyzer
+
+
+@pytest.fixture
+def scored(monkeypatch):
+    """Replace the per-pair analysis with a table of (screening ODG, full ODG) per reference."""
+    monkeypatch.setattr(config, "FAST_MODE", True)
+    monkeypatch.setattr(config, "FAST_MODE_REGRESSION_ODG", None)
+    calls = []
+
+    def fake_pair(args):
+        ref_path, test_path, folder, hop, test_audio = args[:5]
+        calls.append((ref_path, hop, test_audio))
+        odg = table[ref_path][0 if hop else 1]
+        return odg, peaq_analyzer.classify_quality(odg)
+
+    table = {}
+    monkeypatch.setattr(peaq_analyzer, "_run_peaq_pair", fake_pair)
+    return table, calls
+
+
+@pytest.mark.parametrize("screen_odg, rerun", [(-0.2, False), (-1.1, True), (-2.9, True), (-3.5, False),
+                                               (-3.9, False), (-4.0, False)])
+def test_rerun_only_near_interior_boundaries(scored, screen_odg, rerun):
+    table, calls = scored
+    table["a.wav"] = (screen_odg, -1.5)
+    [(odg, _)] = peaq_analyzer.run_peaq_analyses([("a.wav", "b.wav")], "graphs", workers=1)
+    assert len(calls) == (2 if rerun else 1)
+    assert odg == (-1.5 if rerun else screen_odg)
+
+
+def test_captured_audio_reaches_both_passes(scored):
+    table, calls = scored
+    table["a.wav"] = (-1.05, -0.9)
+    captured = (44100, object())
+    result = peaq_analyzer.run_peaq_analyses([("a.wav", "b.wav")], "graphs", workers=1, test_audio=[captured])
+    assert result == [(-0.9, "Excellent")]
+    assert [(hop is not None, audio) for _, hop, audio in calls] == [(True, captured), (False, captured)]
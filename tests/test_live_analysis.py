@@ -0,0 +1,80 @@
+# tests/test_live_analysis.py
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+import config
+from capture_stream import PcmCapture
+from peaq_analyzer import run_peaq_analysis, run_peaq_analysis_live
+from resampler import resample
+from conftest import make_pair
+
+REF_RATE = 48000
+CAPTURE_RATE = 44100
+PRE_ROLL_SECONDS = 0.4
+LAG_SECONDS = 0.03
+
+
+@pytest.fixture(autouse=True)
+def analysis_config(monkeypatch):
+    for name, value in {"AUTO_ALIGN": True, "LIVE_ALIGN_SECONDS": 2, "LIVE_CHUNK_SECONDS": 0.5,
+                        "REFERENCE_CACHE_DIR": None, "DECODED_AUDIO_CACHE_DIR": None,
+                        "DRIFT_MIN_SECONDS": None, "PEAQ_SHARD_WORKERS": 1}.items():
+        monkeypatch.setattr(config, name, value, raising=False)
+
+
+def _take(tmp_path):
+    """48 kHz stereo reference file, and its degraded copy captured at 44.1 kHz behind a pre-roll and a lag."""
+    left, test_left = make_pair(6, fs=REF_RATE, seed=1)
+    right, test_right = make_pair(6, fs=REF_RATE, seed=2)
+    ref_path = tmp_path / "reference.wav"
+    sf.write(ref_path, np.stack([left, right], axis=1), REF_RATE, subtype="PCM_16")
+
+    test = resample(np.stack([test_left, test_right]), REF_RATE, CAPTURE_RATE).T
+    lead = np.zeros((int((PRE_ROLL_SECONDS + LAG_SECONDS) * CAPTURE_RATE), 2))
+    frames = np.clip(np.concatenate([lead, 0.5 * test, np.zeros((CAPTURE_RATE, 2))]) * 32767, -32768, 32767)
+    return str(ref_path), frames.astype('<i2')
+
+
+@pytest.mark.parametrize("per_channel", [False, True])
+def test_live_matches_offline(tmp_path, monkeypatch, per_channel):
+    monkeypatch.setattr(config, "PEAQ_PER_CHANNEL", per_channel)
+    ref_path, frames = _take(tmp_path)
+    pcm = tmp_path / "capture.pcm"
+    pcm.write_bytes(frames.tobytes())
+    command = [sys.executable, "-c", f"import sys; sys.stdout.buffer.write(open({str(pcm)!r}, 'rb').read())"]
+    capture = PcmCapture(command, samplerate=CAPTURE_RATE).start()
+
+    live_odg, live_quality = run_peaq_analysis_live(ref_path, capture, pre_roll_seconds=PRE_ROLL_SECONDS)
+    capture.wait()
+    offset = int(round(PRE_ROLL_SECONDS * CAPTURE_RATE))
+    take = frames[offset:offset + 6 * CAPTURE_RATE]
+    odg, quality = run_peaq_analysis(ref_path, "capture.wav", str(tmp_path), test_audio=(CAPTURE_RATE, take))
+
+    assert odg is not None and live_odg is not None
+    assert live_odg == pytest.approx(odg, abs=1e-4)
+    assert live_quality == quality
+
+
+def test_cancel_stops_a_running_analysis(tmp_path):
+    ref_path, frames = _take(tmp_path)
+    pcm = tmp_path / "capture.pcm"
+    pcm.write_bytes(frames.tobytes())
+    # A device that keeps delivering audio in real time, like a capture session
+    command = [sys.executable, "-c",
+               f"import sys, time\nx = open({str(pcm)!r}, 'rb').read()\n"
+               f"for i in range(0, len(x), 17640):\n"
+               f"    sys.stdout.buffer.write(x[i:i + 17640]); sys.stdout.flush(); time.sleep(0.1)\n"]
+    capture = PcmCapture(command, samplerate=CAPTURE_RATE).start()
+    cancel = threading.Event()
+    threading.Timer(1.0, cancel.set).start()
+    started = time.monotonic()
+    try:
+        assert run_peaq_analysis_live(ref_path, capture, PRE_ROLL_SECONDS, cancel=cancel) == (None, None)
+        assert time.monotonic() - started < 3.0
+    finally:
+        capture.stop()
@@ -0,0 +1,56 @@
+# tests/test_native_rate.py
+import numpy as np
+import pytest
+import soundfile as sf
+from scipy.signal import butter, sosfilt
+
+import config
+from audio_utils import analysis_sample_rate, load_audio
+from peaq_analyzer import run_peaq_analysis
+from resampler import resample
+
+RATE = 48000
+CAPTURE_RATE = 44100
+
+
+def _band_limited_pair(seconds=8, fs=RATE, seed=0):
+    """Tones plus noise below 8 kHz, and a copy with a little extra noise (nothing near either Nyquist)."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(seconds * fs) / fs
+    sos = butter(8, 8000, fs=fs, output='sos')
+    ref = sosfilt(sos, 0.05 * rng.standard_normal(len(t)))
+    for freq, amp in ((220.0, 0.4), (1000.0, 0.25), (4400.0, 0.1)):
+        ref += amp * np.sin(2 * np.pi * freq * t)
+    test = ref + sosfilt(sos, 0.01 * rng.standard_normal(len(t)))
+    return (ref / 1.2).astype(np.float32), (test / 1.2).astype(np.float32)
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    """48 kHz reference, the test at 48 kHz, and the same test captured at 44.1 kHz."""
+    for name in ("ANALYSIS_SAMPLE_RATE", "REFERENCE_CACHE_DIR", "DECODED_AUDIO_CACHE_DIR"):
+        monkeypatch.setattr(config, name, None, raising=False)
+    ref, test = _band_limited_pair()
+    paths = {name: str(tmp_path / f"{name}.wav") for name in ("ref", "test", "capture")}
+    sf.write(paths["ref"], ref, RATE, subtype="FLOAT")
+    sf.write(paths["test"], test, RATE, subtype="FLOAT")
+    sf.write(paths["capture"], resample(test, RATE, CAPTURE_RATE), CAPTURE_RATE, subtype="FLOAT")
+    return paths
+
+
+def test_native_rate_is_not_resampled(files):
+    assert analysis_sample_rate(files["ref"], files["test"]) == RATE
+    sr, audio = load_audio(files["ref"], target_sr=RATE)
+    assert sr == RATE
+    raw = sf.read(files["ref"], dtype="float32")[0]
+    # Only peak-normalized: same samples, same length
+    np.testing.assert_allclose(audio, raw * (np.max(np.abs(audio)) / np.max(np.abs(raw))), rtol=1e-5, atol=1e-7)
+
+
+def test_resampled_capture_scores_like_the_native_one(files, tmp_path):
+    assert analysis_sample_rate(files["ref"], files["capture"]) == RATE
+    native_odg, native_quality = run_peaq_analysis(files["ref"], files["test"], str(tmp_path))
+    resampled_odg, resampled_quality = run_peaq_analysis(files["ref"], files["capture"], str(tmp_path))
+    assert native_odg is not None and resampled_odg is not None
+    assert resampled_odg == pytest.approx(native_odg, abs=0.02)
+    assert resampled_quality == native_quality
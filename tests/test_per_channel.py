@@ -0,0 +1,35 @@
+# tests/test_per_channel.py
+import numpy as np
+import pytest
+
+from PEAQ import PEAQ
+from conftest import SAMPLE_RATE
+
+
+def _odg(ref, test):
+    model = PEAQ(SAMPLE_RATE)
+    model.process(ref, test)
+    return model.computeODG()
+
+
+def test_identical_channels_match_mono(pair):
+    ref, test = pair
+    odg, movs = _odg(ref, test)
+    stereo_odg, stereo_movs = _odg(np.stack([ref, ref]), np.stack([test, test]))
+
+    assert stereo_odg == pytest.approx(odg, abs=1e-9)
+    assert len(stereo_movs["channels"]) == 2
+    for channel in stereo_movs["channels"]:
+        assert channel["ODG"] == pytest.approx(odg, abs=1e-9)
+        for name, value in movs.items():
+            assert channel[name] == pytest.approx(value, rel=1e-9, abs=1e-12), name
+
+
+def test_damage_shows_in_its_own_channel(pair):
+    ref, test = pair
+    damaged = test.copy()
+    damaged[SAMPLE_RATE:3 * SAMPLE_RATE] = 0.0
+    _, movs = _odg(np.stack([ref, ref]), np.stack([test, damaged]))
+    clean, broken = (channel["ODG"] for channel in movs["channels"])
+    assert clean == pytest.approx(_odg(ref, test)[0], abs=1e-9)
+    assert broken < clean - 0.5
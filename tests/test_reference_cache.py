@@ -0,0 +1,60 @@
+# tests/test_reference_cache.py
+import os
+
+import numpy as np
+
+from PEAQ import PEAQ
+from PEAQ.reference_cache import ReferenceCache
+from conftest import SAMPLE_RATE
+
+
+def _score(ref, test, cache, hop=None):
+    model = PEAQ(SAMPLE_RATE, hop_size=hop)
+    model.process_reference(ref, cache=cache)
+    model.process_test(test)
+    return model
+
+
+def test_round_trip_gives_identical_odg(pair, tmp_path):
+    ref, test = pair
+    cache = ReferenceCache(str(tmp_path))
+    first = _score(ref, test, cache)
+    second = _score(ref, test, cache)
+    assert not first.reference_cache_hit and second.reference_cache_hit
+    np.testing.assert_array_equal(second.EbNMatR, first.EbNMatR)
+    assert second.computeODG() == first.computeODG()
+
+
+def test_changed_hop_misses(pair, tmp_path):
+    ref, test = pair
+    cache = ReferenceCache(str(tmp_path))
+    _score(ref, test, cache)
+    assert not _score(ref, test, cache, hop=10000).reference_cache_hit
+    assert _score(ref, test, cache, hop=10000).reference_cache_hit
+
+
+def test_mismatched_entry_is_not_a_hit(pair, tmp_path):
+    ref, test = pair
+    cache = ReferenceCache(str(tmp_path))
+    model = PEAQ(SAMPLE_RATE)
+    key = cache.key(ref, model.pq_eval)
+    cache.store(key, np.zeros((3, 109)), np.zeros((3, 109)), np.zeros(3))
+    model.process_reference(ref, cache=cache)
+    assert not model.reference_cache_hit
+    assert cache.load(key)[0].shape == model._reference[1].shape
+
+
+def test_eviction_respects_max_bytes(tmp_path):
+    data = np.random.default_rng(0).random((200, 109))
+    probe = ReferenceCache(str(tmp_path / "probe"))
+    probe.store("k", data, data, data[:, 0])
+    entry_size = os.path.getsize(probe._path("k"))
+
+    cache = ReferenceCache(str(tmp_path / "cache"), max_bytes=int(2.5 * entry_size))
+    for i in range(6):
+        cache.store(f"k{i}", data, data, data[:, 0])
+        os.utime(cache._path(f"k{i}"), (i, i))
+    names = sorted(os.listdir(cache.cache_dir))
+    assert sum(os.path.getsize(os.path.join(cache.cache_dir, name)) for name in names) <= cache.max_bytes
+    # The least recently used entries went first
+    assert names == ["k4.npz", "k5.npz"]
@@ -0,0 +1,48 @@
+# tests/test_resampler.py
+import numpy as np
+import pytest
+
+from resampler import StreamingResampler, iter_resampled, output_length, resample
+
+
+def _chunks(x, size):
+    return [x[..., start:start + size] for start in range(0, x.shape[-1], size)]
+
+
+def _streamed(x, orig_sr, target_sr, size):
+    stream = StreamingResampler(orig_sr, target_sr)
+    pieces = [stream.process(chunk) for chunk in _chunks(x, size)] + [stream.flush()]
+    return np.concatenate(pieces, axis=-1)
+
+
+@pytest.mark.parametrize("orig_sr, target_sr", [(48000, 44100), (44100, 48000), (22050, 44100), (96000, 44100)])
+@pytest.mark.parametrize("size", [37, 4096, 10 ** 6])
+def test_streaming_matches_resample(orig_sr, target_sr, size):
+    x = np.random.default_rng(0).standard_normal(orig_sr // 2).astype(np.float32)
+    expected = resample(x, orig_sr, target_sr)
+    assert len(expected) == output_length(len(x), orig_sr, target_sr)
+    np.testing.assert_allclose(_streamed(x, orig_sr, target_sr, size), expected, rtol=0, atol=1e-5)
+
+
+def test_streaming_sample_by_sample():
+    x = np.random.default_rng(3).standard_normal(2000).astype(np.float32)
+    np.testing.assert_allclose(_streamed(x, 22050, 44100, 1), resample(x, 22050, 44100), rtol=0, atol=1e-5)
+
+
+def test_streaming_stereo_and_iter_resampled():
+    x = np.random.default_rng(1).standard_normal((2, 24000)).astype(np.float32)
+    expected = resample(x, 48000, 44100)
+    np.testing.assert_allclose(_streamed(x, 48000, 44100, 1000), expected, rtol=0, atol=1e-5)
+    joined = np.concatenate(list(iter_resampled(_chunks(x, 777), 48000, 44100)), axis=-1)
+    np.testing.assert_allclose(joined, expected, rtol=0, atol=1e-5)
+
+
+def test_passthrough_and_tone():
+    x = np.random.default_rng(2).standard_normal(1000).astype(np.float32)
+    np.testing.assert_array_equal(_streamed(x, 44100, 44100, 300), x)
+
+    t = np.arange(48000) / 48000
+    y = resample(np.sin(2 * np.pi * 1000 * t), 48000, 44100)
+    reference = np.sin(2 * np.pi * 1000 * np.arange(len(y)) / 44100)
+    # Away from the edges a band-limited tone comes through unchanged
+    assert np.max(np.abs(y[1000:-1000] - reference[1000:-1000])) < 1e-3
@@ -0,0 +1,69 @@
+# tests/test_sharding.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import config
+import peaq_analyzer
+from PEAQ import PEAQ
+from PEAQ.sharding import evaluate_sharded, plan_shards
+from conftest import SAMPLE_RATE
+
+
+def _serial(ref, test, hop=None):
+    model = PEAQ(SAMPLE_RATE, hop_size=hop)
+    model.process(ref, test)
+    return model
+
+
+@pytest.mark.parametrize("workers", [2, 3, 7])
+@pytest.mark.parametrize("hop", [None, 10000])
+def test_plan_covers_every_frame_once(workers, hop):
+    num_samples = 12 * SAMPLE_RATE + 123
+    shards = plan_shards(num_samples, SAMPLE_RATE, workers, hop=hop)
+    assert shards[0].frame_start == 0 and shards[0].sample_start == 0
+    assert shards[-1].frame_stop == PEAQ(SAMPLE_RATE, hop_size=hop).num_frames(num_samples)
+    assert shards[-1].diff_stop == num_samples
+    for a, b in zip(shards, shards[1:]):
+        assert a.frame_stop == b.frame_start
+        assert a.diff_stop == b.sample_start
+
+
+def test_process_pool_matches_serial(pair):
+    ref, test = pair
+    serial = _serial(ref, test)
+    sharded = PEAQ(SAMPLE_RATE)
+    sharded.process(ref, test, workers=2)
+    np.testing.assert_array_equal(sharded.EbNMatR, serial.EbNMatR)
+    np.testing.assert_array_equal(sharded.EhsR, serial.EhsR)
+    np.testing.assert_array_equal(sharded.EbNMatT, serial.EbNMatT)
+    assert sharded.computeODG()[0] == serial.computeODG()[0]
+
+
+@pytest.mark.parametrize("workers", [2, 5])
+@pytest.mark.parametrize("hop", [None, 10000])
+def test_evaluate_sharded_matches_serial(pair, workers, hop):
+    ref, test = pair
+    odg, movs = _serial(ref, test, hop).computeODG()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        merged = evaluate_sharded(ref, test, SAMPLE_RATE, workers, executor=pool, hop=hop)
+    sharded_odg, sharded_movs = merged.computeODG()
+    assert sharded_odg == pytest.approx(odg, rel=1e-9, abs=1e-12)
+    for name, value in movs.items():
+        assert sharded_movs[name] == pytest.approx(value, rel=1e-6, abs=1e-12), name
+
+
+def test_sharding_is_opt_in_and_shares_the_cores(monkeypatch):
+    long_pair = 10 * 60 * 44100
+    assert peaq_analyzer._shard_workers(long_pair, 44100) == 1
+
+    monkeypatch.setattr(config, "PEAQ_SHARD_WORKERS", None)
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    assert peaq_analyzer._shard_workers(long_pair, 44100) == 4
+    assert peaq_analyzer._shard_workers(44100, 44100) == 1
+    # A per-track pool of 3 workers is running: only one core is left
+    monkeypatch.setattr(peaq_analyzer, "_pool_workers_running", 3)
+    assert peaq_analyzer._shard_workers(long_pair, 44100) == 1
+    assert peaq_analyzer._available_workers(8) == 1
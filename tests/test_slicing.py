@@ -0,0 +1,135 @@
+# tests/test_slicing.py
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+import soundfile as sf
+
+import config
+import multi
+import spotify_mode
+from audio_utils import trim_test_audio_with_delay_compensation
+from trim_utils import _split_with_decoder, parse_duration
+from wav_slicer import split_wav, trim_wav
+from conftest import SAMPLE_RATE
+
+
+@pytest.fixture
+def ramp_wav(tmp_path):
+    """10 s stereo int16 WAV whose left channel counts frames (mod 2**15), right channel negated."""
+    count = (np.arange(10 * SAMPLE_RATE) % 32768).astype(np.int16)
+    path = tmp_path / "capture.wav"
+    sf.write(path, np.stack([count, -count], axis=1), SAMPLE_RATE, subtype="PCM_16")
+    return path, count
+
+
+def test_split_wav_boundaries_follow_the_running_sum(ramp_wav, tmp_path):
+    path, count = ramp_wav
+    durations = [1 / 3, 2.00001, 0.5, 1 / 7, 2.9]
+    outputs = [tmp_path / f"track{i + 1}.wav" for i in range(len(durations))]
+    written = split_wav(str(path), durations, [str(p) for p in outputs], start_sec=0.25)
+
+    edges = np.rint((0.25 + np.concatenate([[0.0], np.cumsum(durations)])) * SAMPLE_RATE).astype(int)
+    assert written == list(np.diff(edges))
+    for output, start, stop in zip(outputs, edges[:-1], edges[1:]):
+        data, samplerate = sf.read(output, dtype="int16")
+        assert samplerate == SAMPLE_RATE
+        np.testing.assert_array_equal(data[:, 0], count[start:stop])
+        np.testing.assert_array_equal(data[:, 1], -count[start:stop])
+
+
+def test_split_wav_stops_at_the_end_of_the_capture(ramp_wav, tmp_path):
+    path, count = ramp_wav
+    outputs = [str(tmp_path / "a.wav"), str(tmp_path / "b.wav"), str(tmp_path / "c.wav")]
+    assert split_wav(str(path), [8.0, 5.0, 1.0], outputs) == [8 * SAMPLE_RATE, 2 * SAMPLE_RATE, 0]
+    np.testing.assert_array_equal(sf.read(outputs[1], dtype="int16")[0][:, 0], count[8 * SAMPLE_RATE:])
+
+
+def test_trim_wav(ramp_wav, tmp_path):
+    path, count = ramp_wav
+    output = tmp_path / "trimmed.wav"
+    trim_wav(str(path), str(output), start_sec=3.0, duration_sec=1.5)
+    np.testing.assert_array_equal(sf.read(output, dtype="int16")[0][:, 0], count[3 * SAMPLE_RATE:int(4.5 * SAMPLE_RATE)])
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    """An ``ffmpeg`` on PATH that decodes with soundfile to s16le on stdout and chatters on stderr."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "ffmpeg"
+    script.write_text(f"#!{sys.executable}\n"
+                      "import sys, soundfile as sf\n"
+                      "sys.stderr.write('warning: noisy decoder\\n' * 20000)\n"
+                      "data, _ = sf.read(sys.argv[sys.argv.index('-i') + 1], dtype='int16')\n"
+                      "sys.stdout.buffer.write(data.astype('<i2').tobytes())\n")
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+
+def test_single_decode_matches_per_track_split(ramp_wav, tmp_path, fake_ffmpeg, capsys):
+    path, count = ramp_wav
+    flac = tmp_path / "capture.flac"
+    sf.write(flac, sf.read(path, dtype="int16")[0], SAMPLE_RATE, subtype="PCM_16")
+    durations = [1 / 3, 2.00001, 0.5, 1 / 7, 2.9]
+    wav_outputs = [str(tmp_path / f"wav{i}.wav") for i in range(len(durations))]
+    decoded = [(str(tmp_path / f"flac{i}.wav"), seconds) for i, seconds in enumerate(durations)]
+
+    split_wav(str(path), durations, wav_outputs)
+    _split_with_decoder(str(flac), decoded)
+    for wav_output, (decoded_output, _) in zip(wav_outputs, decoded):
+        np.testing.assert_array_equal(sf.read(decoded_output, dtype="int16")[0],
+                                      sf.read(wav_output, dtype="int16")[0])
+    assert capsys.readouterr().out.count("✅ Saved") == len(durations)
+
+
+def test_single_decode_reports_truncated_tracks(ramp_wav, tmp_path, fake_ffmpeg, capsys):
+    path, _ = ramp_wav
+    flac = tmp_path / "capture.flac"
+    sf.write(flac, sf.read(path, dtype="int16")[0], SAMPLE_RATE, subtype="PCM_16")
+    tracks = [(str(tmp_path / f"track{i}.wav"), seconds) for i, seconds in enumerate([8.0, 5.0, 1.0])]
+
+    _split_with_decoder(str(flac), tracks)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith("✅ Saved")
+    assert lines[1].startswith("⚠️ Track track1.wav truncated: 2.00s of 5.00s") and "noisy decoder" in lines[1]
+    assert lines[2].startswith("❌ Error splitting track track2.wav") and "noisy decoder" in lines[2]
+
+
+@pytest.mark.parametrize("value, seconds", [
+    (3, 3.0),
+    (2.5, 2.5),
+    ("42", 42.0),
+    ("03:25", 205.0),
+    ("3:25.5", 205.5),
+    ("1:02:03", 3723.0),
+    ("0:00:01.250", 1.25),
+    (" 4:05 ", 245.0),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == pytest.approx(seconds)
+
+
+@pytest.mark.parametrize("value", ["", "abc", "1:xx", "::", None])
+def test_parse_duration_rejects(value):
+    assert parse_duration(value) is None
+
+
+@pytest.mark.parametrize("module", [multi, spotify_mode])
+def test_total_recording_time_is_whole_seconds(module, monkeypatch):
+    monkeypatch.setattr(pd, "read_excel", lambda path: pd.DataFrame({"duration": ["3:25.5", 2.25, "bad", "0:10"]}))
+    total = module.calculate_total_duration_from_excel("playlist.xlsx")
+    assert total == 218 and isinstance(total, int)
+
+
+def test_fast_trim_reports_the_applied_delay(ramp_wav, tmp_path, monkeypatch, capsys):
+    path, count = ramp_wav
+    monkeypatch.setattr(config, "ENABLE_AUTO_DELAY_COMPENSATION", True)
+    monkeypatch.setattr(config, "TEST_AUDIO_START_DELAY", 0.009)
+    output = tmp_path / "test.wav"
+    assert trim_test_audio_with_delay_compensation(str(path), str(output), 1.0, 2.0, is_test_file=True)
+    assert "(with 9.0ms compensation) (sample-accurate trim)" in capsys.readouterr().out
+    start = int(round(1.009 * SAMPLE_RATE))
+    np.testing.assert_array_equal(sf.read(output, dtype="int16")[0][:, 0], count[start:start + 2 * SAMPLE_RATE])
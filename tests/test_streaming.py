@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from PEAQ import PEAQ
+from PEAQ.streaming import StreamingPEAQ
+from conftest import SAMPLE_RATE
+
+
+def _batch(ref, test, hop):
+    model = PEAQ(SAMPLE_RATE, frame_size=2048, hop_size=hop)
+    model.process(ref, test)
+    return model.computeODG()
+
+
+def _streamed(ref, test, hop, chunk):
+    acc = StreamingPEAQ(SAMPLE_RATE, NF=2048, hop=hop)
+    for start in range(0, len(ref), chunk):
+        acc.update(ref[start:start + chunk], test[start:start + chunk])
+    return acc, acc.computeODG()
+
+
+@pytest.mark.parametrize("hop", [1024, 2048, 8192, 10000])
+@pytest.mark.parametrize("chunk", [4096, 3 * SAMPLE_RATE + 17])
+def test_streaming_matches_batch(pair, hop, chunk):
+    ref, test = pair
+    odg, movs = _batch(ref, test, hop)
+    acc, (stream_odg, stream_movs) = _streamed(ref, test, hop, chunk)
+
+    assert acc.num_frames == PEAQ(SAMPLE_RATE, frame_size=2048, hop_size=hop).num_frames(len(ref))
+    assert stream_odg == pytest.approx(odg, rel=1e-9, abs=1e-12)
+    for name, value in movs.items():
+        assert stream_movs[name] == pytest.approx(value, rel=1e-6, abs=1e-12), name
+
+
+def test_streaming_keeps_float64(pair):
+    ref, test = (x.astype(np.float64) + 1e-6 for x in pair)
+    odg, movs = _batch(ref, test, 2048)
+    acc, (stream_odg, stream_movs) = _streamed(ref, test, 2048, 3 * SAMPLE_RATE + 17)
+    assert acc._ref_tail.dtype == np.float64
+    assert stream_odg == pytest.approx(odg, rel=1e-12, abs=1e-12)
+    for name, value in movs.items():
+        assert stream_movs[name] == pytest.approx(value, rel=1e-9, abs=1e-12), name
+
+
+def test_streaming_unequal_chunk_sizes(pair):
+    ref, test = pair
+    _, movs = _batch(ref, test, 8192)
+    acc = StreamingPEAQ(SAMPLE_RATE, NF=2048, hop=8192)
+    # Reference and test arrive in different-sized pieces
+    for r0, t0 in zip(range(0, len(ref), 5000), range(0, len(test), 5000)):
+        acc.update(ref[r0:r0 + 5000], test[t0:t0 + 3000])
+        acc.update(np.zeros(0, np.float32), test[t0 + 3000:t0 + 5000])
+    _, stream_movs = acc.computeODG()
+    assert stream_movs["AvgBwRef"] == pytest.approx(movs["AvgBwRef"], rel=1e-6)
+    assert stream_movs["NMRtotB"] == pytest.approx(movs["NMRtotB"], rel=1e-6)
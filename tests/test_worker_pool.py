@@ -0,0 +1,25 @@
+# tests/test_worker_pool.py
+import os
+
+import config
+from peaq_analyzer import _peaq_pool
+
+WORKER_VARS = ("PEAQ_POOL_WORKER", "MPLBACKEND", "OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def _worker_env():
+    return {var: os.environ.get(var) for var in WORKER_VARS}
+
+
+def test_worker_setup_stays_in_the_workers(monkeypatch):
+    monkeypatch.setattr(config, "PEAQ_THREADS_PER_WORKER", 1)
+    for var in WORKER_VARS:
+        monkeypatch.delenv(var, raising=False)
+
+    with _peaq_pool(2) as pool:
+        # Meanwhile the parent (and anything it launches) keeps its own environment
+        assert all(os.environ.get(var) is None for var in WORKER_VARS)
+        worker = pool.submit(_worker_env).result()
+    assert worker == {"PEAQ_POOL_WORKER": "1", "MPLBACKEND": "Agg", "OMP_NUM_THREADS": "1",
+                      "OPENBLAS_NUM_THREADS": "1"}
+    assert all(os.environ.get(var) is None for var in WORKER_VARS)
@@ -1,17 +1,23 @@
 import os
 import pandas as pd
 import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from wav_slicer import read_wav_layout, seconds_to_frames, split_wav, split_pcm_stream
 
 def parse_duration(duration):
+    """Seconds (float) from a number, "MM:SS(.fff)" or "H:MM:SS(.fff)"; None if unparseable."""
     if isinstance(duration, str) and ':' in duration:
         try:
-            minutes, seconds = map(int, duration.strip().split(":"))
-            return minutes * 60 + seconds
-        except:
+            seconds = 0.0
+            for part in duration.strip().split(":"):
+                seconds = seconds * 60 + float(part)
+            return seconds
+        except ValueError:
             return None
     try:
-        return int(float(duration))
-    except:
+        return float(duration)
+    except (TypeError, ValueError):
         return None
 
 def split_audio_by_durations(input_audio, excel_path, output_dir):
@@ -22,26 +28,82 @@ def split_audio_by_durations(input_audio, excel_path, output_dir):
 
     durations = df["duration"].dropna()
 
-    start_time = 0
+    tracks = []
     for i, duration in enumerate(durations):
         seconds = parse_duration(duration)
         if seconds is None:
             print(f"❌ Error parsing duration: {duration}")
             continue
+        tracks.append((os.path.join(output_dir, f"track{i+1}.wav"), seconds))
 
-        output_filename = os.path.join(output_dir, f"track{i+1}.wav")
-        cmd = [
-            "ffmpeg", "-y",
-            "-i", input_audio,
-            "-ss", str(start_time),
-            "-t", str(seconds),
-            output_filename
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+    try:
+        read_wav_layout(input_audio)
+    except (OSError, ValueError):
+        _split_with_decoder(input_audio, tracks)
+        return
+
+    # One sequential pass over the capture, cut at exact sample positions
+    split_wav(input_audio, [seconds for _, seconds in tracks], [path for path, _ in tracks])
+    for output_filename, _ in tracks:
+        print(f"✅ Saved: {output_filename}")
+
+def _split_with_decoder(input_audio, tracks):
+    """
+    Non-WAV captures: decode once with ffmpeg to raw PCM on a pipe and cut
+    every track from that single stream at exact sample positions.
+    """
+    from audio_metadata import probe_audio
+    from audio_utils import validate_ffmpeg
+    try:
+        ffmpeg_cmd = validate_ffmpeg()
+    except RuntimeError as e:
+        print(str(e))
+        return
+    info = probe_audio(input_audio)
+    samplerate, channels = info.samplerate or 44100, info.channels or 2
 
-        if result.returncode != 0:
-            print(f"❌ Error splitting track track{i+1}: {result.stderr}")
+    cmd = [
+        ffmpeg_cmd, "-v", "error", "-i", input_audio, "-vn",
+        "-f", "s16le", "-acodec", "pcm_s16le",
+        "-ar", str(samplerate), "-ac", str(channels), "pipe:1"
+    ]
+    # stderr goes to a file: a full stderr pipe would block ffmpeg while we read stdout
+    with tempfile.TemporaryFile() as errors:
+        decoder = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errors)
+        try:
+            written = split_pcm_stream(decoder.stdout, samplerate, channels,
+                                       [seconds for _, seconds in tracks], [path for path, _ in tracks])
+        finally:
+            # Whatever follows the last track is not needed
+            decoder.stdout.close()
+            decoder.kill()
+            decoder.wait()
+        errors.seek(0)
+        # The last line says why ffmpeg stopped; earlier ones are mostly warnings
+        stderr_lines = errors.read().decode(errors='replace').strip().splitlines()
+
+    for (output_filename, seconds), frames in zip(tracks, written):
+        expected = seconds_to_frames(seconds, samplerate)
+        # Cumulative boundaries move a single track by at most one frame
+        if frames < expected - 1:
+            reason = stderr_lines[-1] if stderr_lines else 'capture ended early'
+            if frames == 0:
+                print(f"❌ Error splitting track {os.path.basename(output_filename)}: {reason}")
+            else:
+                print(f"⚠️ Track {os.path.basename(output_filename)} truncated: "
+                      f"{frames / samplerate:.2f}s of {seconds:.2f}s ({reason})")
         else:
             print(f"✅ Saved: {output_filename}")
 
-        start_time += seconds
+def split_captures(captures, excel_path):
+    """
+    Split several raw captures (e.g. phone1 and phone2) concurrently.
+    ``captures`` maps input audio path -> output folder.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, len(captures))) as pool:
+        futures = [
+            pool.submit(split_audio_by_durations, input_audio, excel_path, output_dir)
+            for input_audio, output_dir in captures.items()
+        ]
+        for future in futures:
+            future.result()
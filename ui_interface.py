@@ -18,8 +18,11 @@ def route_user(choice):
         case '7':
             from spotify_comparison_mode import run_spotify_comparison_mode
             run_spotify_comparison_mode()
+        case '8':
+            from modes.reference_matrix_mode import run_reference_matrix_mode
+            run_reference_matrix_mode()
         case _:
-            print("❌ Invalid choice. Please select 1–7.")
+            print("❌ Invalid choice. Please select 1–8.")
 
 # call the router directly with config value
 route_user(selected_mode)
@@ -6,15 +6,32 @@ import numpy as np
 import numpy as np
 import matplotlib.pyplot as plt
 
-def plot_peaq_results(peaq, output_path=None, show=True):
+def _plot_frames(frames, values, label=None, color=None):
+    """One line for mono per-frame values, one line per channel for (frames, channels)."""
+    if np.ndim(values) == 1:
+        plt.plot(frames, values, label=label, color=color)
+        return
+    for c in range(values.shape[1]):
+        plt.plot(frames, values[:, c], label=f"{label or ''} ch{c + 1}".strip())
+
+
+def plot_peaq_results(peaq, output_path=None, show=True, title=None):
+    # Accept a PEAQ frame-store directory and read its memmapped arrays lazily
+    if isinstance(peaq, str):
+        from PEAQ import PEAQ
+        peaq = PEAQ.from_frame_store(peaq)
+
     frames = np.arange(len(peaq.EbNMatR))
+    hop = peaq.pq_eval.hopsize
 
     plt.figure(figsize=(16, 12))
+    # Frame resolution on every plot, so plots made at different hops are not mixed up
+    plt.suptitle(title or f"PEAQ frames: {peaq.pq_eval.framesize} samples, hop {hop}")
 
     # 1. Bandwidth per frame
     plt.subplot(4, 1, 1)
-    plt.plot(frames, peaq.BWRef, label="Reference")
-    plt.plot(frames, peaq.BWTest, label="Test")
+    _plot_frames(frames, peaq.BWRef, label="Reference")
+    _plot_frames(frames, peaq.BWTest, label="Test")
     plt.ylabel("Bandwidth")
     plt.legend()
     plt.title("Bandwidth per Frame")
@@ -22,15 +39,15 @@ def plot_peaq_results(peaq, output_path=None, show=True):
 
     # 2. NMR per frame
     plt.subplot(4, 1, 2)
-    plt.plot(frames, peaq.NMR.mean(axis=1), color='orange')
+    _plot_frames(frames, peaq.NMR.mean(axis=-1), color='orange')
     plt.ylabel("NMR (dB)")
     plt.title("Noise-to-Mask Ratio per Frame")
     plt.grid(True, alpha=0.3)
 
     # 3. ODG components
     plt.subplot(4, 1, 3)
-    plt.plot(frames, -0.25 * peaq.NMR.mean(axis=1), label="NMR Contribution", color='red')
-    plt.plot(frames, -0.1 * np.abs(peaq.BWRef - peaq.BWTest), label="BW Difference", color='blue')
+    _plot_frames(frames, -0.25 * peaq.NMR.mean(axis=-1), label="NMR Contribution", color='red')
+    _plot_frames(frames, -0.1 * np.abs(peaq.BWRef - peaq.BWTest), label="BW Difference", color='blue')
     plt.ylabel("ODG Components")
     plt.legend()
     plt.title("ODG Component Contributions")
@@ -39,9 +56,9 @@ def plot_peaq_results(peaq, output_path=None, show=True):
     # 4. Probability of detection
     plt.subplot(4, 1, 4)
     prob = 1 / (1 + np.exp(-0.6 * (peaq.NMR - 5)))
-    plt.plot(frames, np.max(prob, axis=1), color='purple')
+    _plot_frames(frames, np.max(prob, axis=-1), color='purple')
     plt.ylabel("Detection Probability")
-    plt.xlabel("Frame")
+    plt.xlabel(f"Frame (hop {hop} samples)")
     plt.title("Maximum Probability of Detection per Frame")
     plt.grid(True, alpha=0.3)
 
@@ -0,0 +1,221 @@
+## wav_slicer.py
+"""
+Sample-accurate slicing of WAV captures without decoding or re-encoding.
+
+The RIFF header is parsed once to find the fmt and data chunks. Every slice
+position is a whole number of frames, computed from cumulative seconds, so
+long playlists do not drift. Slices are written by copying raw byte ranges
+under a fresh header, and ``wav_slice_view`` exposes them as zero-copy numpy
+memmaps for in-process consumers.
+"""
+import os
+import struct
+import tempfile
+import wave
+from collections import namedtuple
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+COPY_CHUNK_BYTES = 4 * 1024 * 1024
+
+WavLayout = namedtuple(
+    "WavLayout",
+    "samplerate channels bits_per_sample format_tag block_align data_offset num_frames fmt_chunk",
+)
+
+
+def read_wav_layout(path):
+    """WavLayout of a RIFF/WAVE file; raises ValueError for anything else."""
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+            raise ValueError(f"Not a RIFF/WAVE file: {path}")
+
+        fmt_chunk = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"No data chunk in {path}")
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                fmt_chunk = f.read(chunk_size)
+                if chunk_size % 2:
+                    f.seek(1, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                data_offset = f.tell()
+                break
+            else:
+                f.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+
+    if fmt_chunk is None or len(fmt_chunk) < 16:
+        raise ValueError(f"Missing fmt chunk in {path}")
+    format_tag, channels, samplerate, _, block_align, bits = struct.unpack('<HHIIHH', fmt_chunk[:16])
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt_chunk) >= 26:
+        format_tag = struct.unpack('<H', fmt_chunk[24:26])[0]  # sub-format GUID starts with the tag
+    if format_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT) or block_align == 0:
+        raise ValueError(f"Unsupported WAV encoding (format 0x{format_tag:04x}) in {path}")
+
+    # Captures cut short (or written to a pipe) leave 0 / 0xFFFFFFFF here: trust the file size
+    available = file_size - data_offset
+    data_size = chunk_size if 0 < chunk_size <= available else available
+    return WavLayout(samplerate, channels, bits, format_tag, block_align,
+                     data_offset, data_size // block_align, fmt_chunk)
+
+
+def seconds_to_frames(seconds, samplerate):
+    return int(round(float(seconds) * samplerate))
+
+
+def _clamp(layout, start_frame, num_frames):
+    start_frame = min(max(0, int(start_frame)), layout.num_frames)
+    if num_frames is None:
+        num_frames = layout.num_frames - start_frame
+    return start_frame, min(max(0, int(num_frames)), layout.num_frames - start_frame)
+
+
+def _wav_header(layout, num_frames):
+    data_size = num_frames * layout.block_align
+    fmt = layout.fmt_chunk
+    riff_size = 4 + (8 + len(fmt) + len(fmt) % 2) + (8 + data_size + data_size % 2)
+    header = struct.pack('<4sI4s', b'RIFF', riff_size, b'WAVE')
+    header += struct.pack('<4sI', b'fmt ', len(fmt)) + fmt + (b'\0' if len(fmt) % 2 else b'')
+    header += struct.pack('<4sI', b'data', data_size)
+    return header
+
+
+def _copy_range(src, dst, offset, length):
+    src.seek(offset)
+    while length > 0:
+        block = src.read(min(COPY_CHUNK_BYTES, length))
+        if not block:
+            break
+        dst.write(block)
+        length -= len(block)
+
+
+def _write_slice_temp(f_src, output_path, start_frame, num_frames, layout):
+    """Write the slice next to ``output_path``; returns (temp path, frames written)."""
+    start_frame, num_frames = _clamp(layout, start_frame, num_frames)
+    out_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(out_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, suffix=".wav.tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f_out:
+            f_out.write(_wav_header(layout, num_frames))
+            data_size = num_frames * layout.block_align
+            _copy_range(f_src, f_out, layout.data_offset + start_frame * layout.block_align, data_size)
+            if data_size % 2:
+                f_out.write(b'\0')
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, num_frames
+
+
+def write_wav_slice(input_path, output_path, start_frame, num_frames, layout=None):
+    """
+    Copy frames [start_frame, start_frame + num_frames) of ``input_path`` to a
+    new WAV at ``output_path`` (None = to the end). The slice is written to a
+    temporary file first, so ``output_path`` may be the input itself.
+    Returns the number of frames written.
+    """
+    layout = layout or read_wav_layout(input_path)
+    with open(input_path, 'rb') as f_src:
+        tmp_path, written = _write_slice_temp(f_src, output_path, start_frame, num_frames, layout)
+    # Source is closed before the replace (Windows cannot replace an open file)
+    os.replace(tmp_path, output_path)
+    return written
+
+
+def trim_wav(input_path, output_path, start_sec=0.0, duration_sec=None):
+    """Sample-accurate WAV trim: ``duration_sec`` seconds from ``start_sec`` (None = to the end)."""
+    layout = read_wav_layout(input_path)
+    start = seconds_to_frames(start_sec, layout.samplerate)
+    count = None if duration_sec is None else seconds_to_frames(duration_sec, layout.samplerate)
+    return write_wav_slice(input_path, output_path, start, count, layout)
+
+
+def split_wav(input_path, durations_sec, output_paths, start_sec=0.0):
+    """
+    Cut consecutive tracks of ``durations_sec`` seconds into ``output_paths``.
+    Boundaries come from the running sum of durations, rounded to a frame
+    once, so per-track rounding never accumulates. The capture is opened
+    once and read sequentially. Returns the frame count written per track.
+    """
+    layout = read_wav_layout(input_path)
+    written = []
+    elapsed = float(start_sec)
+    with open(input_path, 'rb') as f_src:
+        for duration, output_path in zip(durations_sec, output_paths):
+            start = seconds_to_frames(elapsed, layout.samplerate)
+            elapsed += float(duration)
+            stop = seconds_to_frames(elapsed, layout.samplerate)
+            tmp_path, frames = _write_slice_temp(f_src, output_path, start, stop - start, layout)
+            os.replace(tmp_path, output_path)
+            written.append(frames)
+    return written
+
+
+def wav_slice_view(path, start_frame=0, num_frames=None, layout=None):
+    """Zero-copy (frames, channels) memmap of a WAV region; raw integer or float samples."""
+    layout = layout or read_wav_layout(path)
+    start_frame, num_frames = _clamp(layout, start_frame, num_frames)
+    dtypes = {
+        (WAVE_FORMAT_PCM, 8): np.uint8, (WAVE_FORMAT_PCM, 16): np.int16, (WAVE_FORMAT_PCM, 32): np.int32,
+        (WAVE_FORMAT_IEEE_FLOAT, 32): np.float32, (WAVE_FORMAT_IEEE_FLOAT, 64): np.float64,
+    }
+    dtype = dtypes.get((layout.format_tag, layout.bits_per_sample))
+    if dtype is None or np.dtype(dtype).itemsize * layout.channels != layout.block_align:
+        raise ValueError(f"No direct numpy view for {layout.bits_per_sample}-bit samples in {path}")
+    return np.memmap(path, dtype=np.dtype(dtype).newbyteorder('<'), mode='r',
+                     offset=layout.data_offset + start_frame * layout.block_align,
+                     shape=(num_frames, layout.channels))
+
+
+def is_canonical_wav(path, samplerate=44100, channels=2, bits_per_sample=16):
+    """True when ``path`` already is the PCM layout our ffmpeg conversions produce."""
+    try:
+        layout = read_wav_layout(path)
+    except (OSError, ValueError):
+        return False
+    return (layout.format_tag == WAVE_FORMAT_PCM and layout.samplerate == samplerate and
+            layout.channels == channels and layout.bits_per_sample == bits_per_sample)
+
+
+def split_pcm_stream(stream, samplerate, channels, durations_sec, output_paths, sample_width=2):
+    """
+    Write consecutive tracks from a raw interleaved PCM byte stream (e.g. an
+    ffmpeg decoder's stdout) using the same cumulative frame boundaries as
+    split_wav. The stream is consumed once, front to back.
+    Returns the frame count written per track.
+    """
+    block_align = channels * sample_width
+    written = []
+    elapsed = 0.0
+    position = 0
+    for duration, output_path in zip(durations_sec, output_paths):
+        elapsed += float(duration)
+        stop = seconds_to_frames(elapsed, samplerate)
+        remaining = max(0, stop - position) * block_align
+        out_dir = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(out_dir, exist_ok=True)
+        frames = 0
+        with wave.open(output_path, 'wb') as out:
+            out.setnchannels(channels)
+            out.setsampwidth(sample_width)
+            out.setframerate(samplerate)
+            while remaining > 0:
+                block = stream.read(min(COPY_CHUNK_BYTES, remaining))
+                if not block:
+                    break
+                out.writeframesraw(block)
+                remaining -= len(block)
+                frames += len(block) // block_align
+        position += frames
+        written.append(frames)
+    return written
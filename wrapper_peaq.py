@@ -1,5 +1,5 @@
 import os
-from peaq_analyzer import run_peaq_analysis
+from peaq_analyzer import run_peaq_analysis, run_peaq_analyses
 
 def run_peaq_comparison(ref_path, test_path, graph_output_folder):
     os.makedirs(graph_output_folder, exist_ok=True)
@@ -13,4 +13,21 @@ def run_peaq_comparison(ref_path, test_path, graph_output_folder):
         "odg": odg,
         "quality": quality,
         "graph_path": graph_path
-    }
\ No newline at end of file
+    }
+
+
+def run_peaq_comparisons(pairs, graph_output_folder, workers=None):
+    """Parallel run_peaq_comparison over (ref_path, test_path) pairs, in input order."""
+    os.makedirs(graph_output_folder, exist_ok=True)
+    pairs = list(pairs)
+    results = run_peaq_analyses(pairs, graph_output_folder, workers=workers)
+
+    comparisons = []
+    for (ref_path, _), (odg, quality) in zip(pairs, results):
+        base_name = os.path.splitext(os.path.basename(ref_path))[0]
+        comparisons.append({
+            "odg": odg,
+            "quality": quality,
+            "graph_path": os.path.join(graph_output_folder, f"{base_name}.png")
+        })
+    return comparisons
@@ -2,15 +2,12 @@ import os
 import time
 import subprocess
 import urllib.parse
+import audio_metadata
+import config
 
 def get_audio_duration(filepath):
     try:
-        result = subprocess.run(
-            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
-             "-of", "default=noprint_wrappers=1:nokey=1", filepath],
-            capture_output=True, text=True
-        )
-        return float(result.stdout.strip())
+        return audio_metadata.get_audio_duration(filepath)
     except Exception as e:
         print(f"❌ Could not get duration for {filepath}: {e}")
         return 0.0
@@ -27,7 +24,7 @@ def get_mime_type(file_path):
         ".mp4": "audio/mp4",
     }.get(ext, "audio/*")
 
-def play_via_yt_music(file_path, on_kill_callback=None):
+def play_via_yt_music(file_path, on_kill_callback=None, stop_event=None, on_event=None):
     filename = os.path.basename(file_path)
     device_path = f"/sdcard/{filename}"
 
@@ -41,18 +38,29 @@ def play_via_yt_music(file_path, on_kill_callback=None):
     duration = get_audio_duration(file_path)
     print(f"🎵 Duration: {duration:.2f}s")
 
-    print("⏳ Waiting 3s after starting recording before launching YT Music...")
-    time.sleep(3)  # ❗ Delay here BEFORE triggering autoplay
+    # The fixed trim expects playback 3s into the capture; onset detection does not
+    adaptive = getattr(config, 'AUX_CAPTURE_MODE', 'file') == 'stream' and getattr(config, 'AUX_ADAPTIVE_STOP', True)
+    launch_delay = 0.5 if adaptive else 3
+    print(f"⏳ Waiting {launch_delay}s after starting recording before launching YT Music...")
+    time.sleep(launch_delay)  # ❗ Delay here BEFORE triggering autoplay
 
     print("🚀 Launching YT Music with intent (this auto-plays)...")
     subprocess.run([
         "adb", "shell", "am", "start", "-a", "android.intent.action.VIEW",
         "-d", f"file://{escaped_path}", "-t", mime_type
     ], capture_output=True)
+    if on_event:
+        on_event("play")
 
     wait_time = duration + 1
     print(f"⏳ Waiting {wait_time:.2f}s for audio to finish...")
-    time.sleep(wait_time)
+    if stop_event is None:
+        time.sleep(wait_time)
+    elif stop_event.wait(wait_time):
+        print("⏹️ Capture is over; stopping playback early")
+        subprocess.run(["adb", "shell", "input", "keyevent", "KEYCODE_MEDIA_STOP"], capture_output=True)
+    if on_event:
+        on_event("stop")
 
     if on_kill_callback:
         print("⏹️ Stopping AUX recording after playback finishes...")